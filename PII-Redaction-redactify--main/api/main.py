@@ -1,13 +1,30 @@
+import argparse
+import asyncio
 import os
+import time
 import logging
 import logging.config
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Tuple, Union
 
 import yaml
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
 
-from api.schemas import RedactRequest, RedactResponse, SpanSchema
-from core.pipeline import redact_text
+from api.schemas import (
+    BatchDocument,
+    BatchRedactRequest,
+    BatchResultLine,
+    RedactRequest,
+    RedactResponse,
+    SpanSchema,
+)
+from api.workers import DetectionPool, PoolSaturated, redact_batch_job, redact_job
+from core.metrics import METRICS
+from core.pseudonyms import batch_table, release_batch_table
+from core.registry import get_policy
 
 
 def setup_logging():
@@ -28,10 +45,66 @@ def setup_logging():
 setup_logging()
 logger = logging.getLogger("api")
 
+# Detection runs in a bounded process pool (REDACTIFY_WORKERS,
+# REDACTIFY_MAX_PENDING, REDACTIFY_TIMEOUT_S); see api/workers.py
+pool = None
+
+# REDACTIFY_WARMUP: "background" (default) warms the pool after startup
+# while /ready reports 503, "blocking" finishes warm-up before serving,
+# "off" skips it (first request pays the model load).
+WARMUP_MODES = ("background", "blocking", "off")
+readiness = {"ready": False, "detail": "starting"}
+
+
+async def _warm_pool() -> None:
+    t0 = time.perf_counter()
+    try:
+        result = await pool.warmup()
+    except Exception as e:  # keep serving; /ready says what went wrong
+        logger.exception("Warm-up failed")
+        readiness.update(ready=False, detail=f"warm-up failed: {e}")
+        return
+    elapsed = time.perf_counter() - t0
+    if result["errors"]:
+        readiness.update(ready=False, detail="; ".join(result["errors"]))
+        logger.warning("Warm-up finished with errors: %s", result["errors"])
+        return
+    readiness.update(
+        ready=True,
+        detail=f"{result['workers']} worker(s) warm in {elapsed:.2f}s",
+    )
+    logger.info("Warm-up done: %s", readiness["detail"])
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    global pool
+    pool = DetectionPool.from_env()
+    pool.start()
+
+    warmup_mode = os.getenv("REDACTIFY_WARMUP", "background")
+    task = None
+    readiness.update(ready=False, detail="warming up")
+    if warmup_mode == "blocking":
+        await _warm_pool()
+    elif warmup_mode == "off":
+        readiness.update(ready=True, detail="warm-up disabled")
+    else:
+        task = asyncio.create_task(_warm_pool())
+    try:
+        yield
+    finally:
+        if task is not None:
+            task.cancel()
+        readiness.update(ready=False, detail="shutting down")
+        pool.shutdown()
+
+
 app = FastAPI(
     title="PII Redactor",
     version="0.1.0",
     description="PII redaction using regex + spaCy NER (no external LLMs).",
+    lifespan=lifespan,
 )
 
 # Allow React dev server and your future domain
@@ -51,14 +124,191 @@ app.add_middleware(
 )
 
 
+async def _run_in_pool(fn, *args):
+    try:
+        return await pool.run(fn, *args)
+    except PoolSaturated:
+        logger.warning("Detection pool saturated (%d pending)", pool.pending)
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, retry later",
+            headers={"Retry-After": "1"},
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Detection timed out after %.1fs", pool.timeout)
+        raise HTTPException(status_code=504, detail="Redaction timed out")
+
+
 @app.post("/redact", response_model=RedactResponse)
-def redact(req: RedactRequest) -> RedactResponse:
+async def redact(req: RedactRequest) -> RedactResponse:
     logger.info("Received /redact request")
-    redacted, spans = redact_text(
-        text=req.text,
-        policy_path=req.policy_name,
-        mode=req.mode,
+    redacted, spans = await _run_in_pool(
+        redact_job, req.text, req.policy_name, req.mode
     )
+    return _to_response(redacted, spans)
+
+
+# Documents per pool job, and pool jobs one batch request keeps in flight
+BATCH_CHUNK = int(os.getenv("REDACTIFY_BATCH_CHUNK", "32"))
+BATCH_INFLIGHT = 2
+
+
+def _parse_batch(body: bytes, content_type: str, policy_name: str, mode: str):
+    """
+    Accept either a BatchRedactRequest JSON object or NDJSON lines.
+    Returns (documents, policy_name, mode).
+    """
+    if "ndjson" in content_type or "jsonl" in content_type:
+        docs = [
+            BatchDocument.model_validate_json(line)
+            for line in body.splitlines()
+            if line.strip()
+        ]
+        return docs, policy_name, mode
+    req = BatchRedactRequest.model_validate_json(body)
+    docs = req.documents + [BatchDocument(text=t) for t in req.texts]
+    return docs, req.policy_name, req.mode
+
+
+async def _stream_batch(
+    docs: List[Tuple[Union[str, int], str]],
+    policy_name: str,
+    mode: str,
+) -> AsyncIterator[bytes]:
+    chunks = [docs[i:i + BATCH_CHUNK] for i in range(0, len(docs), BATCH_CHUNK)]
+    pseudonyms = _batch_pseudonyms(policy_name)
+    # per chunk: its pool job, or the PoolSaturated it got instead
+    jobs: List[Any] = []
+
+    async def submit(chunk):
+        texts = [text for _id, text in chunk]
+        try:
+            # Same bounded path as /redact: a full pool is reported on the
+            # chunk rather than queued past max_pending
+            jobs.append(await pool.submit(redact_batch_job, texts, policy_name, mode, pseudonyms))
+        except PoolSaturated as e:
+            jobs.append(e)
+
+    # Keep a couple of chunks running ahead while earlier ones are being
+    # written out, so the client sees results before the batch finishes.
+    for c in chunks[:BATCH_INFLIGHT]:
+        await submit(c)
+    try:
+        for i, chunk in enumerate(chunks):
+            try:
+                if isinstance(jobs[i], PoolSaturated):
+                    raise jobs[i]
+                results = await pool.result(jobs[i])
+                lines = [
+                    BatchResultLine(
+                        id=doc_id,
+                        redacted_text=redacted,
+                        spans=_to_response(redacted, spans).spans,
+                    )
+                    for (doc_id, _text), (redacted, spans) in zip(chunk, results)
+                ]
+            except PoolSaturated:
+                logger.warning("Detection pool saturated (%d pending)", pool.pending)
+                lines = [BatchResultLine(id=doc_id, error="busy") for doc_id, _ in chunk]
+            except asyncio.TimeoutError:
+                lines = [BatchResultLine(id=doc_id, error="timeout") for doc_id, _ in chunk]
+            except Exception as e:  # keep streaming the rest of the batch
+                logger.exception("Batch chunk failed")
+                lines = [BatchResultLine(id=doc_id, error=str(e)) for doc_id, _ in chunk]
+
+            if i + BATCH_INFLIGHT < len(chunks):
+                await submit(chunks[i + BATCH_INFLIGHT])
+            yield "".join(line.model_dump_json() + "\n" for line in lines).encode("utf-8")
+    finally:
+        # On a disconnect, drop the chunks that haven't started. Ones still
+        # running (or timed out) keep writing into the pseudonym table, so
+        # it's released only after they end.
+        running = [j for j in jobs if not isinstance(j, PoolSaturated) and not j.done()]
+        for job in running:
+            job.cancel()
+        if running:
+            asyncio.ensure_future(_release_after(running, pseudonyms))
+        else:
+            release_batch_table(pseudonyms)
+
+
+async def _release_after(jobs, pseudonyms) -> None:
+    await asyncio.gather(*(asyncio.wrap_future(j) for j in jobs), return_exceptions=True)
+    release_batch_table(pseudonyms)
+
+
+def _batch_pseudonyms(policy_name: str):
+    """
+    One pseudonym table for the whole request, shared by its chunk jobs
+    (durable when they run in other processes), or None for per_document.
+    """
+    try:
+        policy = get_policy(policy_name)
+    except Exception:
+        return None  # each chunk reports the policy error itself
+    return batch_table(policy, cross_process=pool.workers > 0)
+
+
+@app.post("/redact/batch")
+async def redact_batch(
+    request: Request,
+    policy_name: str = "configs/policy.yaml",
+    mode: str = "placeholder",
+) -> StreamingResponse:
+    """
+    Redact many documents with one policy/mode.
+
+    Body: a BatchRedactRequest JSON object, or (Content-Type
+    application/x-ndjson) one {"id": ..., "text": ...} object per line,
+    with policy_name / mode as query parameters.
+
+    Response: NDJSON, one BatchResultLine per document in input order,
+    streamed as soon as each chunk of documents is done.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    try:
+        docs, policy_name, mode = _parse_batch(body, content_type, policy_name, mode)
+    except (ValidationError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if pool.saturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, retry later",
+            headers={"Retry-After": "1"},
+        )
+
+    logger.info("Received /redact/batch request (%d docs)", len(docs))
+    tagged = [
+        (doc.id if doc.id is not None else i, doc.text) for i, doc in enumerate(docs)
+    ]
+    return StreamingResponse(
+        _stream_batch(tagged, policy_name, mode),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 only once the model and policies are warm."""
+    status = 200 if readiness["ready"] else 503
+    return JSONResponse(status_code=status, content=dict(readiness))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Prometheus text format; includes what pool workers reported back."""
+    if pool is not None:
+        METRICS.set_gauge("redactify_pool_pending", pool.pending)
+        METRICS.set_gauge("redactify_pool_max_pending", pool.max_pending)
+    return PlainTextResponse(
+        METRICS.render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+def _to_response(redacted, spans) -> RedactResponse:
     span_schemas = [
         SpanSchema(
             start=s.start,
@@ -71,3 +321,28 @@ def redact(req: RedactRequest) -> RedactResponse:
         for s in spans
     ]
     return RedactResponse(redacted_text=redacted, spans=span_schemas)
+
+
+def main() -> None:
+    import uvicorn
+
+    ap = argparse.ArgumentParser(description="Run the redaction API.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=None, help="detection processes")
+    ap.add_argument(
+        "--warmup",
+        choices=WARMUP_MODES,
+        default=os.getenv("REDACTIFY_WARMUP", "background"),
+        help="load model + policies before serving (blocking), after (background) or not at all",
+    )
+    args = ap.parse_args()
+
+    os.environ["REDACTIFY_WARMUP"] = args.warmup
+    if args.workers is not None:
+        os.environ["REDACTIFY_WORKERS"] = str(args.workers)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 # api/schemas.py
 
-from typing import List, Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel
 
 
@@ -22,3 +22,24 @@ class RedactRequest(BaseModel):
 class RedactResponse(BaseModel):
     redacted_text: str
     spans: List[SpanSchema]
+
+
+class BatchDocument(BaseModel):
+    id: Optional[Union[str, int]] = None  # defaults to the input position
+    text: str
+
+
+class BatchRedactRequest(BaseModel):
+    documents: List[BatchDocument] = []
+    texts: List[str] = []  # shorthand for documents without ids
+    policy_name: str = "configs/policy.yaml"
+    mode: str = "placeholder"
+
+
+class BatchResultLine(BaseModel):
+    """One NDJSON line of a /redact/batch response."""
+
+    id: Union[str, int]
+    redacted_text: Optional[str] = None
+    spans: List[SpanSchema] = []
+    error: Optional[str] = None
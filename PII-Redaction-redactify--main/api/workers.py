@@ -0,0 +1,251 @@
+# api/workers.py
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from core.metrics import METRICS
+from core.models import Span
+from core.pipeline import redact_text, redact_texts
+from core.pseudonyms import PseudonymTable
+
+logger = logging.getLogger("api")
+
+
+class PoolSaturated(Exception):
+    """Raised when the pool already has max_pending jobs in flight."""
+
+
+# ---------------------------------------------------------------------
+# Jobs (module-level so they can be pickled to worker processes)
+# ---------------------------------------------------------------------
+# The worker's warm-up outcome, set by _init_worker and only reported by
+# warmup_job. Thread-local so each thread pool (workers=0) has its own.
+_worker = threading.local()
+
+
+def _init_worker(policy_paths: Sequence[str]) -> None:
+    """Compile policies, load the spaCy model and warm up once per worker."""
+    _worker.warm_error = _warm(policy_paths)
+
+
+def _warm(policy_paths: Sequence[str]) -> Optional[str]:
+    """Run core.warmup; returns an error message instead of raising."""
+    from core.warmup import warmup
+
+    try:
+        warmup(policy_paths)
+    except Exception as e:
+        # Surface the real error on the first request instead of
+        # breaking the whole pool here.
+        logger.warning("Worker warm-up failed: %s", e)
+        return str(e)
+    return None
+
+
+def warmup_job() -> Tuple[int, Optional[str]]:
+    """
+    (pid, warm-up error) of the worker that ran it; see DetectionPool.warmup.
+    The worker already warmed up in its initializer; this only reports.
+    """
+    # Hold the worker a moment so sibling warm-up jobs land on other workers
+    time.sleep(0.05)
+    return os.getpid(), _worker.warm_error
+
+
+def _run_job(fn: Callable[..., Any], *args: Any) -> Tuple[Any, Optional[dict]]:
+    """
+    Run a job and hand back (result, metrics recorded while running it).
+    In-process (thread) jobs record straight into the parent's METRICS.
+    """
+    result = fn(*args)
+    in_worker = multiprocessing.parent_process() is not None
+    return result, METRICS.drain() if in_worker else None
+
+
+def redact_job(
+    text: str,
+    policy_path: str,
+    mode: str,
+    allowed_entities: Optional[List[str]] = None,
+) -> Tuple[str, List[Span]]:
+    return redact_text(
+        text=text,
+        policy_path=policy_path,
+        mode=mode,
+        allowed_entities=allowed_entities,
+    )
+
+
+def redact_batch_job(
+    texts: List[str],
+    policy_path: str,
+    mode: str,
+    pseudonyms: Optional[PseudonymTable] = None,
+) -> List[Tuple[str, List[Span]]]:
+    return redact_texts(texts, policy_path=policy_path, mode=mode, pseudonyms=pseudonyms)
+
+
+# ---------------------------------------------------------------------
+# Pool
+# ---------------------------------------------------------------------
+class DetectionPool:
+    """
+    Bounded executor for CPU-bound detection.
+
+    workers > 0 uses a process pool (each worker preloads the model and
+    policies), so spaCy doesn't contend on the API process' GIL.
+    workers == 0 runs jobs on one in-process thread (dev / tests), warmed
+    up by the same initializer.
+
+    At most `max_pending` jobs (running + queued) are accepted; beyond
+    that run() raises PoolSaturated right away instead of queueing.
+    A job counts as pending until it really finishes, even if the caller
+    already gave up on it after `timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        timeout: float,
+        policy_paths: Sequence[str] = ("configs/policy.yaml",),
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.policy_paths = list(policy_paths)
+        self._pending = 0
+        self._slot_freed = asyncio.Event()
+        self._executor: Optional[Executor] = None
+
+    @classmethod
+    def from_env(cls) -> "DetectionPool":
+        workers = int(os.getenv("REDACTIFY_WORKERS", os.cpu_count() or 1))
+        max_pending = int(os.getenv("REDACTIFY_MAX_PENDING", max(2 * workers, 4)))
+        timeout = float(os.getenv("REDACTIFY_TIMEOUT_S", "30"))
+        policies = os.getenv("REDACTIFY_POLICIES", "configs/policy.yaml").split(",")
+        return cls(workers, max_pending, timeout, [p for p in policies if p])
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def saturated(self) -> bool:
+        return self._pending >= self.max_pending
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # spawn: forking a process that already runs an event loop
+                # and threads is asking for trouble
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.policy_paths,),
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, initializer=_init_worker, initargs=(self.policy_paths,)
+            )
+        logger.info(
+            "Detection pool started (workers=%d, max_pending=%d, timeout=%.1fs)",
+            self.workers, self.max_pending, self.timeout,
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def warmup(self, rounds: int = 3) -> Dict[str, Any]:
+        """
+        Make sure every worker has loaded the model and policies.
+
+        Worker initializers do the warm-up, but they run lazily; this
+        sends report jobs until each worker has answered one (or `rounds`
+        tries are used up), which also waits for its initializer to finish.
+        Returns {"workers": n warmed, "errors": [...]}.
+        """
+        expected = max(self.workers, 1)
+        seen: Dict[int, Optional[str]] = {}
+        for _ in range(rounds):
+            results = await asyncio.gather(
+                *(
+                    self.run(warmup_job, block=True)
+                    for _ in range(expected)
+                )
+            )
+            seen.update(results)
+            if len(seen) >= expected:
+                break
+        errors = sorted({e for e in seen.values() if e})
+        return {"workers": len(seen), "errors": errors}
+
+    def _release(self, fut: Future) -> None:
+        self._pending -= 1
+        self._slot_freed.set()
+        # Merged here rather than in run(), so jobs the caller gave up on
+        # (timeouts) are still counted
+        if not fut.cancelled() and fut.exception() is None:
+            METRICS.merge(fut.result()[1])
+
+    async def submit(self, fn: Callable[..., Any], *args: Any, block: bool = False) -> Future:
+        """
+        Start fn(*args) in the pool and return its (concurrent) future.
+
+        The job counts as pending until it really ends. Raises
+        PoolSaturated if too many jobs are in flight (or, with block=True,
+        waits for a free slot instead). cancel() on the future only stops
+        a job that hasn't started yet.
+        """
+        if self._executor is None:
+            self.start()
+        while self.saturated:
+            if not block:
+                raise PoolSaturated()
+            self._slot_freed.clear()
+            await self._slot_freed.wait()
+
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        fut = self._executor.submit(_run_job, fn, *args)
+
+        def done(f: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(self._release, f)
+            except RuntimeError:
+                pass  # loop already closed (shutdown)
+
+        fut.add_done_callback(done)
+        return fut
+
+    async def result(self, fut: Future) -> Any:
+        """
+        Wait for a submitted job. Raises asyncio.TimeoutError if it takes
+        longer than `timeout`; the job itself keeps running (and pending).
+        """
+        result, _metrics = await asyncio.wait_for(
+            asyncio.shield(asyncio.wrap_future(fut)), timeout=self.timeout
+        )
+        return result
+
+    async def run(self, fn: Callable[..., Any], *args: Any, block: bool = False) -> Any:
+        """
+        Run fn(*args) in the pool: submit() then result().
+
+        Raises PoolSaturated if too many jobs are in flight (or, with
+        block=True, waits for a free slot instead) and asyncio.TimeoutError
+        if the job takes longer than `timeout`.
+        """
+        return await self.result(await self.submit(fn, *args, block=block))
@@ -0,0 +1,503 @@
+# core/batch.py
+
+from __future__ import annotations
+
+import argparse
+import codecs
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from .pipeline import redact_texts
+from .pseudonyms import PseudonymTable, batch_table, release_batch_table
+from .registry import get_policy
+from .stream import READ_BLOCK, redact_stream
+
+logger = logging.getLogger("core")
+
+SUFFIXES = (".txt", ".pdf", ".jsonl")
+MANIFEST = "manifest.jsonl"
+VISUAL_MODES = ("blackout", "whiteout")
+
+# JSONL records sent through redact_texts at once
+JSONL_BATCH = 64
+
+
+# ---------------------------------------------------------------------
+# Files
+# ---------------------------------------------------------------------
+def iter_inputs(root: str, skip: Optional[str] = None) -> Iterator[str]:
+    """Paths (relative to root, "/"-separated) of the files to redact, sorted."""
+    skip = os.path.abspath(skip) if skip else None
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != skip
+        )
+        rel_dir = os.path.relpath(dirpath, root)
+        for name in sorted(filenames):
+            if name.lower().endswith(SUFFIXES):
+                rel = name if rel_dir == "." else os.path.join(rel_dir, name)
+                yield rel.replace(os.sep, "/")
+
+
+def output_name(rel: str, mode: str) -> str:
+    """Where rel's output goes: same path, except text extracted from PDFs."""
+    if rel.lower().endswith(".pdf") and mode not in VISUAL_MODES:
+        return rel + ".txt"
+    return rel
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            h.update(block)
+    return h.hexdigest()
+
+
+class _AtomicWriter:
+    """
+    Binary file written under a temporary name in the target directory and
+    renamed into place on commit(), so a crash never leaves a partial
+    output under the real name. Hashes what it writes.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.tmp = os.path.join(
+            os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.tmp"
+        )
+        self._f = open(self.tmp, "wb")
+        self._sha = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        self._f.write(data)
+        self._sha.update(data)
+        self.size += len(data)
+
+    def write_text(self, text: str) -> None:
+        self.write(text.encode("utf-8"))
+
+    @property
+    def sha256(self) -> str:
+        return self._sha.hexdigest()
+
+    def commit(self) -> None:
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self.tmp, self.path)
+
+    def abort(self) -> None:
+        self._f.close()
+        try:
+            os.unlink(self.tmp)
+        except FileNotFoundError:
+            pass
+
+
+def _read_hashed(path: str, sha) -> Iterator[str]:
+    # decode incrementally, hashing the raw bytes on the way
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with open(path, "rb") as f:
+        while block := f.read(READ_BLOCK):
+            sha.update(block)
+            text = decoder.decode(block)
+            if text:
+                yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+# ---------------------------------------------------------------------
+# One file (runs in a worker)
+# ---------------------------------------------------------------------
+def _redact_txt(src: str, out: _AtomicWriter, policy, mode, table, sha) -> int:
+    # constant memory: the file goes through redact_stream block by block
+    n_chars = 0
+    for piece in redact_stream(_read_hashed(src, sha), policy=policy, mode=mode, pseudonyms=table):
+        out.write_text(piece)
+        n_chars += len(piece)
+    return n_chars
+
+
+def _redact_jsonl(src: str, out: _AtomicWriter, policy, mode, table, sha, field) -> int:
+    """
+    Redact `field` of each record; other fields and other lines (blank
+    ones included) are kept as they are.
+    """
+    n_records = 0
+    pending: List[dict] = []
+
+    def flush():
+        results = redact_texts(
+            [r[field] for r in pending], policy=policy, mode=mode, pseudonyms=table
+        )
+        for record, (redacted, _spans) in zip(pending, results):
+            record[field] = redacted
+            out.write_text(json.dumps(record, ensure_ascii=False) + "\n")
+        pending.clear()
+
+    with open(src, "rb") as f:
+        for lineno, raw in enumerate(f, start=1):
+            sha.update(raw)
+            line = raw.decode("utf-8", errors="replace")
+            if not line.strip():
+                if pending:
+                    flush()
+                out.write_text(line)
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"line {lineno}: {e}") from None
+            if isinstance(record, dict) and isinstance(record.get(field), str):
+                pending.append(record)
+                n_records += 1
+                if len(pending) >= JSONL_BATCH:
+                    flush()
+            else:
+                if pending:
+                    flush()
+                out.write_text(line if line.endswith("\n") else line + "\n")
+    if pending:
+        flush()
+    return n_records
+
+
+def _redact_pdf(src: str, out: _AtomicWriter, policy, mode, table, sha) -> int:
+    from .ingest import ingest_pdf
+    from .pipeline import redact_text
+    from .redact_pdf import redact_pdf_bytes
+
+    with open(src, "rb") as f:
+        data = f.read()
+    sha.update(data)
+    if mode in VISUAL_MODES:
+        out.write(redact_pdf_bytes(data, mode=mode, policy=policy))
+        return len(data)
+    text = ingest_pdf(data).text
+    out.write_text(redact_text(text, mode=mode, policy=policy, pseudonyms=table)[0])
+    return len(text)
+
+
+def redact_one(
+    in_root: str,
+    out_root: str,
+    rel: str,
+    policy_path: str,
+    mode: str,
+    field: str = "text",
+    pseudonyms: Optional[PseudonymTable] = None,
+) -> Dict[str, Any]:
+    """Redact one input file; returns its manifest record (never raises)."""
+    t0 = time.perf_counter()
+    src = os.path.join(in_root, rel)
+    out_rel = output_name(rel, mode)
+    record: Dict[str, Any] = {"path": rel, "output": out_rel, "mode": mode}
+    if _is_jsonl(rel):
+        record["field"] = field
+    writer = None
+    try:
+        st = os.stat(src)
+        policy = get_policy(policy_path)
+        record.update(size=st.st_size, mtime_ns=st.st_mtime_ns, policy=policy.fingerprint)
+        sha = hashlib.sha256()
+        writer = _AtomicWriter(os.path.join(out_root, out_rel))
+        if rel.lower().endswith(".pdf"):
+            units = _redact_pdf(src, writer, policy, mode, pseudonyms, sha)
+        elif _is_jsonl(rel):
+            units = _redact_jsonl(src, writer, policy, mode, pseudonyms, sha, field)
+        else:
+            units = _redact_txt(src, writer, policy, mode, pseudonyms, sha)
+        writer.commit()
+        record.update(
+            status="ok",
+            sha256=sha.hexdigest(),
+            output_sha256=writer.sha256,
+            output_size=writer.size,
+            units=units,
+        )
+    except Exception as e:
+        if writer is not None:
+            writer.abort()
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return record
+
+
+def _is_jsonl(rel: str) -> bool:
+    return rel.lower().endswith(".jsonl")
+
+
+def _init_worker(policy_path: str) -> None:
+    """Compile the policy and load the spaCy model once per worker."""
+    from .warmup import warmup
+
+    try:
+        warmup([policy_path])
+    except Exception as e:
+        # every file will then fail with the real error in its record
+        logger.warning("Worker warm-up failed: %s", e)
+
+
+# ---------------------------------------------------------------------
+# Manifest
+# ---------------------------------------------------------------------
+class ManifestEntry(NamedTuple):
+    """What resume needs from an "ok" manifest record (digests as bytes)."""
+
+    policy: str
+    mode: str
+    size: int
+    mtime_ns: int
+    output_size: int
+    sha256: bytes
+    output_sha256: bytes
+    field: str  # the redacted JSONL field ("" for other files)
+
+
+def load_manifest(path: str) -> Dict[str, ManifestEntry]:
+    """
+    Resume index: per input path, its latest record if that one succeeded.
+    Only the fields is_done needs are kept (the output path follows from
+    the path and mode), so a million-file manifest doesn't have to fit in
+    memory as records. A torn last line (crash) is ignored.
+    """
+    done: Dict[str, ManifestEntry] = {}
+    if not os.path.exists(path):
+        return done
+    # policy / mode / field repeat on every line; keep one copy of each
+    shared: Dict[str, str] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                rel = record["path"]
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+            if record.get("status") != "ok":
+                done.pop(rel, None)
+                continue
+            try:
+                done[rel] = ManifestEntry(
+                    shared.setdefault(record["policy"], record["policy"]),
+                    shared.setdefault(record["mode"], record["mode"]),
+                    record["size"],
+                    record["mtime_ns"],
+                    record["output_size"],
+                    bytes.fromhex(record["sha256"]),
+                    bytes.fromhex(record["output_sha256"]),
+                    shared.setdefault(record.get("field", ""), record.get("field", "")),
+                )
+            except (KeyError, TypeError, ValueError):
+                done.pop(rel, None)
+    return done
+
+
+def is_done(
+    entry: Optional[ManifestEntry],
+    in_root: str,
+    out_root: str,
+    rel: str,
+    fingerprint: str,
+    mode: str,
+    verify: bool = False,
+    field: str = "text",
+) -> bool:
+    """
+    Whether rel can be skipped: its last run succeeded with the same policy
+    and mode (and JSONL field), and the input is unchanged. Unchanged means same size and
+    mtime, or, if only the mtime moved (e.g. a fresh copy), same sha256.
+    verify=True always compares the input and output checksums.
+    """
+    if entry is None or entry.policy != fingerprint or entry.mode != mode:
+        return False
+    if _is_jsonl(rel) and entry.field != field:
+        return False
+    out_path = os.path.join(out_root, output_name(rel, mode))
+    try:
+        st = os.stat(os.path.join(in_root, rel))
+        out_size = os.path.getsize(out_path)
+    except FileNotFoundError:
+        return False
+    if st.st_size != entry.size or out_size != entry.output_size:
+        return False
+    if verify:
+        return (
+            _sha256_file(os.path.join(in_root, rel)) == entry.sha256.hex()
+            and _sha256_file(out_path) == entry.output_sha256.hex()
+        )
+    if st.st_mtime_ns == entry.mtime_ns:
+        return True
+    return _sha256_file(os.path.join(in_root, rel)) == entry.sha256.hex()
+
+
+class _Manifest:
+    """Append-only JSONL; fsynced every `sync_every` records and on close."""
+
+    def __init__(self, path: str, sync_every: int = 100):
+        torn = False
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        self._f = open(path, "a", encoding="utf-8")
+        if torn:
+            # end the partial record of a crashed run so it stays one bad line
+            self._f.write("\n")
+        self._sync_every = sync_every
+        self._unsynced = 0
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._f.flush()
+        self._unsynced += 1
+        if self._unsynced >= self._sync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        os.fsync(self._f.fileno())
+        self._unsynced = 0
+
+    def close(self) -> None:
+        self.sync()
+        self._f.close()
+
+
+# ---------------------------------------------------------------------
+# Run
+# ---------------------------------------------------------------------
+def run_batch(
+    in_root: str,
+    out_root: str,
+    policy_path: str = "configs/policy.yaml",
+    mode: str = "placeholder",
+    workers: int = 1,
+    field: str = "text",
+    resume: bool = True,
+    verify: bool = False,
+    progress_every: int = 1000,
+) -> Dict[str, Any]:
+    """
+    Redact every input file under in_root into out_root.
+
+    workers > 0 runs files on a process pool (spawned, each worker warms
+    up the model once); workers == 0 runs them in this process. Only a
+    few files per worker are in flight at a time, so the walk over a huge
+    tree is lazy. Records are written to the manifest as files finish.
+
+    pseudonymization.scope: per_batch numbers values across the whole
+    run; a resumed run is a new batch.
+
+    Returns counts: {"ok", "skipped", "error", "seconds"}.
+    """
+    os.makedirs(out_root, exist_ok=True)
+    policy = get_policy(policy_path)
+    manifest_path = os.path.join(out_root, MANIFEST)
+    done = load_manifest(manifest_path) if resume else {}
+    manifest = _Manifest(manifest_path)
+    table = batch_table(policy, cross_process=workers > 0)
+    counts = {"ok": 0, "skipped": 0, "error": 0}
+    t0 = time.perf_counter()
+
+    def finished(record: Dict[str, Any]) -> None:
+        manifest.add(record)
+        counts[record["status"]] += 1
+        if record["status"] == "error":
+            logger.warning("%s: %s", record["path"], record["error"])
+        n = counts["ok"] + counts["error"]
+        if progress_every and n % progress_every == 0:
+            logger.info(
+                "%d done, %d skipped, %d errors, %.1f files/s",
+                counts["ok"], counts["skipped"], counts["error"],
+                n / (time.perf_counter() - t0),
+            )
+
+    def todo() -> Iterator[str]:
+        for rel in iter_inputs(in_root, skip=out_root):
+            if is_done(
+                done.get(rel), in_root, out_root, rel, policy.fingerprint, mode, verify, field
+            ):
+                counts["skipped"] += 1
+            else:
+                yield rel
+
+    args = (in_root, out_root)
+    rest = (policy_path, mode, field, table)
+    executor = None
+    try:
+        if workers <= 0:
+            for rel in todo():
+                finished(redact_one(*args, rel, *rest))
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(policy_path,),
+            )
+            in_flight: set[Future] = set()
+            for rel in todo():
+                in_flight.add(executor.submit(redact_one, *args, rel, *rest))
+                if len(in_flight) >= 4 * workers:
+                    finished_now, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for fut in finished_now:
+                        finished(fut.result())
+            for fut in wait(in_flight).done:
+                finished(fut.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        manifest.close()
+        release_batch_table(table)
+
+    counts["seconds"] = round(time.perf_counter() - t0, 3)
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(
+        description="Redact a directory of .txt/.pdf/.jsonl files (resumable)."
+    )
+    ap.add_argument("input", help="input directory")
+    ap.add_argument("output", help="output directory (manifest.jsonl goes here)")
+    ap.add_argument("--policy", default="configs/policy.yaml")
+    ap.add_argument("--mode", default="placeholder")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="worker processes (0 = in-process)")
+    ap.add_argument("--field", default="text", help="JSONL field to redact")
+    ap.add_argument("--no-resume", action="store_true", help="redo every file")
+    ap.add_argument("--verify", action="store_true",
+                    help="check input/output checksums before skipping a file")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    try:
+        counts = run_batch(
+            args.input, args.output,
+            policy_path=args.policy,
+            mode=args.mode,
+            workers=args.workers,
+            field=args.field,
+            resume=not args.no_resume,
+            verify=args.verify,
+        )
+    except KeyboardInterrupt:
+        # everything finished so far is in the manifest
+        sys.exit(130)
+    print(json.dumps(counts))
+    sys.exit(1 if counts["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
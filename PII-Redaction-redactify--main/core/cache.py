@@ -0,0 +1,289 @@
+# core/cache.py
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import regex as re
+
+from .metrics import METRICS
+from .span_batch import SpanBatch
+
+# (start, end, ent, conf, source), offsets relative to the paragraph
+CachedSpan = Tuple[int, int, str, float, str]
+
+# Paragraphs are separated by a blank line (possibly with spaces on it)
+_PARAGRAPH_BREAK_RE = re.compile(r"\n[ \t]*\n\s*")
+
+
+# ---------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------
+class DetectionCache:
+    """Maps a paragraph key to the spans detected in that paragraph."""
+
+    name = "base"
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[CachedSpan]]:
+        raise NotImplementedError
+
+    def put_many(self, items: Dict[str, List[CachedSpan]]) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(DetectionCache):
+    """
+    In-process LRU, evicting by an estimate of its memory use rather than
+    entry count (one paragraph can have 0 or 50 spans).
+    """
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._data: "OrderedDict[str, Tuple[List[CachedSpan], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cost(key: str, spans: List[CachedSpan]) -> int:
+        # rough: key string + list + one 5-tuple (~120 bytes) per span
+        return 100 + len(key) + 120 * len(spans)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[CachedSpan]]:
+        found: Dict[str, List[CachedSpan]] = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None:
+                    self._data.move_to_end(key)
+                    found[key] = entry[0]
+        return found
+
+    def put_many(self, items: Dict[str, List[CachedSpan]]) -> None:
+        with self._lock:
+            for key, spans in items.items():
+                old = self._data.pop(key, None)
+                if old is not None:
+                    self.size_bytes -= old[1]
+                cost = self._cost(key, spans)
+                self._data[key] = (spans, cost)
+                self.size_bytes += cost
+            while self.size_bytes > self.max_bytes and self._data:
+                _key, (_spans, cost) = self._data.popitem(last=False)
+                self.size_bytes -= cost
+            METRICS.set_gauge("redactify_cache_bytes", self.size_bytes, backend=self.name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.size_bytes = 0
+
+
+class SqliteCache(DetectionCache):
+    """
+    On-disk cache in a sqlite file (WAL mode), so every worker process
+    and every restart shares the same results. Connections are per
+    thread / per process; the object itself pickles as just its settings.
+
+    Oldest entries (by insertion) are pruned once there are more than
+    max_entries.
+    """
+
+    name = "sqlite"
+    _PRUNE_EVERY = 1000  # puts between prune checks
+
+    def __init__(self, path: str, max_entries: int = 1_000_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._puts = 0
+
+    def __getstate__(self):
+        return {"path": self.path, "max_entries": self.max_entries}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["max_entries"])
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS detections "
+                "(key TEXT PRIMARY KEY, spans TEXT NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[CachedSpan]]:
+        conn = self._conn()
+        found: Dict[str, List[CachedSpan]] = {}
+        keys = list(keys)
+        # stay under SQLITE_MAX_VARIABLE_NUMBER
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            rows = conn.execute(
+                f"SELECT key, spans FROM detections WHERE key IN ({','.join('?' * len(part))})",
+                part,
+            )
+            for key, blob in rows:
+                found[key] = [tuple(s) for s in json.loads(blob)]
+        return found
+
+    def put_many(self, items: Dict[str, List[CachedSpan]]) -> None:
+        if not items:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO detections (key, spans) VALUES (?, ?)",
+                [(k, json.dumps(v, separators=(",", ":"))) for k, v in items.items()],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._puts += len(items)
+        if self._puts >= self._PRUNE_EVERY:
+            self._puts = 0
+            self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        (count,) = conn.execute("SELECT COUNT(*) FROM detections").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM detections WHERE rowid IN "
+                "(SELECT rowid FROM detections ORDER BY rowid LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self) -> None:
+        self._conn().execute("DELETE FROM detections")
+
+
+# ---------------------------------------------------------------------
+# Process-wide cache selection
+# ---------------------------------------------------------------------
+_UNSET = object()
+_cache = _UNSET
+_cache_lock = threading.Lock()
+
+
+def cache_from_env() -> Optional[DetectionCache]:
+    """
+    REDACTIFY_DETECTION_CACHE:
+      - unset / "off": no cache
+      - "memory": in-process LRU of REDACTIFY_CACHE_MB (default 64) MB
+      - "sqlite:/path/to/cache.db": shared on-disk cache
+    """
+    spec = os.getenv("REDACTIFY_DETECTION_CACHE", "off").strip()
+    if not spec or spec == "off":
+        return None
+    if spec == "memory":
+        mb = float(os.getenv("REDACTIFY_CACHE_MB", "64"))
+        return MemoryCache(max_bytes=int(mb * 1024 * 1024))
+    if spec.startswith("sqlite:"):
+        return SqliteCache(spec[len("sqlite:"):] or "cache/detections.db")
+    raise ValueError(f"Unknown REDACTIFY_DETECTION_CACHE: {spec!r}")
+
+
+def get_detection_cache() -> Optional[DetectionCache]:
+    global _cache
+    if _cache is _UNSET:
+        with _cache_lock:
+            if _cache is _UNSET:
+                _cache = cache_from_env()
+    return _cache
+
+
+def set_detection_cache(cache: Optional[DetectionCache]) -> None:
+    """Install a cache (or None to disable) for this process."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+# ---------------------------------------------------------------------
+# Paragraph-level lookup
+# ---------------------------------------------------------------------
+def split_paragraphs(text: str) -> List[Tuple[int, int]]:
+    """(start, end) of each non-blank paragraph in text."""
+    out: List[Tuple[int, int]] = []
+    pos = 0
+    for m in _PARAGRAPH_BREAK_RE.finditer(text):
+        if text[pos:m.start()].strip():
+            out.append((pos, m.start()))
+        pos = m.end()
+    if text[pos:].strip():
+        out.append((pos, len(text)))
+    return out
+
+
+def cache_key(paragraph: str, fingerprint: str, model_version: str) -> str:
+    digest = hashlib.sha256(paragraph.encode("utf-8", "surrogatepass")).hexdigest()
+    return f"{digest}:{fingerprint}:{model_version}"
+
+
+def cached_detect(
+    texts: Sequence[str],
+    cache: DetectionCache,
+    fingerprint: str,
+    model_version: str,
+    detect: Callable[[List[str]], List[SpanBatch]],
+) -> List[SpanBatch]:
+    """
+    Detect spans in each text, one paragraph at a time through the cache.
+
+    Repeated paragraphs (boilerplate, templates, duplicate documents) are
+    looked up; only the misses, deduplicated across all texts, are passed
+    to `detect` in a single call so NER can still batch them.
+    """
+    layout: List[List[Tuple[int, str]]] = []
+    wanted: Dict[str, str] = {}
+    for text in texts:
+        parts = []
+        for start, end in split_paragraphs(text):
+            para = text[start:end]
+            key = cache_key(para, fingerprint, model_version)
+            parts.append((start, key))
+            wanted.setdefault(key, para)
+        layout.append(parts)
+
+    found = cache.get_many(list(wanted))
+    missing = [key for key in wanted if key not in found]
+    METRICS.inc("redactify_cache_hits_total", len(wanted) - len(missing), backend=cache.name)
+    METRICS.inc("redactify_cache_misses_total", len(missing), backend=cache.name)
+
+    if missing:
+        detected = detect([wanted[key] for key in missing])
+        fresh = {key: batch.rows() for key, batch in zip(missing, detected)}
+        cache.put_many(fresh)
+        found.update(fresh)
+
+    results: List[SpanBatch] = []
+    for parts in layout:
+        batch = SpanBatch()
+        for offset, key in parts:
+            batch.extend_rows(found[key], offset)
+        results.append(batch)
+    return results
@@ -0,0 +1,137 @@
+# core/cascade.py
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import regex as re
+
+from .detect_ner import DEFAULT_BATCH_SIZE, _needs_ner, ner_batch, ner_batches
+from .metrics import METRICS
+from .policy import Policy
+from .span_batch import SpanBatch
+
+DEFAULT_MIN_ALPHA = 0.5
+DEFAULT_MAX_TOKEN = 40
+
+# PERSON / GPE / LOC / FAC spans start with a capitalized word, and so do
+# most DATEs ("March 3"); the lower-case month names cover the rest.
+_NAMEISH_RE = re.compile(
+    r"\b\p{Lu}\p{Ll}"
+    r"|\b(?:january|february|march|april|june|july|august|september|october|november|december)\b"
+)
+# Stack trace frames: capitalized, but never a named entity worth NER
+_TRACE_RE = re.compile(
+    r'^\s*(?:File "[^"]*", line \d+'
+    r"|at [\w$.<>/]+\(.*\)"
+    r"|Traceback \(most recent call last\)"
+    r"|Caused by: [\w$.]+"
+    r"|\.\.\. \d+ more)"
+)
+_NON_LETTER_RE = re.compile(r"[^\p{L}]+")
+_LINE_RE = re.compile(r"[^\n]+")
+
+Run = Tuple[int, int]
+
+
+class NerRouter:
+    """
+    Cheap pre-filter in front of NER.
+
+    Text is looked at line by line. A line goes to NER only if it could
+    hold a PERSON / GPE / LOC / FAC / DATE worth finding:
+    - it has a capitalized word (or a month name),
+    - it isn't a stack trace frame,
+    - after dropping tokens longer than `max_token` (base64, hashes,
+      URLs), at least `min_alpha` of its non-space chars are letters
+      (so numeric tables and hex dumps stay out).
+    Consecutive NER lines are joined into one run so spaCy keeps their
+    context; everything else only gets the regex / dictionary tiers.
+    """
+
+    def __init__(self, min_alpha: float = DEFAULT_MIN_ALPHA, max_token: int = DEFAULT_MAX_TOKEN):
+        self.min_alpha = min_alpha
+        self.max_token = max_token
+
+    def __reduce__(self):
+        return (NerRouter, (self.min_alpha, self.max_token))
+
+    def plausible(self, line: str) -> bool:
+        if not _NAMEISH_RE.search(line) or _TRACE_RE.match(line):
+            return False
+        tokens = [t for t in line.split() if len(t) <= self.max_token]
+        kept = "".join(tokens)
+        if not kept or not _NAMEISH_RE.search(" ".join(tokens)):
+            return False
+        letters = len(_NON_LETTER_RE.sub("", kept))
+        return letters >= self.min_alpha * len(kept)
+
+    def route(self, text: str) -> List[Run]:
+        """(start, end) runs of text to send to NER, in order."""
+        runs: List[Run] = []
+        lines = {"ner": 0, "skip": 0}
+        for m in _LINE_RE.finditer(text):
+            start, end = m.span()
+            if not self.plausible(m.group()):
+                lines["skip"] += 1
+                continue
+            lines["ner"] += 1
+            if runs and _joins(text, runs[-1][1], start):
+                runs[-1] = (runs[-1][0], end)
+            else:
+                runs.append((start, end))
+        routed = sum(e - s for s, e in runs)
+        METRICS.inc("redactify_ner_route_chars_total", routed, route="ner")
+        METRICS.inc("redactify_ner_route_chars_total", len(text) - routed, route="skip")
+        for route, n in lines.items():
+            METRICS.inc("redactify_ner_route_lines_total", n, route=route)
+        return runs
+
+
+def _joins(text: str, prev_end: int, start: int) -> bool:
+    # only a single line break between them (a blank line ends the run)
+    return text.count("\n", prev_end, start) <= 1
+
+
+def router_for(policy: Policy) -> Optional[NerRouter]:
+    """The policy's router, or None when the cascade is off."""
+    router = getattr(policy, "router", None)
+    if router is not None:
+        return router
+    if not getattr(policy, "ner_cascade", False):
+        return None
+    return NerRouter(policy.ner_cascade_min_alpha, policy.ner_cascade_max_token)
+
+
+def _shifted(runs: Sequence[Run], found: Iterable[SpanBatch]) -> SpanBatch:
+    batch = SpanBatch()
+    for (start, _end), part in zip(runs, found):
+        batch.extend(part, offset=start)
+    return batch
+
+
+def routed_ner_batch(text: str, policy: Policy) -> SpanBatch:
+    """ner_batch, run only on the runs the policy's router lets through."""
+    router = router_for(policy)
+    if router is None or not _needs_ner(policy):
+        return ner_batch(text, policy)
+    runs = router.route(text)
+    if runs == [(0, len(text))]:
+        return ner_batch(text, policy)
+    return _shifted(runs, ner_batches([text[s:e] for s, e in runs], policy))
+
+
+def routed_ner_batches(
+    texts: Sequence[str],
+    policy: Policy,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    n_process: int = 1,
+) -> List[SpanBatch]:
+    """ner_batches through the router; all texts' runs share one batched call."""
+    router = router_for(policy)
+    if router is None or not _needs_ner(policy):
+        return ner_batches(texts, policy, batch_size=batch_size, n_process=n_process)
+    per_text = [router.route(t) for t in texts]
+    pieces = [t[s:e] for t, runs in zip(texts, per_text) for s, e in runs]
+    found = iter(ner_batches(pieces, policy, batch_size=batch_size, n_process=n_process))
+    return [_shifted(runs, [next(found) for _ in runs]) for runs in per_text]
@@ -0,0 +1,68 @@
+# core/chunking.py
+
+from __future__ import annotations
+
+from typing import Iterator, Tuple
+
+import regex as re
+
+
+# Preferred cut points, best first. (?r) makes `regex` search backwards,
+# so finding the last cut in a window doesn't scan the whole window.
+_CUT_PATTERNS = (
+    re.compile(r"(?r)\n[ \t]*\n"),          # paragraph break
+    re.compile(r"(?r)[.!?][\"')\]]*\s"),     # sentence end
+    re.compile(r"(?r)\s"),                    # any whitespace
+)
+_WHITESPACE_RE = re.compile(r"\s")
+
+
+def _last_cut(pattern: re.Pattern, text: str, lo: int, hi: int) -> int:
+    """End offset of the last match of pattern inside text[lo:hi], or -1."""
+    m = pattern.search(text, lo, hi)
+    return m.end() if m else -1
+
+
+def iter_chunks(
+    text: str,
+    chunk_size: int,
+    overlap: int = 0,
+) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) windows covering text, each at most chunk_size long.
+
+    Cuts prefer paragraph breaks, then sentence ends, then whitespace,
+    looking only at the second half of the window so chunks don't shrink
+    too much. Consecutive windows share roughly `overlap` characters,
+    starting on a word boundary, so an entity cut at one window's edge is
+    seen whole in the next.
+    """
+    n = len(text)
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    overlap = max(0, min(overlap, chunk_size // 2))
+
+    start = 0
+    while start < n:
+        hard_end = start + chunk_size
+        if hard_end >= n:
+            yield start, n
+            return
+
+        lo = start + chunk_size // 2
+        cut = -1
+        for pattern in _CUT_PATTERNS:
+            cut = _last_cut(pattern, text, lo, hard_end)
+            if cut > start:
+                break
+        if cut <= start:
+            cut = hard_end
+
+        yield start, cut
+
+        next_start = cut
+        if overlap:
+            back = cut - overlap
+            ws = _WHITESPACE_RE.search(text, back, cut)
+            next_start = ws.end() if ws else back
+        start = max(next_start, start + 1)
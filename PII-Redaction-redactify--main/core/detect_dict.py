@@ -0,0 +1,462 @@
+# core/detect_dict.py
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from core.policy import DictionarySpec, Policy
+from core.span_batch import SpanBatch, name_id
+
+logger = logging.getLogger("core")
+
+# Compiled automata live here, one file per (term files, options)
+DEFAULT_DIR = "cache/dict"
+
+_MAGIC = b"RDXDICT1"
+_FORMAT_VERSION = 1
+_SECTIONS = ("tlo", "tcls", "tto", "fail", "depth", "out", "olink")
+_SPACE = -1  # class of any whitespace char before run-collapsing
+# Per-process transition memo: a small hot set, on top of the shared
+# mmap'd automaton (which is what _step falls back to)
+_GOTO_CACHE = 1 << 14
+
+
+# ---------------------------------------------------------------------
+# Normalization (identical for terms and scanned text)
+# ---------------------------------------------------------------------
+def _fold(ch: str) -> str:
+    # Char by char, so offsets in the text stay 1:1 with the automaton;
+    # the few chars whose lower() is longer (e.g. "İ") are kept as-is.
+    low = ch.lower()
+    return low if len(low) == 1 else ch
+
+
+def normalize_term(term: str, case_sensitive: bool = False) -> str:
+    """Whitespace runs -> one space, ends stripped, lower-cased unless case_sensitive."""
+    term = " ".join(term.split())
+    if case_sensitive:
+        return term
+    return "".join(_fold(c) for c in term)
+
+
+def read_terms(path: str) -> Iterator[str]:
+    """One term per line (UTF-8); blank lines and # comments are skipped."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+# ---------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------
+def build_automaton(specs: Sequence[DictionarySpec], case_sensitive: bool) -> Tuple[dict, Dict[str, array]]:
+    """
+    Aho-Corasick automaton over all terms of specs, as flat uint32 arrays.
+
+    States are numbered breadth-first. Transitions are stored CSR-style:
+    the transitions of state s are tcls/tto[tlo[s]:tlo[s + 1]], sorted by
+    character class, so a lookup is a bisect. out[s] is the dictionary
+    index + 1 of the term ending at s (0: none) and olink[s] the next
+    state with an output on s's failure chain.
+
+    The trie is built level by level from the sorted terms, which gives
+    breadth-first numbering and sorted, contiguous transitions without a
+    dict per node.
+    """
+    terms: Dict[str, int] = {}
+    for d_idx, spec in enumerate(specs):
+        for path in spec.paths:
+            for term in read_terms(path):
+                # first dictionary listing a term wins
+                terms.setdefault(normalize_term(term, case_sensitive), d_idx)
+
+    alphabet = sorted({c for t in terms for c in t})
+    cls = {c: i + 1 for i, c in enumerate(alphabet)}
+    words = sorted(terms)
+    owner = [terms[w] for w in words]
+    del terms
+
+    node = array("I", [0]) * len(words)
+    tparent, tcls, tto = array("I"), array("I"), array("I")
+    depth, out = array("I", [0]), array("I", [0])
+    n_states = 1
+
+    active = range(len(words))
+    d = 0
+    while active:
+        remaining = []
+        prev_parent, prev_ch, cur = -1, "", 0
+        for t in active:
+            w = words[t]
+            ch = w[d]
+            parent = node[t]
+            if parent != prev_parent or ch != prev_ch:
+                cur = n_states
+                n_states += 1
+                tparent.append(parent)
+                tcls.append(cls[ch])
+                tto.append(cur)
+                depth.append(d + 1)
+                out.append(0)
+                prev_parent, prev_ch = parent, ch
+            node[t] = cur
+            if len(w) == d + 1:
+                out[cur] = owner[t] + 1
+            else:
+                remaining.append(t)
+        active = remaining
+        d += 1
+
+    tlo = array("I", [0]) * (n_states + 1)
+    for p in tparent:
+        tlo[p + 1] += 1
+    for s in range(n_states):
+        tlo[s + 1] += tlo[s]
+
+    fail = array("I", [0]) * n_states
+    olink = array("I", [0]) * n_states
+    for j in range(len(tto)):
+        parent, c, v = tparent[j], tcls[j], tto[j]
+        f = 0
+        if parent:
+            f = fail[parent]
+            while True:
+                lo, hi = tlo[f], tlo[f + 1]
+                k = bisect_left(tcls, c, lo, hi)
+                if k < hi and tcls[k] == c:
+                    f = tto[k]
+                    break
+                if not f:
+                    break
+                f = fail[f]
+        fail[v] = f
+        olink[v] = f if out[f] else olink[f]
+
+    header = {
+        "version": _FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "case_sensitive": case_sensitive,
+        "alphabet": "".join(alphabet),
+        "max_depth": d,
+        "n_terms": len(words),
+        "n_states": n_states,
+        "dictionaries": [
+            {
+                "name": s.name,
+                "entity": s.entity,
+                "confidence": s.confidence,
+                "word_boundary": s.word_boundary,
+            }
+            for s in specs
+        ],
+    }
+    arrays = {
+        "tlo": tlo, "tcls": tcls, "tto": tto, "fail": fail,
+        "depth": depth, "out": out, "olink": olink,
+    }
+    return header, arrays
+
+
+def write_automaton(path: str, header: dict, arrays: Dict[str, array]) -> None:
+    """Serialize atomically (write a temp file, then rename over path)."""
+    sections = {}
+    offset = 0
+    for name in _SECTIONS:
+        sections[name] = [offset, len(arrays[name])]
+        offset += len(arrays[name]) * 4
+    blob = json.dumps(dict(header, sections=sections)).encode("utf-8")
+    pad = -(16 + len(blob)) % 8
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<Q", len(blob) + pad))
+        f.write(blob + b" " * pad)
+        for name in _SECTIONS:
+            arrays[name].tofile(f)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------
+# Matching
+# ---------------------------------------------------------------------
+class DictMatcher:
+    """
+    A compiled automaton, memory-mapped read-only: every worker process
+    that loads the same file shares its pages through the OS page cache.
+    Pickles as its path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != _MAGIC:
+            raise ValueError(f"{path}: not a dictionary automaton")
+        (header_len,) = struct.unpack("<Q", self._mm[8:16])
+        header = json.loads(self._mm[16:16 + header_len].decode("utf-8"))
+        if header["version"] != _FORMAT_VERSION or header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path}: built for another format / byte order")
+        self.header = header
+
+        view = memoryview(self._mm)[16 + header_len:]
+        for name, (offset, count) in header["sections"].items():
+            setattr(self, f"_{name}", view[offset:offset + count * 4].cast("I"))
+
+        self.case_sensitive: bool = header["case_sensitive"]
+        self._alphabet = {c: i + 1 for i, c in enumerate(header["alphabet"])}
+        self._space = self._alphabet.get(" ", 0)
+        # ring buffer of text offsets, long enough for the longest term
+        self._ring_mask = (1 << max(1, header["max_depth"]).bit_length()) - 1
+        self._dicts = [
+            (name_id(d["entity"]), d["confidence"], d["word_boundary"], name_id(d["name"]))
+            for d in header["dictionaries"]
+        ]
+        self._source = name_id("dict")
+        # char -> class (0: in no term, _SPACE: whitespace), filled lazily.
+        # Whitespace is left to _classify even when " " is in the alphabet,
+        # or a literal space would skip the run-collapsing in scan().
+        self._classes: Dict[str, int] = {
+            ch: c for ch, c in self._alphabet.items() if not ch.isspace()
+        }
+        # (state, class) -> next state for the transitions texts actually
+        # take; bounded, the automaton itself stays on disk
+        self._width = len(self._alphabet) + 1
+        self._goto: Dict[int, int] = {}
+
+    def __reduce__(self):
+        return (load_matcher, (self.path,))
+
+    def _classify(self, ch: str) -> int:
+        if ch.isspace():
+            c = _SPACE
+        else:
+            c = self._alphabet.get(ch if self.case_sensitive else _fold(ch), 0)
+        self._classes[ch] = c
+        return c
+
+    def _step(self, state: int, c: int) -> int:
+        """Follow class c from state (failure links as needed)."""
+        tlo, tcls, tto, fail = self._tlo, self._tcls, self._tto, self._fail
+        while True:
+            lo, hi = tlo[state], tlo[state + 1]
+            if lo < hi:
+                j = bisect_left(tcls, c, lo, hi)
+                if j < hi and tcls[j] == c:
+                    return tto[j]
+            if not state:
+                return 0
+            state = fail[state]
+
+    def scan(self, text: str) -> SpanBatch:
+        """All term occurrences in text (overlapping ones included)."""
+        batch = SpanBatch()
+        depth, out, olink = self._depth, self._out, self._olink
+        classes = self._classes
+        classify = self._classify
+        space = self._space
+        mask = self._ring_mask
+        ring = [0] * (mask + 1)
+        dicts = self._dicts
+        goto = self._goto
+        width = self._width
+        n = len(text)
+
+        state = 0
+        fed = 0
+        in_space = False
+        for i, ch in enumerate(text):
+            c = classes.get(ch)
+            if c is None:
+                c = classify(ch)
+            if c == _SPACE:
+                if in_space:
+                    continue
+                in_space = True
+                c = space
+            else:
+                in_space = False
+            if not c:
+                state = 0
+                continue
+
+            fed += 1
+            ring[fed & mask] = i
+            key = state * width + c
+            nxt = goto.get(key)
+            if nxt is None:
+                nxt = self._step(state, c)
+                if len(goto) < _GOTO_CACHE:
+                    goto[key] = nxt
+            state = nxt
+            if not (out[state] or olink[state]):
+                continue
+
+            o = state if out[state] else olink[state]
+            while o:
+                ent, conf, boundary, label = dicts[out[o] - 1]
+                start = ring[(fed - depth[o] + 1) & mask]
+                end = i + 1
+                if not boundary or (
+                    (start == 0 or not text[start - 1].isalnum())
+                    and (end == n or not text[end].isalnum())
+                ):
+                    batch.starts.append(start)
+                    batch.ends.append(end)
+                    batch.ents.append(ent)
+                    batch.confs.append(conf)
+                    batch.sources.append(self._source)
+                    batch.labels.append(label)
+                o = olink[o]
+        return batch
+
+
+# ---------------------------------------------------------------------
+# Policy integration
+# ---------------------------------------------------------------------
+_MATCHERS: Dict[str, DictMatcher] = {}
+_lock = threading.Lock()
+
+
+def _dict_dir() -> str:
+    return os.getenv("REDACTIFY_DICT_CACHE", DEFAULT_DIR)
+
+
+def load_matcher(path: str) -> DictMatcher:
+    """Open (once per process) the automaton at path."""
+    matcher = _MATCHERS.get(path)
+    if matcher is None:
+        with _lock:
+            matcher = _MATCHERS.get(path)
+            if matcher is None:
+                matcher = _MATCHERS[path] = DictMatcher(path)
+    return matcher
+
+
+def _groups(policy: Policy) -> List[Tuple[bool, Tuple[DictionarySpec, ...]]]:
+    # one automaton per normalization, covering all its dictionaries
+    specs = getattr(policy, "dictionaries", None) or ()
+    groups = []
+    for case_sensitive in (False, True):
+        group = tuple(s for s in specs if s.case_sensitive == case_sensitive)
+        if group:
+            groups.append((case_sensitive, group))
+    return groups
+
+
+def _stamps(specs: Sequence[DictionarySpec]) -> Tuple[Tuple[str, int, int], ...]:
+    # term files are identified like policy files: (path, mtime, size)
+    files = []
+    for spec in specs:
+        for path in spec.paths:
+            st = os.stat(path)
+            files.append((os.path.abspath(path), st.st_mtime_ns, st.st_size))
+    return tuple(files)
+
+
+def term_files(policy: Policy) -> Tuple[Tuple[str, int, int], ...]:
+    """(path, mtime_ns, size) of every term file the policy references."""
+    return _stamps(getattr(policy, "dictionaries", None) or ())
+
+
+def _source_key(case_sensitive: bool, specs: Tuple[DictionarySpec, ...]) -> tuple:
+    return (_FORMAT_VERSION, case_sensitive, specs, _stamps(specs))
+
+
+def _automaton_path(key: tuple) -> str:
+    digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:24]
+    return os.path.join(_dict_dir(), f"{digest}.ac")
+
+
+def matchers_for(policy: Policy) -> List[Tuple[str, DictMatcher]]:
+    """
+    (version, matcher) for each automaton the policy needs, building and
+    saving any that aren't on disk yet. Term files that changed on disk
+    get a new automaton.
+
+    This stats every term file; compile_policy calls it once and keeps
+    the result (CompiledPolicy.dict_matchers), so scans don't.
+    """
+    found = []
+    for case_sensitive, specs in _groups(policy):
+        key = _source_key(case_sensitive, specs)
+        path = _automaton_path(key)
+        if not os.path.exists(path):
+            t0 = time.perf_counter()
+            header, arrays = build_automaton(specs, case_sensitive)
+            write_automaton(path, header, arrays)
+            logger.info(
+                "Built dictionary automaton %s: %d terms, %d states in %.1fs",
+                path, header["n_terms"], header["n_states"], time.perf_counter() - t0,
+            )
+        found.append((os.path.basename(path)[:-3], load_matcher(path)))
+    return found
+
+
+def _matchers(policy: Policy) -> Sequence[Tuple[str, DictMatcher]]:
+    compiled = getattr(policy, "dict_matchers", None)
+    if compiled is not None:
+        return compiled
+    return matchers_for(policy)
+
+
+def needs_dict(policy: Policy) -> bool:
+    return bool(getattr(policy, "dictionaries", None))
+
+
+def dict_batch(text: str, policy: Policy) -> SpanBatch:
+    """Dictionary hits in text (source "dict", label = dictionary name)."""
+    if not needs_dict(policy):
+        return SpanBatch()
+    batch = SpanBatch()
+    for _version, matcher in _matchers(policy):
+        batch.extend(matcher.scan(text))
+    return batch
+
+
+def dictionary_version(policy: Policy) -> Optional[str]:
+    """Identifies the automata in use (part of detection cache keys)."""
+    if not needs_dict(policy):
+        return None
+    return "+".join(version for version, _ in _matchers(policy))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(
+        description="Build (or reuse) the dictionary automata a policy references."
+    )
+    ap.add_argument("--policy", default="configs/policy.yaml")
+    args = ap.parse_args(argv)
+
+    from core.registry import get_policy
+
+    policy = get_policy(args.policy)
+    for version, matcher in matchers_for(policy):
+        h = matcher.header
+        print(json.dumps({
+            "path": matcher.path,
+            "dictionaries": [d["name"] for d in h["dictionaries"]],
+            "terms": h["n_terms"],
+            "states": h["n_states"],
+            "mb": round(os.path.getsize(matcher.path) / 1e6, 2),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,178 @@
 from __future__ import annotations
 
-from typing import List, Optional
+import threading
+import time
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from core.metrics import METRICS
 from core.models import Span
-from core.policy import Policy
+from core.policy import NerSpec, Policy
+from core.span_batch import SpanBatch
 
-import spacy
+if TYPE_CHECKING:
+    import spacy
+
+# spaCy itself is imported inside _get_nlp: importing it costs most of a
+# second, which regex-only users, the CLI and every spawned worker would
+# otherwise pay up front.
 
 # Lazy-loaded spaCy model so import doesn't blow up if it's missing at install time
 _NLP = None
 
+MODEL_NAME = "en_core_web_sm"
+
+# Only doc.ents is used. These components never feed the entity
+# recognizer, so they're not even loaded.
+_UNUSED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+
+DEFAULT_BATCH_SIZE = 64
+
 
 def _get_nlp() -> "spacy.language.Language":
     global _NLP
     if _NLP is None:
+        import spacy
+
         # Use the small English model; you can swap for a clinical model later
-        _NLP = spacy.load("en_core_web_sm")
+        t0 = time.perf_counter()
+        nlp = spacy.load(MODEL_NAME, exclude=_UNUSED_PIPES)
+        # The shared tok2vec is only needed if ner listens to it
+        # (in en_core_web_sm ner carries its own embedding layer).
+        if "tok2vec" in nlp.pipe_names:
+            listeners = nlp.get_pipe("tok2vec").listening_components
+            if "ner" not in listeners:
+                nlp.remove_pipe("tok2vec")
+        METRICS.set_gauge("redactify_model_load_seconds", time.perf_counter() - t0, model=MODEL_NAME)
+        _NLP = nlp
     return _NLP
 
 
+@lru_cache(maxsize=None)
+def _installed_model_version() -> str:
+    try:
+        return f"{MODEL_NAME}-{version(MODEL_NAME)}"
+    except PackageNotFoundError:
+        return MODEL_NAME
+
+
+def model_version(policy: Policy) -> str:
+    """
+    Identifies what NER would produce for this policy (part of detection
+    cache keys). Read from package metadata, so the model isn't loaded.
+    """
+    if not _needs_ner(policy):
+        return "none"
+    return ner_backend(policy).version()
+
+
+# ---------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------
+# (start, end, model label, confidence)
+Entity = Tuple[int, int, str, float]
+
+
+class NerBackend:
+    """
+    An NER model as detect_ner uses it. Backends return entities with the
+    model's own labels; mapping those onto policy entities (LABEL_TO_ENTITY)
+    happens here, so a backend knows nothing about policies.
+
+    Constructing one must be cheap: the model is loaded by load(), or on
+    the first predict().
+    """
+
+    def version(self) -> str:
+        """Model + settings identity, for detection cache keys."""
+        raise NotImplementedError
+
+    def load(self) -> None:
+        """Load the model now instead of on first use."""
+
+    def predict(
+        self, texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE, n_process: int = 1
+    ) -> List[List[Entity]]:
+        """Entities per text, in input order."""
+        raise NotImplementedError
+
+    def predict_one(self, text: str) -> List[Entity]:
+        return self.predict([text], batch_size=1)[0]
+
+
+class SpacyBackend(NerBackend):
+    """en_core_web_sm (the default); every entity gets BASE_CONFIDENCE."""
+
+    def __init__(self, spec: NerSpec):
+        if spec.model not in (None, MODEL_NAME):
+            raise ValueError(f"spacy backend only ships {MODEL_NAME}, not {spec.model!r}")
+
+    def version(self) -> str:
+        return _installed_model_version()
+
+    def load(self) -> None:
+        _get_nlp()
+
+    def predict(
+        self, texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE, n_process: int = 1
+    ) -> List[List[Entity]]:
+        nlp = _get_nlp()
+        return [
+            _doc_entities(doc)
+            for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+        ]
+
+    def predict_one(self, text: str) -> List[Entity]:
+        return _doc_entities(_get_nlp()(text))
+
+
+def _doc_entities(doc) -> List[Entity]:
+    return [(e.start_char, e.end_char, e.label_, BASE_CONFIDENCE) for e in doc.ents]
+
+
+def _transformer_backend(spec: NerSpec) -> NerBackend:
+    # torch / transformers are only imported by policies that ask for them
+    from core.ner_transformer import TransformerBackend
+
+    return TransformerBackend(spec)
+
+
+_BACKEND_FACTORIES: Dict[str, Callable[[NerSpec], NerBackend]] = {
+    "spacy": SpacyBackend,
+    "transformer": _transformer_backend,
+}
+_BACKENDS: Dict[NerSpec, NerBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def register_backend(name: str, factory: Callable[[NerSpec], NerBackend]) -> None:
+    """Make `ner.backend: <name>` available to policies."""
+    with _backends_lock:
+        _BACKEND_FACTORIES[name] = factory
+        for spec in [s for s in _BACKENDS if s.backend == name]:
+            del _BACKENDS[spec]
+
+
+def ner_backend(policy: Policy) -> NerBackend:
+    """The (process-wide, shared) backend for the policy's ner settings."""
+    spec = getattr(policy, "ner", None) or NerSpec()
+    backend = _BACKENDS.get(spec)
+    if backend is None:
+        with _backends_lock:
+            backend = _BACKENDS.get(spec)
+            if backend is None:
+                factory = _BACKEND_FACTORIES.get(spec.backend)
+                if factory is None:
+                    known = ", ".join(sorted(_BACKEND_FACTORIES))
+                    raise ValueError(f"Unknown ner.backend {spec.backend!r} (have: {known})")
+                backend = _BACKENDS[spec] = factory(spec)
+    return backend
+
+
 # Map spaCy NER labels -> your internal entity IDs
 LABEL_TO_ENTITY = {
     "PERSON": "PERSON_NAME",
+    "PER": "PERSON_NAME",  # CoNLL-style transformer models
     "GPE": "ADDRESS",   # countries, cities, states
     "LOC": "ADDRESS",   # general locations
     "FAC": "ADDRESS",   # facilities (can contain hospital names/locations)
@@ -39,36 +191,77 @@ def _map_label(label: str, policy: Policy) -> Optional[str]:
     return ent
 
 
+def _needs_ner(policy: Policy) -> bool:
+    ner_entities = getattr(policy, "ner_entities", None)
+    if ner_entities is not None:
+        return bool(ner_entities)
+    return any(ent in policy.entities for ent in LABEL_TO_ENTITY.values() if ent)
+
+
+# spaCy doesn't expose per-entity probs by default, so every label gets
+# this fixed confidence; policies calibrate it per label (scoring.label_confidence).
+BASE_CONFIDENCE = 0.85
+
+
+def _entity_batch(entities: Iterable[Entity], policy: Policy) -> SpanBatch:
+    batch = SpanBatch()
+    for start, end, label, conf in entities:
+        mapped = _map_label(label, policy)
+        if mapped is None:
+            continue
+        batch.append(start, end, mapped, conf, "ner", label)
+    return batch
+
+
+def ner_batch(text: str, policy: Policy) -> SpanBatch:
+    """NER candidates as a SpanBatch (label = model label), unthresholded."""
+    if not _needs_ner(policy):
+        # Nothing in the policy can come out of NER; don't load the model
+        return SpanBatch()
+    return _entity_batch(ner_backend(policy).predict_one(text), policy)
+
+
+def ner_batches(
+    texts: Iterable[str],
+    policy: Policy,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    n_process: int = 1,
+) -> List[SpanBatch]:
+    """
+    Batched version of ner_batch (nlp.pipe for spaCy).
+
+    Returns one batch per input text, in input order. n_process > 1
+    forks spaCy worker processes; only worth it for large batches.
+    Transformer backends batch by their own ner.batch_size instead.
+    """
+    texts = list(texts)
+    if not _needs_ner(policy):
+        return [SpanBatch() for _ in texts]
+
+    found = ner_backend(policy).predict(texts, batch_size=batch_size, n_process=n_process)
+    return [_entity_batch(entities, policy) for entities in found]
+
+
 def ner_spans(text: str, policy: Policy) -> List[Span]:
     """
-    Use spaCy NER to detect unstructured PII:
+    Use the policy's NER backend (spaCy by default) to detect unstructured PII:
     - PERSON -> PERSON_NAME
     - GPE/LOC/FAC -> ADDRESS
     - DATE -> DOB (heuristically)
 
     All processing is local; no external calls.
     """
-    nlp = _get_nlp()
-    doc = nlp(text)
-
-    spans: List[Span] = []
-
-    for ent in doc.ents:
-        mapped = _map_label(ent.label_, policy)
-        if mapped is None:
-            continue
-
-        # spaCy doesn't expose per-entity probs by default, so we give a
-        # reasonable fixed confidence; you can tune this per-label if you want.
-        base_conf = 0.85
+    return ner_batch(text, policy).to_spans()
 
-        span = Span(
-            start=ent.start_char,
-            end=ent.end_char,
-            ent=mapped,
-            conf=base_conf,
-            source="ner",
-        )
-        spans.append(span)
 
-    return spans
\ No newline at end of file
+def ner_spans_batch(
+    texts: Iterable[str],
+    policy: Policy,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    n_process: int = 1,
+) -> List[List[Span]]:
+    """ner_spans for many texts, batched, in input order."""
+    return [
+        b.to_spans()
+        for b in ner_batches(texts, policy, batch_size=batch_size, n_process=n_process)
+    ]
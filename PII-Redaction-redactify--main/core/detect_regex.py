@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import re as std_re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
 import regex as re
-from typing import List
 from core.models import Span
 from core.policy import Policy
-from core.validators import luhn_ok
+from core.span_batch import SpanBatch
+from core.validators import luhn_ok, ssn_ok
 
 
 EMAIL_RE = re.compile(r"\b[^\s@]+@[^\s@]+\.[^\s@]+\b")
@@ -21,75 +25,174 @@ DATE_RE = re.compile(
 )
 CREDIT_CARD_RE = re.compile(r"\b(?:\d[ -]*?){13,19}\b")
 
+# Entity IDs this module knows how to detect
+REGEX_ENTITIES = ("EMAIL", "PHONE", "SSN_US", "DOB", "CREDIT_CARD")
 
-def find_regex_spans(text: str, policy: Policy) -> List[Span]:
-    spans: List[Span] = []
-
-    # Email
-    if "EMAIL" in policy.entities:
-        for m in EMAIL_RE.finditer(text):
-            spans.append(
-                Span(
-                    start=m.start(),
-                    end=m.end(),
-                    ent="EMAIL",
-                    conf=0.99,
-                    source="regex",
-                )
-            )
+_NON_DIGIT_RE = re.compile(r"\D")
+_SPACE_RE = std_re.compile(r"\s")
 
-    # Phone
-    if "PHONE" in policy.entities:
-        for m in PHONE_RE.finditer(text):
-            spans.append(
-                Span(
-                    start=m.start(),
-                    end=m.end(),
-                    ent="PHONE",
-                    conf=0.98,
-                    source="regex",
-                )
-            )
 
-    # SSN
-    if "SSN_US" in policy.entities:
-        for m in SSN_RE.finditer(text):
-            spans.append(
-                Span(
-                    start=m.start(),
-                    end=m.end(),
-                    ent="SSN_US",
-                    conf=0.99,
-                    source="regex",
-                )
-            )
+# ---------------------------------------------------------------------
+# Single-pass scanner
+# ---------------------------------------------------------------------
+# Pattern bodies without the leading \b, which is hoisted in front of the
+# whole alternation. SSN area/group/serial exclusions live in ssn_ok().
+_BODIES: Dict[str, str] = {
+    "SSN_US": r"\d{3}[- ]?\d{2}[- ]?\d{4}\b",
+    "CREDIT_CARD": r"(?:\d[ -]*?){13,19}\b",
+    "PHONE": r"(?:\+?1[-.\s]?)?(?:\(?\d{3}\)?[-.\s]?)\d{3}[-.\s]?\d{4}\b",
+    "DOB": r"(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2})\b",
+    "EMAIL": r"[^\s@]++@[^\s@]+\.[^\s@]+\b",
+}
+
+# The combined scanner is compiled with the stdlib engine: for this
+# alternation it runs ~2x faster than the `regex` module (per-position
+# overhead dominates), and the patterns use nothing regex-specific.
+
+# Branches that can only start on a digit / '+' / '('. They're grouped
+# behind one cheap lookahead so most positions are rejected in one step.
+_NUMERIC = ("SSN_US", "CREDIT_CARD", "PHONE", "DOB")
+
+_CONFIDENCE: Dict[str, float] = {
+    "EMAIL": 0.99,
+    "PHONE": 0.98,
+    "SSN_US": 0.99,
+    "DOB": 0.7,
+    "CREDIT_CARD": 0.99,
+}
+
+
+def _valid_ssn(value: str) -> bool:
+    return ssn_ok(_NON_DIGIT_RE.sub("", value))
+
+
+def _valid_credit_card(value: str) -> bool:
+    digits = _NON_DIGIT_RE.sub("", value)
+    return 13 <= len(digits) <= 19 and luhn_ok(digits)
+
+
+_VALIDATORS: Dict[str, Callable[[str], bool]] = {
+    "SSN_US": _valid_ssn,
+    "CREDIT_CARD": _valid_credit_card,
+}
+
+
+class RegexScanner:
+    """
+    One combined alternation (one named group per entity) for a fixed set
+    of entities. The text is scanned once; each hit is dispatched on
+    ``m.lastgroup`` to the entity's post-validator.
 
-    # Date of birth (generic date pattern; policy can treat it as DOB)
-    if "DOB" in policy.entities:
-        for m in DATE_RE.finditer(text):
-            spans.append(
-                Span(
-                    start=m.start(),
-                    end=m.end(),
-                    ent="DOB",
-                    conf=0.7,
-                    source="regex",
-                )
+    If a validator rejects a hit, the branches that come after it in the
+    alternation are retried at the same position, which is exactly what
+    the regex engine would have done had the validator been part of the
+    pattern.
+
+    The numeric branches win the alternation, but an address like
+    2125551234@vtext.com must still come out as an EMAIL: after each
+    numeric hit, EMAIL is also tried over the hit's run of non-space
+    text, and both candidates go to the resolver.
+    """
+
+    def __init__(self, entities: Sequence[str]):
+        wanted = set(entities)
+        numeric = [e for e in _NUMERIC if e in wanted]
+        order: List[str] = list(numeric)
+        branches: List[str] = []
+        if numeric:
+            branches.append(
+                r"(?=[\d+(])(?:"
+                + "|".join(f"(?P<{e}>{_BODIES[e]})" for e in numeric)
+                + ")"
             )
+        if "EMAIL" in wanted:
+            order.append("EMAIL")
+            branches.append(f"(?P<EMAIL>{_BODIES['EMAIL']})")
+
+        self.entities: Tuple[str, ...] = tuple(order)
+        self.pattern: Optional[std_re.Pattern] = (
+            std_re.compile(r"\b(?:" + "|".join(branches) + ")") if branches else None
+        )
+        # Stand-alone versions, only used to retry after a validator reject
+        self._single = {e: std_re.compile(r"\b" + _BODIES[e]) for e in order}
+        self._email = self._single["EMAIL"] if numeric and "EMAIL" in wanted else None
+
+    def scan(self, text: str) -> List[Tuple[int, int, str]]:
+        """Return (start, end, entity) hits in text order."""
+        if self.pattern is None:
+            return []
+
+        hits: List[Tuple[int, int, str]] = []
+        search = self.pattern.search
+        pos = 0
+        while True:
+            m = search(text, pos)
+            if m is None:
+                break
+            ent = m.lastgroup
+            start, end = m.span()
+            validator = _VALIDATORS.get(ent)
+            if validator is None or validator(m.group()):
+                hit = (start, end, ent)
+            else:
+                hit = self._retry(text, start, ent)
+                if hit is None:
+                    pos = start + 1
+                    continue
+            hits.append(hit)
+            pos = hit[1]
+            if self._email is not None and hit[2] != "EMAIL":
+                pos = self._overlapping_emails(text, hit, hits)
+        return hits
+
+    def _overlapping_emails(
+        self, text: str, hit: Tuple[int, int, str], hits: List[Tuple[int, int, str]]
+    ) -> int:
+        """Add EMAIL hits overlapping a numeric hit; returns where to resume."""
+        start, end = hit[0], hit[1]
+        # an email has no whitespace, so one overlapping the hit ends
+        # before the first whitespace at or after its end
+        ws = _SPACE_RE.search(text, end)
+        stop = ws.start() if ws else len(text)
+        pos = end
+        search = self._email.search
+        m = search(text, start, stop)
+        while m is not None and m.start() < end:
+            hits.append((m.start(), m.end(), "EMAIL"))
+            pos = max(pos, m.end())
+            m = search(text, m.end(), stop)
+        return pos
+
+    def _retry(self, text: str, start: int, rejected: str) -> Optional[Tuple[int, int, str]]:
+        idx = self.entities.index(rejected)
+        for ent in self.entities[idx + 1:]:
+            m = self._single[ent].match(text, start)
+            if m is None:
+                continue
+            validator = _VALIDATORS.get(ent)
+            if validator is None or validator(m.group()):
+                return (start, m.end(), ent)
+        return None
+
 
-    # Credit card via Luhn
-    if "CREDIT_CARD" in policy.entities:
-        for m in CREDIT_CARD_RE.finditer(text):
-            digits = re.sub(r"\D", "", m.group(0))
-            if 13 <= len(digits) <= 19 and luhn_ok(digits):
-                spans.append(
-                    Span(
-                        start=m.start(),
-                        end=m.end(),
-                        ent="CREDIT_CARD",
-                        conf=0.99,
-                        source="regex",
-                    )
-                )
-
-    return spans
+@lru_cache(maxsize=None)
+def build_scanner(entities: Tuple[str, ...]) -> RegexScanner:
+    """Scanner for a given entity set; shared by all policies that need it."""
+    return RegexScanner(entities)
+
+
+def scanner_for(policy: Policy) -> RegexScanner:
+    entities = getattr(policy, "regex_entities", None)
+    if entities is None:
+        entities = tuple(e for e in REGEX_ENTITIES if e in policy.entities)
+    return build_scanner(tuple(entities))
+
+
+def regex_batch(text: str, policy: Policy) -> SpanBatch:
+    """Regex candidates as a SpanBatch (label = entity), unthresholded."""
+    scanner = getattr(policy, "scanner", None) or scanner_for(policy)
+    return SpanBatch.from_hits(scanner.scan(text), _CONFIDENCE, "regex")
+
+
+def find_regex_spans(text: str, policy: Policy) -> List[Span]:
+    return regex_batch(text, policy).to_spans()
@@ -0,0 +1,221 @@
+# core/ingest.py
+
+from __future__ import annotations
+
+import hashlib
+import multiprocessing
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .metrics import timed
+from .models import Span
+from .pdf_layout import PageLayout, Rect
+from .pipeline import redact_text
+from .policy import Policy
+from .pseudonyms import PseudonymTable, batch_table, release_batch_table
+from .registry import CompiledPolicy
+
+
+# Text of consecutive pages is joined with this (same as the old UI did)
+PAGE_SEPARATOR = "\n\n"
+
+
+@dataclass
+class IngestedDocument:
+    """
+    A PDF parsed once: per-page text + glyph layout, and the joined text.
+
+    The same object serves the text preview, text redaction (`text`) and
+    visual redaction (`rects_for_spans` maps spans found in `text` back to
+    page rectangles), so the PDF is never re-extracted.
+    """
+
+    sha256: str
+    pages: List[PageLayout]
+    text: str = ""
+    page_starts: List[int] = field(default_factory=list)
+
+    def __post_init__(self):
+        parts: List[str] = []
+        starts: List[int] = []
+        pos = 0
+        for i, page in enumerate(self.pages):
+            if i:
+                parts.append(PAGE_SEPARATOR)
+                pos += len(PAGE_SEPARATOR)
+            starts.append(pos)
+            parts.append(page.text)
+            pos += len(page.text)
+        self.text = "".join(parts)
+        self.page_starts = starts
+
+    def rects_for_spans(self, spans: Iterable[Span]) -> Dict[int, List[Rect]]:
+        """Map spans over `text` to {page index: rectangles}."""
+        out: Dict[int, List[Rect]] = {}
+        for span in spans:
+            # A span can run over a page break; split it per page
+            page_ix = max(bisect_right(self.page_starts, span.start) - 1, 0)
+            while page_ix < len(self.pages):
+                base = self.page_starts[page_ix]
+                if base >= span.end:
+                    break
+                rects = self.pages[page_ix].rects_for(span.start - base, span.end - base)
+                if rects:
+                    out.setdefault(page_ix, []).extend(rects)
+                page_ix += 1
+        return out
+
+
+def load_fitz():
+    """
+    Import PyMuPDF on first use. It's slow to import and only the PDF
+    paths need it, so importing core.* stays cheap.
+    """
+    try:
+        import fitz  # PyMuPDF
+    except ImportError as e:  # pragma: no cover
+        raise RuntimeError("PyMuPDF (fitz) is required for PDF handling") from e
+    return fitz
+
+
+_CACHE_SIZE = 8
+_cache: "OrderedDict[str, IngestedDocument]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def ingest_pdf(data: bytes) -> IngestedDocument:
+    """
+    Parse a PDF into an IngestedDocument.
+
+    Results are kept in a small LRU keyed by the SHA-256 of the bytes, so
+    preview, text redaction and visual redaction of the same upload parse
+    it only once.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    with _cache_lock:
+        cached = _cache.get(digest)
+        if cached is not None:
+            _cache.move_to_end(digest)
+            return cached
+
+    fitz = load_fitz()
+    with timed("pdf_parse"):
+        doc = fitz.open(stream=data, filetype="pdf")
+        try:
+            pages = [PageLayout.from_page(page) for page in doc]
+        finally:
+            doc.close()
+    ingested = IngestedDocument(sha256=digest, pages=pages)
+
+    with _cache_lock:
+        _cache[digest] = ingested
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return ingested
+
+
+def apply_pdf_redactions(
+    data: bytes,
+    rects_by_page: Dict[int, List[Rect]],
+    mode: str = "blackout",
+) -> bytes:
+    """Draw and apply redaction rectangles; returns the new PDF bytes."""
+    fitz = load_fitz()
+    fill_color = (1, 1, 1) if mode == "whiteout" else (0, 0, 0)
+    with timed("pdf_apply"):
+        doc = fitz.open(stream=data, filetype="pdf")
+        try:
+            for i, page in enumerate(doc):
+                rects = rects_by_page.get(i)
+                if not rects:
+                    continue
+                for rect in rects:
+                    page.add_redact_annot(fitz.Rect(rect), fill=fill_color)
+                page.apply_redactions()
+            return doc.tobytes()
+        finally:
+            doc.close()
+
+
+# ---------------------------------------------------------------------
+# Whole files: parse + redact, optionally across processes
+# ---------------------------------------------------------------------
+@dataclass
+class FileResult:
+    name: str
+    text: str
+    redacted_text: str
+    spans: List[Span]
+    error: Optional[str] = None
+
+
+def extract_text(name: str, data: bytes) -> str:
+    if Path(name).suffix.lower() == ".pdf":
+        return ingest_pdf(data).text
+    return data.decode("utf-8", errors="ignore")
+
+
+def redact_file(
+    name: str,
+    data: bytes,
+    policy: Policy | CompiledPolicy,
+    mode: str = "placeholder",
+    allowed_entities: Optional[Sequence[str]] = None,
+    pseudonyms: Optional[PseudonymTable] = None,
+) -> FileResult:
+    try:
+        text = extract_text(name, data)
+    except Exception as e:
+        return FileResult(name, "", "", [], error=f"Failed to extract text: {e}")
+
+    redacted, spans = redact_text(
+        text,
+        mode=mode,
+        allowed_entities=allowed_entities,
+        policy=policy,
+        pseudonyms=pseudonyms,
+    )
+    return FileResult(name, text, redacted, spans)
+
+
+def redact_files(
+    files: Sequence[Tuple[str, bytes]],
+    policy: Policy | CompiledPolicy,
+    mode: str = "placeholder",
+    allowed_entities: Optional[Sequence[str]] = None,
+    workers: int = 1,
+) -> Iterator[Tuple[int, FileResult]]:
+    """
+    Redact (name, bytes) files, yielding (input index, FileResult) as each
+    one finishes, so callers can drive a progress bar. With workers > 1
+    files are processed concurrently in separate processes.
+
+    The files are one batch for pseudonymization.scope: per_batch (in the
+    parallel case through a temporary durable namespace).
+    """
+    allowed = list(allowed_entities) if allowed_entities is not None else None
+    if workers <= 1 or len(files) <= 1:
+        table = batch_table(policy)
+        for i, (name, data) in enumerate(files):
+            yield i, redact_file(name, data, policy, mode, allowed, table)
+        return
+
+    table = batch_table(policy, cross_process=True)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(files)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as ex:
+            futures = {
+                ex.submit(redact_file, name, data, policy, mode, allowed, table): i
+                for i, (name, data) in enumerate(files)
+            }
+            for fut in as_completed(futures):
+                yield futures[fut], fut.result()
+    finally:
+        release_batch_table(table)
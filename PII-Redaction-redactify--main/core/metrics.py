@@ -0,0 +1,276 @@
+# core/metrics.py
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .span_batch import SpanBatch
+
+# Never log raw text or entity values here, only counts / sizes / timings
+pii_logger = logging.getLogger("pii_events")
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+# Bucket upper bounds (Prometheus "le"); +Inf is implied
+SECONDS_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+CHARS_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+_BUCKETS = {
+    "redactify_stage_seconds": SECONDS_BUCKETS,
+    "redactify_input_chars": CHARS_BUCKETS,
+}
+
+_HELP = {
+    "redactify_stage_seconds": ("histogram", "Time spent per pipeline stage"),
+    "redactify_input_chars": ("histogram", "Size of redacted inputs in characters"),
+    "redactify_documents_total": ("counter", "Documents redacted"),
+    "redactify_spans_total": ("counter", "Detected spans by entity and source"),
+    "redactify_spans_dropped_total": ("counter", "Candidate spans dropped, by stage"),
+    "redactify_ner_route_lines_total": ("counter", "Lines sent to NER (ner) or regex-only (skip)"),
+    "redactify_ner_route_chars_total": ("counter", "Characters sent to NER (ner) or regex-only (skip)"),
+    "redactify_model_load_seconds": ("gauge", "Time it took to load the NER model"),
+    "redactify_ner_tokens_total": ("counter", "Transformer NER tokens per forward pass: real or padding"),
+    "redactify_pool_pending": ("gauge", "Detection jobs running or queued"),
+    "redactify_pool_max_pending": ("gauge", "Jobs in flight before requests get 503"),
+    "redactify_cache_hits_total": ("counter", "Paragraphs found in the detection cache"),
+    "redactify_cache_misses_total": ("counter", "Paragraphs the detection cache had to detect"),
+    "redactify_cache_bytes": ("gauge", "Approximate bytes held by the in-memory detection cache"),
+}
+
+
+def _key(name: str, labels: Optional[Dict[str, str]] = None) -> Key:
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+class Metrics:
+    """
+    In-process counters, gauges and fixed-bucket histograms.
+
+    Cheap enough to leave on: an observation is a perf_counter pair, a
+    bisect and a few list updates under a lock. Worker processes have
+    their own Metrics; they drain() a snapshot after each job and the
+    parent merge()s it, so /metrics covers the whole pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Key, float] = {}
+        self._gauges: Dict[Key, float] = {}
+        # key -> [bucket counts..., +Inf count, sum]
+        self._hists: Dict[Key, List[float]] = {}
+
+    # -- recording ----------------------------------------------------
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        k = _key(name, labels)
+        with self._lock:
+            self._counters[k] = self._counters.get(k, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        self._observe(_key(name, labels), _BUCKETS.get(name, SECONDS_BUCKETS), value)
+
+    def _observe(self, k: Key, bounds: Tuple[float, ...], value: float) -> None:
+        i = bisect_left(bounds, value)
+        with self._lock:
+            h = self._hists.get(k)
+            if h is None:
+                h = self._hists[k] = [0] * (len(bounds) + 2)
+            h[i] += 1
+            h[-1] += value
+
+    def timed(self, stage: str) -> "_Timer":
+        return _Timer(self, _stage_key(stage))
+
+    def record_stages(self, **seconds: float) -> None:
+        """Several stage durations under one lock (hot path of _detect)."""
+        bounds = SECONDS_BUCKETS
+        with self._lock:
+            hists = self._hists
+            for stage, value in seconds.items():
+                k = _stage_key(stage)
+                h = hists.get(k)
+                if h is None:
+                    h = hists[k] = [0] * (len(bounds) + 2)
+                h[bisect_left(bounds, value)] += 1
+                h[-1] += value
+
+    def record_spans(self, spans: Iterable) -> None:
+        with self._lock:
+            self._add_spans(spans)
+
+    def record_doc(self, n_chars: int, spans: Iterable) -> None:
+        """Document count, input size and span counts for one redaction."""
+        i = bisect_left(CHARS_BUCKETS, n_chars)
+        with self._lock:
+            c = self._counters
+            c[_DOCS_KEY] = c.get(_DOCS_KEY, 0) + 1
+            h = self._hists.get(_CHARS_KEY)
+            if h is None:
+                h = self._hists[_CHARS_KEY] = [0] * (len(CHARS_BUCKETS) + 2)
+            h[i] += 1
+            h[-1] += n_chars
+            self._add_spans(spans)
+
+    def _add_spans(self, spans: Iterable) -> None:
+        # caller holds the lock
+        c = self._counters
+        if isinstance(spans, SpanBatch):
+            pairs = spans.counts().items()
+        else:
+            pairs = (((s.ent, s.source), 1) for s in spans)
+        for pair, n in pairs:
+            k = _SPAN_KEYS.get(pair)
+            if k is None:
+                k = _SPAN_KEYS[pair] = _key(
+                    "redactify_spans_total", {"ent": pair[0], "source": pair[1]}
+                )
+            c[k] = c.get(k, 0) + n
+
+    # -- snapshots ----------------------------------------------------
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "hists": {k: list(v) for k, v in self._hists.items()},
+            }
+
+    def drain(self) -> dict:
+        """Snapshot and reset (what a worker ships back with a job)."""
+        with self._lock:
+            snap = {
+                "counters": self._counters,
+                "gauges": self._gauges,
+                "hists": self._hists,
+            }
+            self._counters, self._gauges, self._hists = {}, {}, {}
+        return snap
+
+    def merge(self, snap: Optional[dict]) -> None:
+        if not snap:
+            return
+        with self._lock:
+            for k, v in snap["counters"].items():
+                self._counters[k] = self._counters.get(k, 0) + v
+            # gauges are last-value-wins
+            self._gauges.update(snap["gauges"])
+            for k, v in snap["hists"].items():
+                h = self._hists.get(k)
+                if h is None:
+                    self._hists[k] = list(v)
+                else:
+                    for i, x in enumerate(v):
+                        h[i] += x
+
+    def reset(self) -> None:
+        self.drain()
+
+    # -- exposition ---------------------------------------------------
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        snap = self.snapshot()
+        by_name: Dict[str, List[str]] = {}
+
+        def labels_str(labels, extra=()) -> str:
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            inner = ",".join(f'{k}="{_escape(v)}"' for k, v in items)
+            return "{" + inner + "}"
+
+        for (name, labels), v in sorted(snap["counters"].items()):
+            by_name.setdefault(name, []).append(f"{name}{labels_str(labels)} {_num(v)}")
+        for (name, labels), v in sorted(snap["gauges"].items()):
+            by_name.setdefault(name, []).append(f"{name}{labels_str(labels)} {_num(v)}")
+        for (name, labels), h in sorted(snap["hists"].items()):
+            bounds = _BUCKETS.get(name, SECONDS_BUCKETS)
+            lines = by_name.setdefault(name, [])
+            cum = 0
+            for bound, n in zip(bounds, h):
+                cum += n
+                lines.append(f"{name}_bucket{labels_str(labels, [('le', _num(bound))])} {_num(cum)}")
+            cum += h[len(bounds)]
+            lines.append(f"{name}_bucket{labels_str(labels, [('le', '+Inf')])} {_num(cum)}")
+            lines.append(f"{name}_sum{labels_str(labels)} {_num(h[-1])}")
+            lines.append(f"{name}_count{labels_str(labels)} {_num(cum)}")
+
+        out: List[str] = []
+        for name in sorted(by_name):
+            kind, help_text = _HELP.get(name, ("untyped", ""))
+            if help_text:
+                out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(by_name[name])
+        return "\n".join(out) + "\n"
+
+
+# Label tuples are built once, not on every observation
+_STAGE_KEYS: Dict[str, Key] = {}
+_SPAN_KEYS: Dict[Tuple[str, str], Key] = {}
+_DOCS_KEY = _key("redactify_documents_total")
+_CHARS_KEY = _key("redactify_input_chars")
+
+
+def _stage_key(stage: str) -> Key:
+    k = _STAGE_KEYS.get(stage)
+    if k is None:
+        k = _STAGE_KEYS[stage] = _key("redactify_stage_seconds", {"stage": stage})
+    return k
+
+
+class _Timer:
+    # A plain class rather than @contextmanager: this wraps every stage of
+    # every document, and a generator per call costs more than the timing
+    __slots__ = ("_metrics", "_key", "_t0")
+
+    def __init__(self, metrics: Metrics, key: Key):
+        self._metrics = metrics
+        self._key = key
+
+    def __enter__(self) -> None:
+        self._t0 = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self._metrics._observe(self._key, SECONDS_BUCKETS, time.perf_counter() - self._t0)
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+# Process-wide registry
+METRICS = Metrics()
+
+
+def timed(stage: str):
+    return METRICS.timed(stage)
+
+
+def log_pii_event(event: str, n_chars: int, spans: Iterable, **fields) -> None:
+    """
+    One pii_events record per redaction: sizes and per-entity counts only.
+    """
+    if not pii_logger.isEnabledFor(logging.INFO):
+        return
+    if isinstance(spans, SpanBatch):
+        counts = Counter(spans.ent_names())
+    else:
+        counts = Counter(s.ent for s in spans)
+    ents = ",".join(f"{ent}:{n}" for ent, n in sorted(counts.items())) or "-"
+    extra = " ".join(f"{k}={v}" for k, v in fields.items())
+    pii_logger.info(
+        "%s chars=%d spans=%d entities=%s%s",
+        event, n_chars, sum(counts.values()), ents, f" {extra}" if extra else "",
+    )
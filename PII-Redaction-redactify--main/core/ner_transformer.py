@@ -0,0 +1,312 @@
+# core/ner_transformer.py
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import regex as re
+
+from .detect_ner import DEFAULT_BATCH_SIZE, Entity, NerBackend
+from .metrics import METRICS
+from .policy import NerSpec
+
+# torch, transformers and onnxruntime are imported in load(): only
+# policies with `ner.backend: transformer` ever pay for them.
+
+# CoNLL-03 labels (PER / LOC / ORG / MISC); PER and LOC map onto
+# PERSON_NAME / ADDRESS through LABEL_TO_ENTITY
+DEFAULT_MODEL = "dslim/bert-base-NER"
+DEFAULT_DIR = "cache/ner"
+
+Window = Tuple[int, int]
+
+
+def _package_version(name: str) -> str:
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return "missing"
+
+
+def _ner_dir() -> str:
+    return os.getenv("REDACTIFY_NER_CACHE", DEFAULT_DIR)
+
+
+def windows(n_tokens: int, size: int, stride: int) -> List[Window]:
+    """
+    (start, end) token ranges of at most `size` tokens covering
+    0..n_tokens, neighbours sharing at least `stride` tokens.
+    """
+    if n_tokens <= size:
+        return [(0, n_tokens)]
+    step = size - stride
+    starts = list(range(0, n_tokens - size, step)) + [n_tokens - size]
+    return [(s, s + size) for s in starts]
+
+
+def _centrality(start: int, end: int, n_tokens: int) -> np.ndarray:
+    # Distance of each token to the nearer window edge. Document edges
+    # don't count: the first / last window sees everything there is.
+    t = np.arange(start, end)
+    far = n_tokens + 1
+    left = t - start if start > 0 else np.full(end - start, far)
+    right = end - 1 - t if end < n_tokens else np.full(end - start, far)
+    return np.minimum(left, right)
+
+
+def decode(
+    offsets: Sequence[Tuple[int, int]],
+    word_ids: Sequence[Optional[int]],
+    labels: Sequence[str],
+    scores: Sequence[float],
+) -> List[Entity]:
+    """
+    Token tags -> entities. A word takes the tag of its first sub-token;
+    B-/S- start an entity, I-/E- continue one of the same type (or start
+    it), O ends it. Confidence is the mean score of the words' tags.
+    """
+    found: List[Entity] = []
+    cur: Optional[List[Any]] = None  # [start, end, type, score sum, words]
+    in_entity = False
+    prev_word: Optional[int] = None
+    for t, (start, end) in enumerate(offsets):
+        word = word_ids[t]
+        if word is not None and word == prev_word:
+            # later sub-token of a word: goes wherever the word went
+            if in_entity:
+                cur[1] = end
+            continue
+        prev_word = word
+
+        tag = labels[t]
+        if tag == "O":
+            in_entity = False
+            continue
+        bio, _, typ = tag.partition("-") if "-" in tag else ("I", "", tag)
+        if cur is not None and in_entity and bio in ("I", "E") and cur[2] == typ:
+            cur[1] = end
+            cur[3] += scores[t]
+            cur[4] += 1
+        else:
+            if cur is not None:
+                found.append((cur[0], cur[1], cur[2], cur[3] / cur[4]))
+            cur = [start, end, typ, scores[t], 1]
+        in_entity = True
+    if cur is not None:
+        found.append((cur[0], cur[1], cur[2], cur[3] / cur[4]))
+    return found
+
+
+class TransformerBackend(NerBackend):
+    """
+    Hugging Face token-classification model on CPU.
+
+    - quantize: "int8" runs torch dynamic quantization on the Linear
+      layers; "onnx" / "onnx-int8" export the model once to
+      REDACTIFY_NER_CACHE (default cache/ner) and run it with onnxruntime,
+      the latter with int8 weights. "none" is the plain fp32 model.
+    - Texts are tokenized once, cut into windows of max_length tokens
+      (minus special tokens) overlapping by `stride`. Each token keeps the
+      prediction of the window where it sits furthest from an edge, so
+      entities at a window boundary are seen with context on both sides.
+    - All windows of a call are sorted by length and batched
+      `batch_size` at a time, so a batch is padded only to its longest
+      window rather than to the longest text.
+    """
+
+    def __init__(self, spec: NerSpec):
+        self.spec = spec
+        self.model_name = spec.model or DEFAULT_MODEL
+        self._lock = threading.Lock()
+        self._tokenizer = None
+        self._run = None
+        self._id2label: Dict[int, str] = {}
+        self._prefix = 0
+        self._size = spec.max_length
+
+    def version(self) -> str:
+        s = self.spec
+        return (
+            f"{self.model_name}:{s.quantize}:{s.max_length}/{s.stride}"
+            f"-transformers-{_package_version('transformers')}"
+        )
+
+    # -- loading ------------------------------------------------------
+    def load(self) -> None:
+        if self._run is not None:
+            return
+        with self._lock:
+            if self._run is not None:
+                return
+            from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+            t0 = time.perf_counter()
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
+            if not tokenizer.is_fast:
+                raise ValueError(f"{self.model_name}: needs a fast tokenizer (offsets)")
+            model = AutoModelForTokenClassification.from_pretrained(self.model_name).eval()
+
+            if self.spec.quantize.startswith("onnx"):
+                run = self._onnx_runner(model, tokenizer)
+            else:
+                run = self._torch_runner(model)
+
+            # Where the content sits between the special tokens, e.g.
+            # [CLS] ... [SEP] -> prefix 1, 2 tokens of overhead
+            built = tokenizer.build_inputs_with_special_tokens([0])
+            special = tokenizer.get_special_tokens_mask(built, already_has_special_tokens=True)
+            self._prefix = special.index(0)
+            self._size = self.spec.max_length - tokenizer.num_special_tokens_to_add()
+            self._id2label = {int(k): v for k, v in model.config.id2label.items()}
+            self._tokenizer = tokenizer
+            self._run = run
+            METRICS.set_gauge(
+                "redactify_model_load_seconds", time.perf_counter() - t0, model=self.model_name
+            )
+
+    def _torch_runner(self, model):
+        import torch
+
+        if self.spec.quantize == "int8":
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+
+        def run(input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+            with torch.inference_mode():
+                out = model(
+                    input_ids=torch.from_numpy(input_ids),
+                    attention_mask=torch.from_numpy(attention_mask),
+                )
+            return out.logits.float().numpy()
+
+        return run
+
+    def _onnx_runner(self, model, tokenizer):
+        import onnxruntime as ort
+
+        path = self._onnx_path(model, tokenizer)
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        inputs = {i.name for i in session.get_inputs()}
+
+        def run(input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+            feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in inputs:
+                feed["token_type_ids"] = np.zeros_like(input_ids)
+            return session.run(["logits"], feed)[0]
+
+        return run
+
+    def _onnx_path(self, model, tokenizer) -> str:
+        """Export (once) and return the ONNX file for this model / quantize."""
+        import torch
+
+        stem = re.sub(r"[^\w.-]+", "_", self.model_name)
+        stem = f"{stem}-{_package_version('transformers')}"
+        os.makedirs(_ner_dir(), exist_ok=True)
+        fp32 = os.path.join(_ner_dir(), f"{stem}.onnx")
+        if not os.path.exists(fp32):
+            sample = tokenizer("Jane Smith lives in Boston.", return_tensors="pt")
+            names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+            axes = {n: {0: "batch", 1: "seq"} for n in names + ["logits"]}
+            tmp = f"{fp32}.{os.getpid()}.tmp"
+            torch.onnx.export(
+                model, tuple(sample[n] for n in names), tmp,
+                input_names=names, output_names=["logits"],
+                dynamic_axes=axes, opset_version=14,
+            )
+            os.replace(tmp, fp32)
+        if self.spec.quantize != "onnx-int8":
+            return fp32
+
+        int8 = os.path.join(_ner_dir(), f"{stem}.int8.onnx")
+        if not os.path.exists(int8):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            tmp = f"{int8}.{os.getpid()}.tmp"
+            quantize_dynamic(fp32, tmp, weight_type=QuantType.QInt8)
+            os.replace(tmp, int8)
+        return int8
+
+    # -- inference ----------------------------------------------------
+    def _forward(self, chunks: List[List[int]]) -> List[np.ndarray]:
+        """Logits per chunk (content tokens only), length-bucketed."""
+        tok = self._tokenizer
+        pad = tok.pad_token_id if tok.pad_token_id is not None else 0
+        built = [tok.build_inputs_with_special_tokens(c) for c in chunks]
+        order = sorted(range(len(built)), key=lambda i: len(built[i]))
+        out: List[Optional[np.ndarray]] = [None] * len(built)
+        real = padded = 0
+        bs = self.spec.batch_size
+        for b in range(0, len(order), bs):
+            idx = order[b:b + bs]
+            width = len(built[idx[-1]])
+            input_ids = np.full((len(idx), width), pad, dtype=np.int64)
+            mask = np.zeros((len(idx), width), dtype=np.int64)
+            for row, i in enumerate(idx):
+                input_ids[row, : len(built[i])] = built[i]
+                mask[row, : len(built[i])] = 1
+            logits = self._run(input_ids, mask)
+            for row, i in enumerate(idx):
+                out[i] = logits[row, self._prefix : self._prefix + len(chunks[i])]
+            real += int(mask.sum())
+            padded += mask.size
+        METRICS.inc("redactify_ner_tokens_total", real, kind="real")
+        METRICS.inc("redactify_ner_tokens_total", padded - real, kind="pad")
+        return out
+
+    def predict(
+        self, texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE, n_process: int = 1
+    ) -> List[List[Entity]]:
+        # batch_size / n_process are spaCy's knobs; windows are batched by
+        # spec.batch_size and torch / onnxruntime use their own threads
+        self.load()
+        texts = list(texts)
+        if not texts:
+            return []
+        enc = self._tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False,
+        )
+
+        per_text: List[List[Window]] = []
+        chunks: List[List[int]] = []
+        for ids in enc["input_ids"]:
+            spans = windows(len(ids), self._size, self.spec.stride) if ids else []
+            per_text.append(spans)
+            chunks.extend(ids[s:e] for s, e in spans)
+        logits = iter(self._forward(chunks))
+
+        results: List[List[Entity]] = []
+        for i, spans in enumerate(per_text):
+            n = len(enc["input_ids"][i])
+            tags = np.zeros(n, dtype=np.int64)
+            scores = np.zeros(n, dtype=np.float32)
+            best = np.full(n, -1)
+            for s, e in spans:
+                window = next(logits)
+                z = np.exp(window - window.max(axis=-1, keepdims=True))
+                probs = z / z.sum(axis=-1, keepdims=True)
+                ctx = _centrality(s, e, n)
+                better = ctx > best[s:e]
+                best[s:e][better] = ctx[better]
+                tags[s:e][better] = probs.argmax(axis=-1)[better]
+                scores[s:e][better] = probs.max(axis=-1)[better]
+            results.append(
+                decode(
+                    enc["offset_mapping"][i],
+                    enc.word_ids(i),
+                    [self._id2label[int(t)] for t in tags],
+                    scores.tolist(),
+                )
+            )
+        return results
@@ -0,0 +1,102 @@
+# core/pdf_layout.py
+
+from __future__ import annotations
+
+from array import array
+from typing import List, Tuple
+
+Rect = Tuple[float, float, float, float]
+
+
+class PageLayout:
+    """
+    Text of one PDF page plus the glyph box of every character in it.
+
+    Built once per page from get_text("rawdict"). `text` is laid out like
+    get_text("text") (one line per text line), and offset i in `text` maps
+    to the bbox of the glyph that produced it. The "\\n" separators added
+    between lines have no glyph (line id -1).
+
+    Detected spans then map straight to rectangles: rects_for() walks only
+    the span's own characters, so it costs O(span length) and redacts that
+    exact occurrence, not every occurrence of the same string.
+    """
+
+    __slots__ = ("text", "x0", "y0", "x1", "y1", "line_ids")
+
+    def __init__(self, text: str, x0, y0, x1, y1, line_ids):
+        self.text = text
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.line_ids = line_ids
+
+    @classmethod
+    def from_rawdict(cls, raw: dict) -> "PageLayout":
+        chars: List[str] = []
+        x0, y0, x1, y1 = array("d"), array("d"), array("d"), array("d")
+        line_ids = array("i")
+        line_no = 0
+
+        for block in raw.get("blocks", []):
+            if block.get("type", 0) != 0:  # image block
+                continue
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    for ch in span.get("chars", []):
+                        c = ch["c"]
+                        bx0, by0, bx1, by1 = ch["bbox"]
+                        # A glyph can decode to several chars (ligatures);
+                        # they all share its box.
+                        for sub in c:
+                            chars.append(sub)
+                            x0.append(bx0)
+                            y0.append(by0)
+                            x1.append(bx1)
+                            y1.append(by1)
+                            line_ids.append(line_no)
+                chars.append("\n")
+                for col in (x0, y0, x1, y1):
+                    col.append(0.0)
+                line_ids.append(-1)
+                line_no += 1
+
+        return cls("".join(chars), x0, y0, x1, y1, line_ids)
+
+    @classmethod
+    def from_page(cls, page) -> "PageLayout":
+        return cls.from_rawdict(page.get_text("rawdict"))
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def rects_for(self, start: int, end: int) -> List[Rect]:
+        """One rectangle per text line covered by text[start:end]."""
+        rects: List[Rect] = []
+        cur_line = -1
+        rx0 = ry0 = rx1 = ry1 = 0.0
+        x0, y0, x1, y1, line_ids = self.x0, self.y0, self.x1, self.y1, self.line_ids
+
+        for i in range(max(start, 0), min(end, len(self.text))):
+            line = line_ids[i]
+            if line < 0:
+                continue
+            if line != cur_line:
+                if cur_line >= 0:
+                    rects.append((rx0, ry0, rx1, ry1))
+                cur_line = line
+                rx0, ry0, rx1, ry1 = x0[i], y0[i], x1[i], y1[i]
+                continue
+            if x0[i] < rx0:
+                rx0 = x0[i]
+            if y0[i] < ry0:
+                ry0 = y0[i]
+            if x1[i] > rx1:
+                rx1 = x1[i]
+            if y1[i] > ry1:
+                ry1 = y1[i]
+
+        if cur_line >= 0:
+            rects.append((rx0, ry0, rx1, ry1))
+        return rects
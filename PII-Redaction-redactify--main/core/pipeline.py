@@ -2,49 +2,283 @@
 
 from __future__ import annotations
 
+import time
 from typing import Tuple, List, Iterable, Optional
 
+from .cache import cached_detect, get_detection_cache
+from .chunking import iter_chunks
 from .models import Span
-from .policy import load_policy, Policy
-from .detect_regex import find_regex_spans
-from .detect_ner import ner_spans
-from .resolve import merge_spans
-from .transform import apply_actions
+from .policy import Policy
+from .span_batch import SpanBatch
+from .pseudonyms import PseudonymTable, batch_table
+from .registry import CompiledPolicy, compile_policy, resolve_policy
+from .detect_regex import regex_batch
+from .detect_dict import dict_batch, dictionary_version
+from .cascade import routed_ner_batch, routed_ner_batches
+from .detect_ner import DEFAULT_BATCH_SIZE, model_version
+from .metrics import METRICS, log_pii_event, timed
+from .resolve import resolver_for
+from .scoring import scorer_for
+from .transform import apply_batch
 
 
-def _collect_spans(text: str, policy: Policy) -> List[Span]:
-    spans: List[Span] = []
+def _detect(text: str, policy: Policy) -> SpanBatch:
+    clock = time.perf_counter
+    scorer = scorer_for(policy)
 
     # 1) Deterministic PII (regex)
-    spans += find_regex_spans(text, policy)
-    spans = merge_spans(spans)
+    t0 = clock()
+    regex_hits = regex_batch(text, policy)
+    t1 = clock()
+
+    # 2) Known terms (dictionary automata)
+    dict_hits = dict_batch(text, policy)
+    t2 = clock()
 
-    # 2) Unstructured PII (spaCy NER)
-    ners = ner_spans(text, policy)
-    spans = merge_spans(spans, ners)
+    # 3) Unstructured PII (spaCy NER, on the lines the cascade lets through)
+    ner_hits = routed_ner_batch(text, policy)
+    t3 = clock()
 
+    # 4) Drop what's under threshold, then resolve overlaps in one pass
+    streams = [scorer.apply(regex_hits), scorer.apply(dict_hits), scorer.apply(ner_hits)]
+    t4 = clock()
+    spans = resolver_for(policy).resolve(streams)
+    t5 = clock()
+
+    METRICS.record_stages(
+        regex=t1 - t0, dict=t2 - t1, ner=t3 - t2, threshold=t4 - t3, merge=t5 - t4
+    )
     return spans
 
 
+def _detector_version(policy: Policy) -> str:
+    """Model / dictionary versions, for detection cache keys."""
+    version = model_version(policy)
+    dicts = dictionary_version(policy)
+    return f"{version}+dict:{dicts}" if dicts else version
+
+
+def _collect_spans(text: str, policy: Policy) -> List[Span]:
+    """All spans in text, as Span objects."""
+    return _collect_batch(text, policy).to_spans()
+
+
+def _collect_batch(text: str, policy: Policy) -> SpanBatch:
+    """
+    All spans in text. Goes through the detection cache (paragraph by
+    paragraph) when one is configured, see core/cache.py.
+    """
+    cache = get_detection_cache()
+    fingerprint = getattr(policy, "fingerprint", None)
+    if cache is None or fingerprint is None:
+        return _detect_chunked(text, policy)
+    return cached_detect(
+        [text], cache, fingerprint, _detector_version(policy),
+        lambda paragraphs: _detect_many(paragraphs, policy),
+    )[0]
+
+
+def _detect_chunked(text: str, policy: Policy) -> SpanBatch:
+    chunk_size = getattr(policy, "chunk_size", 0)
+    if not chunk_size or len(text) <= chunk_size:
+        return _detect(text, policy)
+
+    # Long text: detect chunk by chunk so spaCy never sees more than
+    # chunk_size chars (and never hits nlp.max_length). Neighbouring chunks
+    # overlap, so an entity cut at one edge is found whole in the next;
+    # resolving the chunks' streams drops the duplicate / truncated copy.
+    overlap = getattr(policy, "chunk_overlap", 0)
+    per_chunk: List[SpanBatch] = []
+    for start, end in iter_chunks(text, chunk_size, overlap):
+        found = SpanBatch()
+        found.extend(_detect(text[start:end], policy), offset=start)
+        per_chunk.append(found)
+    return resolver_for(policy).resolve(per_chunk)
+
+
+def _filter_allowed(
+    spans: SpanBatch, allowed_entities: Optional[Iterable[str]]
+) -> SpanBatch:
+    if allowed_entities is None:
+        return spans
+    return spans.only(allowed_entities)
+
+
 def redact_text(
     text: str,
     policy_path: str = "configs/policy.yaml",
     mode: str = "placeholder",
     allowed_entities: Optional[Iterable[str]] = None,
+    policy: Optional[Policy | CompiledPolicy] = None,
+    pseudonyms: Optional[PseudonymTable] = None,
 ) -> Tuple[str, List[Span]]:
     """
     Redact text using the given policy and mode.
 
+    policy:
+      - If None: the YAML at policy_path is loaded through the policy
+        registry (parsed once, reused until the file changes).
+      - If given (ideally a CompiledPolicy), it is used as-is and
+        policy_path is ignored.
+
     allowed_entities:
       - If None: use all entities defined in policy.
       - If iterable: only spans whose ent is in this set will be redacted.
+
+    pseudonyms:
+      - If None: picked by the policy's pseudonymization.scope (a fresh
+        table, or the shared one for scope: global).
+      - If given: {n} numbers come from this table.
+    """
+    t0 = time.perf_counter()
+    policy = resolve_policy(policy, policy_path)
+    spans = _collect_batch(text, policy)
+    return _finish(text, spans, policy, mode, allowed_entities, pseudonyms, t0)
+
+
+def detect_spans(
+    text: str,
+    policy_path: str = "configs/policy.yaml",
+    policy: Optional[Policy | CompiledPolicy] = None,
+) -> SpanBatch:
+    """
+    The detection half of redact_text: all spans in text, before the
+    allowed_entities filter and the transform. Cheap to keep around (and
+    picklable), so callers that re-render the same document in several
+    modes detect it once and call redact_detected for each.
     """
-    policy = load_policy(policy_path)
-    spans = _collect_spans(text, policy)
+    return _collect_batch(text, resolve_policy(policy, policy_path))
+
+
+def redact_detected(
+    text: str,
+    spans: SpanBatch,
+    policy: Policy | CompiledPolicy,
+    mode: str = "placeholder",
+    allowed_entities: Optional[Iterable[str]] = None,
+    pseudonyms: Optional[PseudonymTable] = None,
+) -> Tuple[str, List[Span]]:
+    """The transform half of redact_text, for spans from detect_spans."""
+    t0 = time.perf_counter()
+    return _finish(text, spans, compile_policy(policy), mode, allowed_entities, pseudonyms, t0)
+
+
+def _finish(
+    text: str,
+    spans: SpanBatch,
+    policy: CompiledPolicy,
+    mode: str,
+    allowed_entities: Optional[Iterable[str]],
+    pseudonyms: Optional[PseudonymTable],
+    t0: float,
+) -> Tuple[str, List[Span]]:
+    spans = _filter_allowed(spans, allowed_entities)
+    if pseudonyms is None:
+        pseudonyms = batch_table(policy)
+    with timed("transform"):
+        redacted, replacements = apply_batch(text, spans, policy, mode, pseudonyms)
+    _record_doc(text, spans, mode, time.perf_counter() - t0)
+    return redacted, spans.to_spans(replacements)
+
+
+def _record_doc(text: str, spans: SpanBatch, mode: str, elapsed: float) -> None:
+    METRICS.record_doc(len(text), spans)
+    log_pii_event("redact", len(text), spans, mode=mode, ms=f"{elapsed * 1000:.1f}")
+
+
+def redact_texts(
+    texts: Iterable[str],
+    policy_path: str = "configs/policy.yaml",
+    mode: str = "placeholder",
+    allowed_entities: Optional[Iterable[str]] = None,
+    policy: Optional[Policy | CompiledPolicy] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    n_process: int = 1,
+    pseudonyms: Optional[PseudonymTable] = None,
+) -> List[Tuple[str, List[Span]]]:
+    """
+    Redact many documents with one policy/mode.
+
+    Same result as calling redact_text per document, but NER runs through
+    nlp.pipe in batches, so per-call model overhead is paid once per batch
+    instead of once per document.
+
+    The texts form one batch for pseudonymization.scope: per_batch, unless
+    `pseudonyms` is given (e.g. a table shared by several calls).
+    """
+    policy = resolve_policy(policy, policy_path)
+    texts = list(texts)
+
+    cache = get_detection_cache()
+    if cache is not None:
+        found = cached_detect(
+            texts, cache, policy.fingerprint, _detector_version(policy),
+            lambda paragraphs: _detect_many(paragraphs, policy, batch_size, n_process),
+        )
+    else:
+        found = _detect_many(texts, policy, batch_size, n_process)
+
+    if pseudonyms is None:
+        pseudonyms = batch_table(policy)
+
+    results: List[Tuple[str, List[Span]]] = []
+    for text, spans in zip(texts, found):
+        t0 = time.perf_counter()
+        spans = _filter_allowed(spans, allowed_entities)
+        with timed("transform"):
+            # None (per_document): apply_batch starts a fresh table
+            redacted, replacements = apply_batch(text, spans, policy, mode, pseudonyms)
+        # detection ran batched, so only the transform is per document
+        _record_doc(text, spans, mode, time.perf_counter() - t0)
+        results.append((redacted, spans.to_spans(replacements)))
+    return results
+
 
-    if allowed_entities is not None:
-        allowed_set = set(allowed_entities)
-        spans = [s for s in spans if s.ent in allowed_set]
+def _detect_many(
+    texts: List[str],
+    policy: CompiledPolicy,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    n_process: int = 1,
+) -> List[SpanBatch]:
+    """_detect_chunked for many texts, with NER batched (nlp.pipe for spaCy)."""
+    # Texts over chunk_size go through the chunked path on their own
+    chunk_size = policy.chunk_size
+    short = [i for i, t in enumerate(texts) if not chunk_size or len(t) <= chunk_size]
+    scorer = scorer_for(policy)
+    resolver = resolver_for(policy)
+    with timed("ner"):
+        ners_per_doc = dict(
+            zip(
+                short,
+                routed_ner_batches(
+                    [texts[i] for i in short],
+                    policy,
+                    batch_size=batch_size,
+                    n_process=n_process,
+                ),
+            )
+        )
 
-    redacted = apply_actions(text, spans, policy, mode)
-    return redacted, spans
+    found: List[SpanBatch] = []
+    for i, text in enumerate(texts):
+        if i in ners_per_doc:
+            t1 = time.perf_counter()
+            regex_hits = regex_batch(text, policy)
+            t2 = time.perf_counter()
+            dict_hits = dict_batch(text, policy)
+            t3 = time.perf_counter()
+            streams = [
+                scorer.apply(regex_hits),
+                scorer.apply(dict_hits),
+                scorer.apply(ners_per_doc[i]),
+            ]
+            t4 = time.perf_counter()
+            spans = resolver.resolve(streams)
+            METRICS.record_stages(
+                regex=t2 - t1, dict=t3 - t2, threshold=t4 - t3,
+                merge=time.perf_counter() - t4,
+            )
+        else:
+            spans = _detect_chunked(text, policy)
+        found.append(spans)
+    return found
@@ -3,8 +3,16 @@
 from __future__ import annotations
 
 import yaml
-from dataclasses import dataclass
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Tuple
+
+
+PSEUDONYM_SCOPES = ("per_document", "per_batch", "global")
+# How a table column is detected, see core/tabular.py
+COLUMN_DETECT = ("auto", "full", "regex", "none")
+RESOLUTION_PRIORITIES = ("conf", "length", "source", "entity")
+# How the transformer NER backend runs on CPU, see core/ner_transformer.py
+NER_QUANTIZE = ("none", "int8", "onnx", "onnx-int8")
 
 
 @dataclass
@@ -16,11 +24,75 @@ class EntityPolicy:
     mask_rules: Dict[str, Any] | None = None
 
 
+@dataclass(frozen=True)
+class DictionarySpec:
+    """A deny-list: term files whose entries are detected as `entity`."""
+
+    name: str
+    entity: str
+    paths: Tuple[str, ...]
+    case_sensitive: bool = False
+    word_boundary: bool = True
+    confidence: float = 0.99
+
+
+@dataclass(frozen=True)
+class NerSpec:
+    """
+    Which NER backend runs (see core/detect_ner.py). `model` None means
+    the backend's default. The rest only applies to transformer models:
+    windows of `max_length` tokens overlapping by `stride`, and
+    `batch_size` windows per forward pass.
+    """
+
+    backend: str = "spacy"
+    model: str | None = None
+    quantize: str = "int8"
+    max_length: int = 256
+    stride: int = 32
+    batch_size: int = 16
+
+
+@dataclass(frozen=True)
+class ColumnRule:
+    """
+    Override for one table column. `entity` treats every non-empty cell
+    as that entity as a whole (no detection); `action` replaces the
+    entity's action in this column only.
+    """
+
+    detect: str = "auto"
+    entity: str | None = None
+    action: str | None = None
+
+
 @dataclass
 class Policy:
     entities: Dict[str, EntityPolicy]
     preserve_separators: bool = True
     pseudonym_scope: str = "per_document"
+    chunk_size: int = 100_000
+    chunk_overlap: int = 200
+    # NER pre-filter, see core/cascade.py
+    ner_cascade: bool = False
+    ner_cascade_min_alpha: float = 0.5
+    ner_cascade_max_token: int = 40
+    ner: NerSpec = field(default_factory=NerSpec)
+    # Confidence calibration, see core/scoring.py:
+    # source -> multiplier, and source -> detector label -> confidence
+    source_weights: Dict[str, float] = field(default_factory=dict)
+    label_confidence: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    # Overlap resolution, see core/resolve.py. An empty entity_order
+    # means the order of `entities`.
+    resolution_priority: List[str] = field(default_factory=lambda: ["conf", "length"])
+    source_order: List[str] = field(default_factory=lambda: ["regex", "dict", "ner"])
+    entity_order: List[str] = field(default_factory=list)
+    # Term-list detectors, see core/detect_dict.py
+    dictionaries: List[DictionarySpec] = field(default_factory=list)
+    # Tabular data, see core/tabular.py: per-column rules, and how many
+    # rows are profiled to pick the detection of "auto" columns
+    column_rules: Dict[str, ColumnRule] = field(default_factory=dict)
+    profile_rows: int = 200
 
     def threshold_for(self, ent: str) -> float:
         ep = self.entities.get(ent)
@@ -37,6 +109,12 @@ class Policy:
 def load_policy(path: str) -> Policy:
     with open(path, "r", encoding="utf-8") as f:
         cfg = yaml.safe_load(f)
+    return parse_policy(cfg)
+
+
+def parse_policy(cfg: Dict[str, Any] | None) -> Policy:
+    """Build a Policy from an already-parsed YAML mapping."""
+    cfg = cfg or {}
 
     entities_cfg = cfg.get("entities", {})
     entities: Dict[str, EntityPolicy] = {}
@@ -51,9 +129,101 @@ def load_policy(path: str) -> Policy:
 
     format_cfg = cfg.get("format", {})
     pseudo_cfg = cfg.get("pseudonymization", {})
+    processing_cfg = cfg.get("processing", {})
+    cascade_cfg = processing_cfg.get("ner_cascade") or {}
+    scoring_cfg = cfg.get("scoring", {}) or {}
+    resolution_cfg = cfg.get("resolution", {}) or {}
+    tabular_cfg = cfg.get("tabular", {}) or {}
+
+    scope = pseudo_cfg.get("scope", "per_document")
+    if scope not in PSEUDONYM_SCOPES:
+        raise ValueError(f"Unknown pseudonymization.scope: {scope!r}")
+
+    priority = list(resolution_cfg.get("priority") or ["conf", "length"])
+    unknown = [p for p in priority if p not in RESOLUTION_PRIORITIES]
+    if unknown:
+        raise ValueError(f"Unknown resolution.priority: {unknown!r}")
 
     return Policy(
         entities=entities,
         preserve_separators=bool(format_cfg.get("preserve_separators", True)),
-        pseudonym_scope=pseudo_cfg.get("scope", "per_document"),
+        pseudonym_scope=scope,
+        chunk_size=int(processing_cfg.get("chunk_size", 100_000)),
+        chunk_overlap=int(processing_cfg.get("chunk_overlap", 200)),
+        ner_cascade=bool(cascade_cfg.get("enabled", False)),
+        ner_cascade_min_alpha=float(cascade_cfg.get("min_alpha", 0.5)),
+        ner_cascade_max_token=int(cascade_cfg.get("max_token", 40)),
+        ner=_parse_ner(cfg.get("ner") or {}),
+        source_weights={
+            src: float(w) for src, w in (scoring_cfg.get("source_weights") or {}).items()
+        },
+        label_confidence={
+            src: {label: float(c) for label, c in (labels or {}).items()}
+            for src, labels in (scoring_cfg.get("label_confidence") or {}).items()
+        },
+        resolution_priority=priority,
+        source_order=list(resolution_cfg.get("source_order") or ["regex", "dict", "ner"]),
+        entity_order=list(resolution_cfg.get("entity_order") or []),
+        dictionaries=_parse_dictionaries(cfg.get("dictionaries") or {}, entities),
+        column_rules=_parse_columns(tabular_cfg.get("columns") or {}, entities),
+        profile_rows=int(tabular_cfg.get("profile_rows", 200)),
+    )
+
+
+def _parse_ner(cfg: Dict[str, Any]) -> NerSpec:
+    spec = NerSpec(
+        backend=str(cfg.get("backend", "spacy")),
+        model=cfg.get("model"),
+        quantize=str(cfg.get("quantize", "int8")),
+        max_length=int(cfg.get("max_length", 256)),
+        stride=int(cfg.get("stride", 32)),
+        batch_size=int(cfg.get("batch_size", 16)),
     )
+    if spec.quantize not in NER_QUANTIZE:
+        raise ValueError(f"Unknown ner.quantize: {spec.quantize!r}")
+    if spec.max_length < 16 or not 0 <= spec.stride <= spec.max_length // 2:
+        raise ValueError("ner: need max_length >= 16 and 0 <= stride <= max_length / 2")
+    if spec.batch_size < 1:
+        raise ValueError("ner.batch_size must be >= 1")
+    return spec
+
+
+def _parse_dictionaries(
+    cfg: Dict[str, Any], entities: Dict[str, EntityPolicy]
+) -> List[DictionarySpec]:
+    specs: List[DictionarySpec] = []
+    for name, props in cfg.items():
+        props = props or {}
+        entity = props.get("entity")
+        if entity not in entities:
+            raise ValueError(f"dictionaries.{name}: entity {entity!r} is not in entities")
+        paths = props.get("paths") or ([props["path"]] if props.get("path") else [])
+        if not paths:
+            raise ValueError(f"dictionaries.{name}: no path / paths")
+        specs.append(
+            DictionarySpec(
+                name=name,
+                entity=entity,
+                paths=tuple(paths),
+                case_sensitive=bool(props.get("case_sensitive", False)),
+                word_boundary=bool(props.get("word_boundary", True)),
+                confidence=float(props.get("confidence", 0.99)),
+            )
+        )
+    return specs
+
+
+def _parse_columns(
+    cfg: Dict[str, Any], entities: Dict[str, EntityPolicy]
+) -> Dict[str, ColumnRule]:
+    rules: Dict[str, ColumnRule] = {}
+    for column, props in cfg.items():
+        props = props or {}
+        detect = props.get("detect", "auto")
+        if detect not in COLUMN_DETECT:
+            raise ValueError(f"tabular.columns.{column}: unknown detect {detect!r}")
+        entity = props.get("entity")
+        if entity is not None and entity not in entities:
+            raise ValueError(f"tabular.columns.{column}: entity {entity!r} is not in entities")
+        rules[str(column)] = ColumnRule(detect=detect, entity=entity, action=props.get("action"))
+    return rules
@@ -0,0 +1,277 @@
+# core/pseudonyms.py
+
+from __future__ import annotations
+
+import hmac
+import os
+import sqlite3
+import threading
+import unicodedata
+import uuid
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .policy import Policy
+
+# Entities whose identity is their digits: "(555) 123-4567" == "555.123.4567"
+_DIGIT_ENTITIES = {"PHONE", "SSN_US", "CREDIT_CARD"}
+
+DEFAULT_DB = "cache/pseudonyms.db"
+# Deliberately not next to the database (cache/): whoever copies one
+# shouldn't get the other with it
+DEFAULT_KEY_FILE = os.path.join("~", ".config", "redactify", "pseudonym.key")
+
+
+def normalize_value(ent: str, value: str) -> str:
+    """Canonical form of a value, so spelling variants share a pseudonym."""
+    v = " ".join(unicodedata.normalize("NFKC", value).casefold().split())
+    if ent in _DIGIT_ENTITIES:
+        digits = "".join(c for c in v if c.isdigit())
+        if ent == "PHONE" and len(digits) == 11 and digits[0] == "1":
+            digits = digits[1:]  # +1 country code
+        return digits or v
+    return v
+
+
+def load_key(db_path: Optional[str] = None) -> bytes:
+    """
+    HMAC key for durable tables: REDACTIFY_PSEUDONYM_KEY, else the file
+    REDACTIFY_PSEUDONYM_KEY_FILE (default ~/.config/redactify/pseudonym.key,
+    created with a random key on first use).
+    Keep it away from the database: with both, values from a small space
+    (SSNs, phone numbers) could be brute-forced back. A key file in the
+    same directory as db_path is refused.
+    """
+    env_key = os.getenv("REDACTIFY_PSEUDONYM_KEY")
+    if env_key:
+        return env_key.encode("utf-8")
+
+    path = os.path.expanduser(os.getenv("REDACTIFY_PSEUDONYM_KEY_FILE", DEFAULT_KEY_FILE))
+    if db_path is not None and _same_dir(path, db_path):
+        raise ValueError(
+            f"Pseudonym key file {path} sits next to the database {db_path}; "
+            "move it (REDACTIFY_PSEUDONYM_KEY_FILE) or set REDACTIFY_PSEUDONYM_KEY"
+        )
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    key = os.urandom(32)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # another worker won the race; use its key
+        with open(path, "rb") as f:
+            return f.read()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _same_dir(a: str, b: str) -> bool:
+    return os.path.dirname(os.path.abspath(a)) == os.path.dirname(os.path.abspath(b))
+
+
+class PseudonymTable:
+    """
+    Value -> number mapping for one pseudonymization scope.
+
+    Values are keyed by an HMAC of their normalized form, never stored in
+    plaintext. Numbers are handed out per entity in order of first
+    appearance, so the same "John Doe" is PERSON_1 every time it shows up
+    within the scope.
+
+    This one lives in memory (per_document / per_batch in one process);
+    DurablePseudonymTable shares a scope across processes and restarts.
+    """
+
+    def __init__(self, key: Optional[bytes] = None):
+        # An in-memory table never outlives the process, so any key will do
+        self._key = key if key is not None else os.urandom(32)
+        self._index: Dict[Tuple[str, str], int] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def digest(self, ent: str, value: str) -> str:
+        msg = f"{ent}\0{normalize_value(ent, value)}".encode("utf-8", "surrogatepass")
+        return hmac.digest(self._key, msg, "sha256").hex()[:32]
+
+    def numbers(self, items: Sequence[Tuple[str, str]]) -> List[int]:
+        """Pseudonym number for each (entity, original value)."""
+        # a document repeats its names; hash each distinct value once
+        by_value: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        keys = []
+        for item in items:
+            k = by_value.get(item)
+            if k is None:
+                k = by_value[item] = (item[0], self.digest(*item))
+            keys.append(k)
+        with self._lock:
+            missing = []
+            seen = set()
+            for k in keys:
+                if k not in self._index and k not in seen:
+                    seen.add(k)
+                    missing.append(k)
+            if missing:
+                self._index.update(self._assign(missing))
+            return [self._index[k] for k in keys]
+
+    def _assign(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+        out = {}
+        for ent, digest in keys:
+            n = self._counts.get(ent, 0) + 1
+            self._counts[ent] = n
+            out[(ent, digest)] = n
+        return out
+
+
+class DurablePseudonymTable(PseudonymTable):
+    """
+    A scope (namespace) stored in sqlite, shared by every process using
+    the same file and key.
+
+    Known mappings never change, so they're served from the in-memory
+    index; new values are numbered inside a BEGIN IMMEDIATE transaction,
+    which serializes concurrent workers. Pickles as (path, namespace);
+    the key is re-read from the environment / key file on the other side.
+    """
+
+    def __init__(self, path: str, namespace: str, key: Optional[bytes] = None):
+        super().__init__(key if key is not None else load_key(path))
+        self.path = path
+        self.namespace = namespace
+        self._local = threading.local()
+
+    def __getstate__(self):
+        return {"path": self.path, "namespace": self.namespace}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state["namespace"])
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = _connect(self.path)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _assign(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+        conn = self._conn()
+        out = self._lookup(conn, keys)
+        todo = [k for k in keys if k not in out]
+        if not todo:
+            return out
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # re-check: another worker may have numbered them meanwhile
+            out.update(self._lookup(conn, todo))
+            for ent, digest in todo:
+                if (ent, digest) in out:
+                    continue
+                row = conn.execute(
+                    "SELECT next_n FROM counters WHERE namespace = ? AND ent = ?",
+                    (self.namespace, ent),
+                ).fetchone()
+                n = row[0] if row else 1
+                conn.execute(
+                    "INSERT INTO pseudonyms (namespace, ent, digest, n) VALUES (?, ?, ?, ?)",
+                    (self.namespace, ent, digest, n),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO counters (namespace, ent, next_n) VALUES (?, ?, ?)",
+                    (self.namespace, ent, n + 1),
+                )
+                out[(ent, digest)] = n
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return out
+
+    def _lookup(self, conn, keys) -> Dict[Tuple[str, str], int]:
+        out = {}
+        for ent, digest in keys:
+            row = conn.execute(
+                "SELECT n FROM pseudonyms WHERE namespace = ? AND ent = ? AND digest = ?",
+                (self.namespace, ent, digest),
+            ).fetchone()
+            if row:
+                out[(ent, digest)] = row[0]
+        return out
+
+    def drop(self) -> None:
+        """Forget this namespace (e.g. a finished batch)."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM pseudonyms WHERE namespace = ?", (self.namespace,))
+        conn.execute("DELETE FROM counters WHERE namespace = ?", (self.namespace,))
+        conn.execute("COMMIT")
+        with self._lock:
+            self._index.clear()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS pseudonyms ("
+        " namespace TEXT NOT NULL, ent TEXT NOT NULL, digest TEXT NOT NULL,"
+        " n INTEGER NOT NULL, PRIMARY KEY (namespace, ent, digest))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS counters ("
+        " namespace TEXT NOT NULL, ent TEXT NOT NULL, next_n INTEGER NOT NULL,"
+        " PRIMARY KEY (namespace, ent))"
+    )
+    return conn
+
+
+# ---------------------------------------------------------------------
+# Scope selection
+# ---------------------------------------------------------------------
+_global_tables: Dict[str, DurablePseudonymTable] = {}
+_global_lock = threading.Lock()
+
+
+def _db_path() -> str:
+    return os.getenv("REDACTIFY_PSEUDONYM_DB", DEFAULT_DB)
+
+
+def global_table() -> DurablePseudonymTable:
+    """The process-wide table for scope: global."""
+    path = _db_path()
+    with _global_lock:
+        table = _global_tables.get(path)
+        if table is None:
+            table = _global_tables[path] = DurablePseudonymTable(path, "global")
+        return table
+
+
+def batch_table(policy: Policy, cross_process: bool = False) -> Optional[PseudonymTable]:
+    """
+    Table to share across the documents of one batch, or None when each
+    document gets its own (per_document). cross_process=True gives a
+    per_batch batch a durable namespace, so jobs in several worker
+    processes number values the same way; drop() it when the batch is done.
+    """
+    scope = policy.pseudonym_scope
+    if scope == "global":
+        return global_table()
+    if scope == "per_batch":
+        if cross_process:
+            return DurablePseudonymTable(_db_path(), f"batch:{uuid.uuid4().hex}")
+        return PseudonymTable()
+    return None
+
+
+def release_batch_table(table: Optional[PseudonymTable]) -> None:
+    """Drop a cross-process per_batch namespace once its batch is done."""
+    if isinstance(table, DurablePseudonymTable) and table.namespace.startswith("batch:"):
+        table.drop()
@@ -2,18 +2,19 @@
 
 from __future__ import annotations
 
-from typing import List, Tuple
-
-try:
-    import fitz  # PyMuPDF
-except ImportError:  # pragma: no cover
-    fitz = None
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
 
+from .metrics import METRICS
 from .models import Span
-from .policy import load_policy, Policy
-from .detect_regex import find_regex_spans
-from .detect_ner import ner_spans
-from .resolve import merge_spans
+from .ingest import apply_pdf_redactions, ingest_pdf, load_fitz
+from .pdf_layout import PageLayout, Rect
+from .policy import Policy
+from .registry import CompiledPolicy, resolve_policy
+from .pipeline import _collect_batch
 
 
 # ---------------------------------------------------------------------
@@ -30,9 +31,7 @@ def redact_pdf_in_place(
     NOTE: This helper assumes you already mapped text spans to PDF coordinates.
     That mapping step (OCR + layout) is not implemented here.
     """
-    if fitz is None:
-        raise RuntimeError("PyMuPDF (fitz) is required for PDF redaction")
-
+    fitz = load_fitz()
     doc = fitz.open(input_path)
 
     for page_index, entries in enumerate(spans_per_page):
@@ -51,20 +50,81 @@ def redact_pdf_in_place(
 # ---------------------------------------------------------------------
 # Higher-level helper: bytes in → bytes out, auto-detect PII per page
 # ---------------------------------------------------------------------
-def _collect_spans(text: str, policy: Policy) -> List[Span]:
-    """Collect regex + NER spans on a piece of text."""
-    spans: List[Span] = []
-    spans += find_regex_spans(text, policy)
-    spans = merge_spans(spans)
-    ners = ner_spans(text, policy)
-    spans = merge_spans(spans, ners)
-    return spans
+def _page_rects(layout: PageLayout, policy: Policy) -> List[Rect]:
+    """Detect PII on one page and return the rectangles to redact."""
+    if not layout.text.strip():
+        # Likely an image-only / scanned page; nothing to redact
+        return []
+
+    rects: List[Rect] = []
+    spans = _collect_batch(layout.text, policy)
+    METRICS.observe("redactify_input_chars", len(layout.text))
+    METRICS.record_spans(spans)
+    # Each span maps to the boxes of its own glyphs, so only the
+    # detected occurrence is redacted (not every match of the string)
+    for start, end in zip(spans.starts, spans.ends):
+        rects.extend(layout.rects_for(start, end))
+    return rects
+
+
+# Per-worker state for parallel mode: the document is opened once per
+# worker from a temp file (shared through the OS page cache), not
+# re-sent with every shard.
+_WORKER_DOC = None
+_WORKER_POLICY = None
+
+
+def _init_pdf_worker(pdf_path: str, policy: CompiledPolicy) -> None:
+    global _WORKER_DOC, _WORKER_POLICY
+    _WORKER_DOC = load_fitz().open(pdf_path)
+    _WORKER_POLICY = policy
+
+
+def _detect_pages(page_indices: Sequence[int]) -> Tuple[List[Tuple[int, List[Rect]]], dict]:
+    found = [
+        (i, _page_rects(PageLayout.from_page(_WORKER_DOC[i]), _WORKER_POLICY))
+        for i in page_indices
+    ]
+    # Ship this worker's metrics back with the shard
+    return found, METRICS.drain()
+
+
+def _parallel_page_rects(
+    data: bytes,
+    page_count: int,
+    policy: CompiledPolicy,
+    workers: int,
+) -> Dict[int, List[Rect]]:
+    # Several interleaved shards per worker, so a run of heavy pages is
+    # spread out and no worker sits idle at the end
+    n_shards = min(page_count, workers * 4)
+    shards = [list(range(i, page_count, n_shards)) for i in range(n_shards)]
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_pdf_worker,
+            initargs=(path, policy),
+        ) as ex:
+            rects: Dict[int, List[Rect]] = {}
+            for part, metrics in ex.map(_detect_pages, shards):
+                rects.update(part)
+                METRICS.merge(metrics)
+            return rects
+    finally:
+        os.unlink(path)
 
 
 def redact_pdf_bytes(
     data: bytes,
     policy_path: str = "configs/policy.yaml",
     mode: str = "blackout",
+    policy: Optional[Policy | CompiledPolicy] = None,
+    workers: int = 1,
 ) -> bytes:
     """
     Visually redact a PDF in-memory using blackout/whiteout rectangles.
@@ -77,42 +137,38 @@ def redact_pdf_bytes(
       - "blackout": black rectangles over PII
       - "whiteout": white rectangles over PII
 
+    workers:
+      - 1: pages are processed serially in this process.
+      - > 1: page detection is sharded across that many processes (each
+        loads the model once); this process then applies all redactions
+        and saves. Worth it for long documents only.
+
     Returns:
       redacted PDF as bytes.
     """
-    if fitz is None:
-        raise RuntimeError("PyMuPDF (fitz) is required for PDF redaction")
+    fitz = load_fitz()
 
     if mode not in ("blackout", "whiteout"):
         # Non-visual modes don't make sense here; default to blackout.
         mode = "blackout"
 
-    policy = load_policy(policy_path)
-    doc = fitz.open(stream=data, filetype="pdf")
-
-    fill_color = (0, 0, 0) if mode == "blackout" else (1, 1, 1)
-
-    for page in doc:
-        page_text = page.get_text("text")
-        if not page_text or not page_text.strip():
-            # Likely an image-only / scanned page; nothing to redact
-            continue
-
-        spans = _collect_spans(page_text, policy)
-
-        for span in spans:
-            original = page_text[span.start:span.end]
-            if not original.strip():
-                continue
-
-            # Search for this substring on the page and redact all matches
-            rects = page.search_for(original)
-            for rect in rects:
-                page.add_redact_annot(rect, fill=fill_color)
-
-        # Apply all redactions on this page
-        page.apply_redactions()
-
-    out_bytes = doc.tobytes()
-    doc.close()
-    return out_bytes
+    policy = resolve_policy(policy, policy_path)
+
+    page_count = 0
+    if workers > 1:
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            page_count = len(doc)
+    if page_count > 1:
+        rects_by_page = _parallel_page_rects(
+            data, page_count, policy, min(workers, page_count)
+        )
+    else:
+        # Shared ingest cache: if the caller already parsed these bytes
+        # (e.g. for a text preview) the layouts are reused as-is
+        ingested = ingest_pdf(data)
+        rects_by_page = {
+            i: _page_rects(layout, policy) for i, layout in enumerate(ingested.pages)
+        }
+
+    # Single writer: annotations are only ever added in this process
+    return apply_pdf_redactions(data, rects_by_page, mode)
@@ -0,0 +1,334 @@
+# core/registry.py
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Tuple
+
+import yaml
+
+from core.policy import (
+    ColumnRule, DictionarySpec, EntityPolicy, NerSpec, Policy, parse_policy,
+)
+from core.detect_regex import REGEX_ENTITIES, RegexScanner, build_scanner
+from core.detect_dict import DictMatcher, matchers_for, term_files
+from core.detect_ner import LABEL_TO_ENTITY
+from core.cascade import NerRouter
+from core.resolve import Resolver
+from core.scoring import ThresholdFilter
+from core.transform import MODES, TransformPlan, compile_transform
+
+
+# Default placeholder per action when the policy doesn't set one
+_DEFAULT_PLACEHOLDERS = {
+    "pseudonymize": "{ent}_{{n}}",
+    "redact": "[{ent}]",
+    "replace": "{ent}_VALUE",
+}
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    """
+    Immutable, pre-resolved view of a Policy.
+
+    Everything that used to be looked up per span (thresholds, actions,
+    placeholders, mask rules, which detectors are needed) is resolved once
+    here. It exposes the same read API as Policy, so detectors and
+    transforms accept either.
+    """
+
+    fingerprint: str
+    path: Optional[str]
+    entities: Mapping[str, EntityPolicy]
+    entity_ids: FrozenSet[str]
+    thresholds: Mapping[str, float]
+    actions: Mapping[str, str]
+    placeholders: Mapping[str, Optional[str]]
+    mask_rules: Mapping[str, Mapping[str, Any]]
+    regex_entities: Tuple[str, ...]
+    ner_entities: FrozenSet[str]
+    preserve_separators: bool = True
+    pseudonym_scope: str = "per_document"
+    chunk_size: int = 100_000
+    chunk_overlap: int = 200
+    ner_cascade: bool = False
+    ner_cascade_min_alpha: float = 0.5
+    ner_cascade_max_token: int = 40
+    ner: NerSpec = NerSpec()
+    source_weights: Mapping[str, float] = field(default_factory=dict)
+    label_confidence: Mapping[str, Mapping[str, float]] = field(default_factory=dict)
+    resolution_priority: Tuple[str, ...] = ("conf", "length")
+    source_order: Tuple[str, ...] = ("regex", "dict", "ner")
+    entity_order: Tuple[str, ...] = ()
+    dictionaries: Tuple[DictionarySpec, ...] = ()
+    column_rules: Mapping[str, ColumnRule] = field(default_factory=dict)
+    profile_rows: int = 200
+    scanner: Optional[RegexScanner] = None
+    scorer: Optional[ThresholdFilter] = None
+    resolver: Optional[Resolver] = None
+    router: Optional[NerRouter] = None
+    # (version, matcher) per dictionary automaton, resolved at compile time
+    dict_matchers: Tuple[Tuple[str, DictMatcher], ...] = ()
+    # (path, mtime_ns, size) of the term files they were built from
+    dict_files: Tuple[Tuple[str, int, int], ...] = ()
+    transforms: Mapping[str, TransformPlan] = field(default_factory=dict)
+
+    def threshold_for(self, ent: str) -> float:
+        return self.thresholds.get(ent, 0.5)
+
+    def action_for(self, ent: str) -> str:
+        return self.actions.get(ent, "none")
+
+    def entity_policy(self, ent: str) -> EntityPolicy | None:
+        return self.entities.get(ent)
+
+    def to_policy(self) -> Policy:
+        """Plain (mutable) Policy with the same settings."""
+        return Policy(
+            entities=dict(self.entities),
+            preserve_separators=self.preserve_separators,
+            pseudonym_scope=self.pseudonym_scope,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            ner_cascade=self.ner_cascade,
+            ner_cascade_min_alpha=self.ner_cascade_min_alpha,
+            ner_cascade_max_token=self.ner_cascade_max_token,
+            ner=self.ner,
+            source_weights=dict(self.source_weights),
+            label_confidence={k: dict(v) for k, v in self.label_confidence.items()},
+            resolution_priority=list(self.resolution_priority),
+            source_order=list(self.source_order),
+            entity_order=list(self.entity_order),
+            dictionaries=list(self.dictionaries),
+            column_rules=dict(self.column_rules),
+            profile_rows=self.profile_rows,
+        )
+
+    def __reduce__(self):
+        # MappingProxyType can't be pickled; rebuild from the plain policy
+        # so compiled policies can be shipped to worker processes.
+        return (compile_policy, (self.to_policy(), self.fingerprint, self.path))
+
+
+def _policy_fingerprint(policy: Policy) -> str:
+    h = hashlib.sha256()
+    h.update(repr(sorted((k, repr(v)) for k, v in policy.entities.items())).encode())
+    h.update(
+        repr(
+            (
+                policy.preserve_separators,
+                policy.pseudonym_scope,
+                policy.chunk_size,
+                policy.chunk_overlap,
+                policy.ner_cascade,
+                policy.ner_cascade_min_alpha,
+                policy.ner_cascade_max_token,
+                policy.ner,
+                sorted(policy.source_weights.items()),
+                sorted((k, sorted(v.items())) for k, v in policy.label_confidence.items()),
+                policy.resolution_priority,
+                policy.source_order,
+                policy.entity_order,
+                policy.dictionaries,
+                term_files(policy),
+                sorted(policy.column_rules.items()),
+                policy.profile_rows,
+            )
+        ).encode()
+    )
+    return h.hexdigest()
+
+
+def compile_policy(
+    policy: Policy,
+    fingerprint: Optional[str] = None,
+    path: Optional[str] = None,
+) -> CompiledPolicy:
+    """Resolve a Policy into its immutable compiled form."""
+    if isinstance(policy, CompiledPolicy):
+        return policy
+
+    entities: Dict[str, EntityPolicy] = {}
+    placeholders: Dict[str, Optional[str]] = {}
+    mask_rules: Dict[str, Mapping[str, Any]] = {}
+    for ent_id, ep in policy.entities.items():
+        rules = MappingProxyType(dict(ep.mask_rules or {}))
+        # Private copy so later edits to the source Policy can't leak in
+        entities[ent_id] = EntityPolicy(
+            id=ep.id,
+            action=ep.action,
+            threshold=ep.threshold,
+            placeholder=ep.placeholder,
+            mask_rules=dict(rules) if ep.mask_rules is not None else None,
+        )
+        default = _DEFAULT_PLACEHOLDERS.get(ep.action)
+        placeholders[ent_id] = ep.placeholder or (
+            default.format(ent=ent_id) if default else None
+        )
+        mask_rules[ent_id] = rules
+
+    ent_ids = frozenset(entities)
+    ner_known = {e for e in LABEL_TO_ENTITY.values() if e}
+    regex_entities = tuple(e for e in REGEX_ENTITIES if e in ent_ids)
+    thresholds = {k: ep.threshold for k, ep in entities.items()}
+    label_confidence = {k: dict(v) for k, v in policy.label_confidence.items()}
+
+    return CompiledPolicy(
+        fingerprint=fingerprint or _policy_fingerprint(policy),
+        path=path,
+        entities=MappingProxyType(entities),
+        entity_ids=ent_ids,
+        thresholds=MappingProxyType(thresholds),
+        actions=MappingProxyType({k: ep.action for k, ep in entities.items()}),
+        placeholders=MappingProxyType(placeholders),
+        mask_rules=MappingProxyType(mask_rules),
+        regex_entities=regex_entities,
+        ner_entities=frozenset(ent_ids & ner_known),
+        preserve_separators=policy.preserve_separators,
+        pseudonym_scope=policy.pseudonym_scope,
+        chunk_size=policy.chunk_size,
+        chunk_overlap=policy.chunk_overlap,
+        ner_cascade=policy.ner_cascade,
+        ner_cascade_min_alpha=policy.ner_cascade_min_alpha,
+        ner_cascade_max_token=policy.ner_cascade_max_token,
+        ner=policy.ner,
+        source_weights=MappingProxyType(dict(policy.source_weights)),
+        label_confidence=MappingProxyType(
+            {k: MappingProxyType(v) for k, v in label_confidence.items()}
+        ),
+        resolution_priority=tuple(policy.resolution_priority),
+        source_order=tuple(policy.source_order),
+        entity_order=tuple(policy.entity_order),
+        dictionaries=tuple(policy.dictionaries),
+        column_rules=MappingProxyType(dict(policy.column_rules)),
+        profile_rows=policy.profile_rows,
+        scanner=build_scanner(regex_entities),
+        scorer=ThresholdFilter(thresholds, policy.source_weights, label_confidence),
+        resolver=Resolver(
+            policy.resolution_priority,
+            policy.source_order,
+            policy.entity_order or tuple(entities),
+        ),
+        router=(
+            NerRouter(policy.ner_cascade_min_alpha, policy.ner_cascade_max_token)
+            if policy.ner_cascade
+            else None
+        ),
+        dict_matchers=tuple(matchers_for(policy)) if policy.dictionaries else (),
+        dict_files=term_files(policy),
+        transforms=MappingProxyType(
+            {mode: compile_transform(Policy(entities=entities), mode) for mode in MODES}
+        ),
+    )
+
+
+class PolicyRegistry:
+    """
+    Process-wide LRU of compiled policies.
+
+    Entries are keyed by (absolute path, mtime, size), plus the same for
+    each term file the policy references (checked on every hit). When a
+    file's mtime changes but its content hash doesn't, the existing
+    compiled policy is reused and simply re-keyed. Thread-safe.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int, int], CompiledPolicy]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> CompiledPolicy:
+        abspath = os.path.abspath(path)
+        st = os.stat(abspath)
+        key = (abspath, st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+        if compiled is not None and _files_unchanged(compiled.dict_files):
+            return compiled
+
+        with open(abspath, "rb") as f:
+            raw = f.read()
+        policy = parse_policy(yaml.safe_load(raw.decode("utf-8")))
+        digest = _file_fingerprint(raw, term_files(policy))
+
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == abspath]
+            compiled = None
+            for k in stale:
+                prev = self._entries.pop(k)
+                if prev.fingerprint == digest:
+                    compiled = prev
+
+        if compiled is None:
+            compiled = compile_policy(policy, fingerprint=digest, path=abspath)
+
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop one policy (by path) or, with no argument, everything."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            abspath = os.path.abspath(path)
+            for k in [k for k in self._entries if k[0] == abspath]:
+                del self._entries[k]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _files_unchanged(files: Tuple[Tuple[str, int, int], ...]) -> bool:
+    for path, mtime_ns, size in files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if (st.st_mtime_ns, st.st_size) != (mtime_ns, size):
+            return False
+    return True
+
+
+def _file_fingerprint(raw: bytes, files: Tuple[Tuple[str, int, int], ...]) -> str:
+    # the YAML's hash, plus the term files' stamps when it has any, so
+    # batch resume and caches see a new deny-list as a new policy
+    h = hashlib.sha256(raw)
+    if files:
+        h.update(repr(files).encode("utf-8"))
+    return h.hexdigest()
+
+
+_REGISTRY = PolicyRegistry()
+
+
+def get_policy(path: str) -> CompiledPolicy:
+    """Load (or fetch from cache) the compiled policy for a YAML path."""
+    return _REGISTRY.get(path)
+
+
+def invalidate_policy(path: Optional[str] = None) -> None:
+    _REGISTRY.invalidate(path)
+
+
+def resolve_policy(
+    policy: Policy | CompiledPolicy | None,
+    policy_path: str,
+) -> CompiledPolicy:
+    """Pick the explicit policy if given, otherwise load from the registry."""
+    if policy is None:
+        return get_policy(policy_path)
+    return compile_policy(policy)
@@ -2,15 +2,260 @@
 
 from __future__ import annotations
 
-from typing import List
+import heapq
+from array import array
+from bisect import bisect_left
+from typing import Iterator, List, Optional, Sequence, Tuple
 from core.models import Span
+from core.policy import RESOLUTION_PRIORITIES, Policy
+from core.span_batch import SpanBatch, name_id
 
+# What overlap resolution can rank candidates by (RESOLUTION_PRIORITIES):
+#   conf   - higher confidence
+#   length - longer span
+#   source - earlier in source_order
+#   entity - earlier in entity_order (default: order of the policy's entities)
 
-def merge_spans(primary: List[Span], extra: List[Span] | None = None) -> List[Span]:
+DEFAULT_PRIORITY = ("conf", "length")
+DEFAULT_SOURCE_ORDER = ("regex", "dict", "ner")
+
+# (start, -end, row): heap order is start, longer first, then stream / row
+_Item = Tuple[int, int, int]
+
+
+def _sort_order(starts: Sequence[int], ends: Sequence[int]) -> List[int]:
+    """Row positions ordered by (start, -end)."""
+    n = len(starts)
+    if all(starts[i] < starts[i + 1] for i in range(n - 1)):
+        return list(range(n))  # detectors emit hits in text order
+    # one int per row instead of a tuple: start major, longer first
+    width = max(ends) + 1
+    keys = [s * width + (width - e) for s, e in zip(starts, ends)]
+    return sorted(range(n), key=keys.__getitem__)
+
+
+class Resolver:
+    """
+    Overlap resolution over several detector streams at once.
+
+    Each stream (one SpanBatch per detector, or per chunk) is already in
+    text order, so they're combined with a heap-based k-way merge:
+    O(n log k) for k streams. The merged stream is cut into overlap
+    clusters (maximal runs whose spans chain together) in one sweep; a
+    span that overlaps nothing is kept as-is.
+
+    Inside a cluster, candidates are taken best-first by `priority` and
+    kept if they don't overlap anything kept so far (a Fenwick tree over
+    the cluster's start positions, so O(n log n) even for one huge
+    cluster). So in a chain like a long ADDRESS that
+    covers two regex hits, the outcome depends only on the ranking, not
+    on which span happened to come first. Remaining ties go to the earlier
+    start, the longer span, the earlier stream and then the earlier row,
+    so the result is deterministic.
+    """
+
+    def __init__(
+        self,
+        priority: Sequence[str] = DEFAULT_PRIORITY,
+        source_order: Sequence[str] = DEFAULT_SOURCE_ORDER,
+        entity_order: Sequence[str] = (),
+    ):
+        unknown = [p for p in priority if p not in RESOLUTION_PRIORITIES]
+        if unknown:
+            raise ValueError(f"Unknown resolution priority: {unknown!r}")
+        self.priority = tuple(priority)
+        self.source_order = tuple(source_order)
+        self.entity_order = tuple(entity_order)
+        self._source_rank = {name_id(s): i for i, s in enumerate(self.source_order)}
+        self._entity_rank = {name_id(e): i for i, e in enumerate(self.entity_order)}
+
+    def __reduce__(self):
+        # interned ids are per process
+        return (Resolver, (self.priority, self.source_order, self.entity_order))
+
+    # -- public -------------------------------------------------------
+    def resolve(self, streams: Sequence[SpanBatch]) -> SpanBatch:
+        """One non-overlapping batch, in text order, from all streams."""
+        merged = _merge_streams([s for s in streams if len(s)])
+        keep = self.select(merged)
+        if len(keep) == len(merged):
+            return merged
+        return merged.take(keep)
+
+    def select(self, batch: SpanBatch) -> List[int]:
+        """
+        Rows of a batch sorted by (start, -end) that survive, in order.
+        """
+        n = len(batch)
+        if n < 2:
+            return list(range(n))
+        starts, ends = batch.starts, batch.ends
+        keep: List[int] = []
+        lo = 0
+        cluster_end = ends[0]
+        for i in range(1, n):
+            if starts[i] >= cluster_end:
+                if i - lo == 1:
+                    keep.append(lo)
+                else:
+                    keep.extend(self._settle(batch, lo, i))
+                lo = i
+                cluster_end = ends[i]
+            elif ends[i] > cluster_end:
+                cluster_end = ends[i]
+        if n - lo == 1:
+            keep.append(lo)
+        else:
+            keep.extend(self._settle(batch, lo, n))
+        return keep
+
+    # -- clusters -----------------------------------------------------
+    def _settle(self, batch: SpanBatch, lo: int, hi: int) -> List[int]:
+        """Best-first pick among the overlapping rows lo..hi-1."""
+        starts, ends = batch.starts, batch.ends
+        # Kept spans never overlap, so a candidate [start, end) clashes iff
+        # a kept span starts inside it, or the last kept span starting
+        # before it reaches past its start. Both are Fenwick queries over
+        # the cluster's (sorted) start positions: O(log n) per candidate.
+        pos = list(dict.fromkeys(starts[lo:hi]))
+        taken = _KeptStarts(len(pos))
+        kept: List[int] = []
+        for i in sorted(range(lo, hi), key=lambda i: self._rank(batch, i)):
+            start, end = starts[i], ends[i]
+            k = bisect_left(pos, start)
+            before = taken.count(k)
+            if taken.count(bisect_left(pos, end, k)) > before:
+                continue
+            if before and taken.end_of(before) > start:
+                continue
+            taken.add(k, end)
+            kept.append(i)
+        kept.sort()
+        return kept
+
+    def _rank(self, batch: SpanBatch, i: int) -> tuple:
+        key = []
+        for p in self.priority:
+            if p == "conf":
+                # within 1e-6 counts as a tie
+                key.append(-round(batch.confs[i], 6))
+            elif p == "length":
+                key.append(batch.starts[i] - batch.ends[i])
+            elif p == "source":
+                key.append(self._source_rank.get(batch.sources[i], len(self._source_rank)))
+            else:
+                key.append(self._entity_rank.get(batch.ents[i], len(self._entity_rank)))
+        # row order = (start, -end, stream, row) from the merge
+        key.append(i)
+        return tuple(key)
+
+
+class _KeptStarts:
+    """
+    Fenwick tree over a cluster's distinct start positions 0..n-1,
+    counting kept spans per position, plus each kept span's end.
+    """
+
+    def __init__(self, n: int):
+        self._tree = [0] * (n + 1)
+        self._ends = [0] * n
+        self._top = 1 << n.bit_length() if n else 0
+
+    def add(self, k: int, end: int) -> None:
+        self._ends[k] = end
+        k += 1
+        tree = self._tree
+        while k < len(tree):
+            tree[k] += 1
+            k += k & -k
+
+    def count(self, k: int) -> int:
+        """Kept spans starting at positions < k."""
+        tree = self._tree
+        total = 0
+        while k:
+            total += tree[k]
+            k -= k & -k
+        return total
+
+    def end_of(self, c: int) -> int:
+        """End of the c-th kept span (1-based, in start order)."""
+        tree = self._tree
+        k = 0
+        step = self._top
+        while step:
+            nxt = k + step
+            if nxt < len(tree) and tree[nxt] < c:
+                k = nxt
+                c -= tree[nxt]
+            step >>= 1
+        return self._ends[k]
+
+
+def _sorted(batch: SpanBatch) -> SpanBatch:
+    order = _sort_order(batch.starts, batch.ends)
+    if order == list(range(len(order))):
+        return batch
+    return batch.take(order)
+
+
+def _items(base: int, batch: SpanBatch) -> Iterator[_Item]:
+    return zip(batch.starts, [-e for e in batch.ends], range(base, base + len(batch)))
+
+
+def _merge_streams(streams: List[SpanBatch]) -> SpanBatch:
+    """k-way merge of the streams into one batch sorted by (start, -end)."""
+    streams = [_sorted(s) for s in streams]
+    if not streams:
+        return SpanBatch()
+    if len(streams) == 1:
+        return streams[0]
+    # rows of all streams back to back; the heap yields their merged order
+    combined = SpanBatch()
+    items = []
+    for b in streams:
+        items.append(_items(len(combined), b))
+        combined.extend(b)
+    return combined.take([item[2] for item in heapq.merge(*items)])
+
+
+_DEFAULT_RESOLVER: Optional[Resolver] = None
+
+
+def resolver_for(policy: Optional[Policy]) -> Resolver:
+    """The policy's compiled resolver, or one built from a plain Policy."""
+    global _DEFAULT_RESOLVER
+    resolver = getattr(policy, "resolver", None)
+    if resolver is not None:
+        return resolver
+    if policy is None:
+        if _DEFAULT_RESOLVER is None:
+            _DEFAULT_RESOLVER = Resolver()
+        return _DEFAULT_RESOLVER
+    return Resolver(
+        policy.resolution_priority,
+        policy.source_order,
+        policy.entity_order or tuple(policy.entities),
+    )
+
+
+def merge_batch(batch: SpanBatch, policy: Optional[Policy] = None) -> SpanBatch:
+    """Resolve overlaps within one batch; the result is in text order."""
+    if not len(batch):
+        return batch
+    return resolver_for(policy).resolve([batch])
+
+
+def merge_spans(
+    primary: List[Span],
+    extra: List[Span] | None = None,
+    policy: Optional[Policy] = None,
+) -> List[Span]:
     """
     Merge two span lists and resolve overlaps by:
     - preferring higher confidence
     - breaking ties by preferring longer spans
+    (or the policy's resolution priority, if one is given)
     """
 
     spans = list(primary)
@@ -20,24 +265,14 @@ def merge_spans(primary: List[Span], extra: List[Span] | None = None) -> List[Sp
     if not spans:
         return []
 
-    spans.sort(key=lambda s: (s.start, -s.end))
-
-    result: List[Span] = []
-    for span in spans:
-        if not result:
-            result.append(span)
-            continue
-
-        last = result[-1]
-        if not last.overlaps(span):
-            result.append(span)
-            continue
-
-        # On overlap, choose better span
-        if span.conf > last.conf + 1e-6:
-            result[-1] = span
-        elif abs(span.conf - last.conf) <= 1e-6 and span.length() > last.length():
-            result[-1] = span
-        # else keep last
-
-    return result
+    batch = SpanBatch(
+        array("q", [s.start for s in spans]),
+        array("q", [s.end for s in spans]),
+        array("H", [name_id(s.ent) for s in spans]),
+        array("d", [s.conf for s in spans]),
+        array("H", [name_id(s.source) for s in spans]),
+        array("H", [name_id(s.ent) for s in spans]),
+    )
+    order = _sort_order(batch.starts, batch.ends)
+    keep = resolver_for(policy).select(batch.take(order))
+    return [spans[order[j]] for j in keep]
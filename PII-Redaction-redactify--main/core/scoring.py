@@ -0,0 +1,100 @@
+# core/scoring.py
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Mapping, Optional
+
+from .metrics import METRICS
+from .policy import Policy
+from .span_batch import SpanBatch, name_id
+
+# Threshold for an entity the policy doesn't list (same as threshold_for)
+DEFAULT_THRESHOLD = 0.5
+
+
+class ThresholdFilter:
+    """
+    Scoring stage between detection and merge.
+
+    1. Calibrate: a (source, label) confidence from the policy replaces the
+       detector's own (e.g. ner/PERSON -> 0.9), then the per-source weight
+       multiplies it (e.g. ner -> 0.95).
+    2. Threshold: keep spans whose calibrated confidence is at least the
+       entity's `threshold` from the policy.
+
+    Both passes run over the batch's flat columns; nothing is done for
+    calibration when the policy has none.
+    """
+
+    def __init__(
+        self,
+        thresholds: Mapping[str, float],
+        source_weights: Optional[Mapping[str, float]] = None,
+        label_confidence: Optional[Mapping[str, Mapping[str, float]]] = None,
+    ):
+        self.thresholds: Dict[str, float] = dict(thresholds)
+        self.source_weights = {
+            s: float(w) for s, w in (source_weights or {}).items() if float(w) != 1.0
+        }
+        self.label_confidence = {
+            s: dict(m) for s, m in (label_confidence or {}).items() if m
+        }
+        # the same, keyed by the batch's interned ids
+        self._th = {name_id(ent): t for ent, t in self.thresholds.items()}
+        self._weights = {name_id(s): w for s, w in self.source_weights.items()}
+        self._by_label = {
+            (name_id(s), name_id(label)): conf
+            for s, m in self.label_confidence.items()
+            for label, conf in m.items()
+        }
+
+    def __reduce__(self):
+        # interned ids are per process
+        return (ThresholdFilter, (self.thresholds, self.source_weights, self.label_confidence))
+
+    @property
+    def calibrates(self) -> bool:
+        return bool(self._weights or self._by_label)
+
+    def calibrate(self, batch: SpanBatch) -> None:
+        """Rewrite batch.confs in place."""
+        if not self.calibrates or not len(batch):
+            return
+        weights = self._weights
+        by_label = self._by_label
+        batch.confs = array(
+            "d",
+            [
+                by_label.get((src, label), conf) * weights.get(src, 1.0)
+                for conf, src, label in zip(batch.confs, batch.sources, batch.labels)
+            ],
+        )
+
+    def apply(self, batch: SpanBatch) -> SpanBatch:
+        """Calibrated batch without the sub-threshold rows."""
+        if not len(batch):
+            return batch
+        self.calibrate(batch)
+        th = self._th
+        keep = [
+            conf >= th.get(ent, DEFAULT_THRESHOLD)
+            for conf, ent in zip(batch.confs, batch.ents)
+        ]
+        kept = sum(keep)
+        if kept == len(keep):
+            return batch
+        METRICS.inc("redactify_spans_dropped_total", len(keep) - kept, stage="threshold")
+        return batch.compress(keep)
+
+
+def scorer_for(policy: Policy) -> ThresholdFilter:
+    """The policy's compiled filter, or a fresh one for a plain Policy."""
+    scorer = getattr(policy, "scorer", None)
+    if scorer is not None:
+        return scorer
+    return ThresholdFilter(
+        {ent: ep.threshold for ent, ep in policy.entities.items()},
+        getattr(policy, "source_weights", None),
+        getattr(policy, "label_confidence", None),
+    )
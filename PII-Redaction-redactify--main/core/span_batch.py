@@ -0,0 +1,233 @@
+# core/span_batch.py
+
+from __future__ import annotations
+
+import threading
+from array import array
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .models import Span
+
+# (start, end, ent, conf, source)
+Row = Tuple[int, int, str, float, str]
+
+# Entity, source and detector-label names are interned to small ints so
+# every column is a flat array. The table is process-wide and append-only;
+# ids are never sent to another process (batches pickle with names).
+_NAMES: List[str] = []
+_IDS: Dict[str, int] = {}
+_names_lock = threading.Lock()
+
+
+def name_id(name: str) -> int:
+    i = _IDS.get(name)
+    if i is None:
+        with _names_lock:
+            i = _IDS.get(name)
+            if i is None:
+                _NAMES.append(name)
+                i = _IDS[name] = len(_NAMES) - 1
+    return i
+
+
+def id_name(i: int) -> str:
+    return _NAMES[i]
+
+
+class SpanBatch:
+    """
+    Spans stored column-wise: offsets, entity / source / label ids and
+    confidences in parallel typed arrays.
+
+    This is what flows through detection, thresholding, merging and the
+    transform. A document with hundreds of thousands of emails is a few
+    arrays instead of as many Span objects (each with a __dict__ and a
+    flags dict) for the GC to track. Span objects are only built at the
+    API boundary (to_spans).
+
+    `labels` is the detector's own name for the hit (the regex entity, or
+    the spaCy label such as PERSON / GPE), which calibration keys on.
+    """
+
+    __slots__ = ("starts", "ends", "ents", "confs", "sources", "labels")
+
+    def __init__(
+        self,
+        starts: Optional[array] = None,
+        ends: Optional[array] = None,
+        ents: Optional[array] = None,
+        confs: Optional[array] = None,
+        sources: Optional[array] = None,
+        labels: Optional[array] = None,
+    ):
+        self.starts = starts if starts is not None else array("q")
+        self.ends = ends if ends is not None else array("q")
+        self.ents = ents if ents is not None else array("H")
+        self.confs = confs if confs is not None else array("d")
+        self.sources = sources if sources is not None else array("H")
+        self.labels = labels if labels is not None else array("H")
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __reduce__(self):
+        names = _NAMES
+        return (
+            _from_named,
+            (
+                self.starts,
+                self.ends,
+                [names[i] for i in self.ents],
+                self.confs,
+                [names[i] for i in self.sources],
+                [names[i] for i in self.labels],
+            ),
+        )
+
+    # -- building -----------------------------------------------------
+    def append(
+        self, start: int, end: int, ent: str, conf: float, source: str, label: str
+    ) -> None:
+        self.starts.append(start)
+        self.ends.append(end)
+        self.ents.append(name_id(ent))
+        self.confs.append(conf)
+        self.sources.append(name_id(source))
+        self.labels.append(name_id(label))
+
+    def append_row(self, other: "SpanBatch", i: int) -> None:
+        """Copy row i of other."""
+        self.starts.append(other.starts[i])
+        self.ends.append(other.ends[i])
+        self.ents.append(other.ents[i])
+        self.confs.append(other.confs[i])
+        self.sources.append(other.sources[i])
+        self.labels.append(other.labels[i])
+
+    @classmethod
+    def from_hits(
+        cls,
+        hits: Sequence[Tuple[int, int, str]],
+        confidence: Dict[str, float],
+        source: str,
+    ) -> "SpanBatch":
+        """Build from (start, end, entity) tuples of one detector."""
+        ids = {ent: name_id(ent) for ent in {h[2] for h in hits}}
+        ents = array("H", [ids[h[2]] for h in hits])
+        return cls(
+            array("q", [h[0] for h in hits]),
+            array("q", [h[1] for h in hits]),
+            ents,
+            array("d", [confidence[h[2]] for h in hits]),
+            array("H", [name_id(source)]) * len(hits),
+            array("H", ents),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Row], offset: int = 0) -> "SpanBatch":
+        batch = cls()
+        batch.extend_rows(rows, offset)
+        return batch
+
+    @classmethod
+    def from_spans(cls, spans: Iterable[Span]) -> "SpanBatch":
+        return cls.from_rows((s.start, s.end, s.ent, s.conf, s.source) for s in spans)
+
+    def extend_rows(self, rows: Iterable[Row], offset: int = 0) -> None:
+        """Append (start, end, ent, conf, source) rows; label = ent."""
+        for s, e, ent, conf, source in rows:
+            eid = name_id(ent)
+            self.starts.append(s + offset)
+            self.ends.append(e + offset)
+            self.ents.append(eid)
+            self.confs.append(conf)
+            self.sources.append(name_id(source))
+            self.labels.append(eid)
+
+    def extend(self, other: "SpanBatch", offset: int = 0) -> None:
+        """Append all rows of other, shifted by offset."""
+        if offset:
+            self.starts.extend(s + offset for s in other.starts)
+            self.ends.extend(e + offset for e in other.ends)
+        else:
+            self.starts.extend(other.starts)
+            self.ends.extend(other.ends)
+        self.ents.extend(other.ents)
+        self.confs.extend(other.confs)
+        self.sources.extend(other.sources)
+        self.labels.extend(other.labels)
+
+    # -- selecting ----------------------------------------------------
+    def compress(self, keep: Sequence[bool]) -> "SpanBatch":
+        """Rows where keep is true, as a new batch."""
+        return SpanBatch(
+            array("q", compress(self.starts, keep)),
+            array("q", compress(self.ends, keep)),
+            array("H", compress(self.ents, keep)),
+            array("d", compress(self.confs, keep)),
+            array("H", compress(self.sources, keep)),
+            array("H", compress(self.labels, keep)),
+        )
+
+    def take(self, index: Sequence[int]) -> "SpanBatch":
+        """Rows at the given positions, in that order."""
+        return SpanBatch(
+            array("q", [self.starts[i] for i in index]),
+            array("q", [self.ends[i] for i in index]),
+            array("H", [self.ents[i] for i in index]),
+            array("d", [self.confs[i] for i in index]),
+            array("H", [self.sources[i] for i in index]),
+            array("H", [self.labels[i] for i in index]),
+        )
+
+    def only(self, entities: Iterable[str]) -> "SpanBatch":
+        """Rows whose entity is in entities."""
+        wanted = {_IDS[e] for e in entities if e in _IDS}
+        return self.compress([e in wanted for e in self.ents])
+
+    # -- reading ------------------------------------------------------
+    def ent_names(self) -> List[str]:
+        names = _NAMES
+        return [names[i] for i in self.ents]
+
+    def counts(self) -> Dict[Tuple[str, str], int]:
+        """(entity, source) -> number of rows."""
+        by_id: Dict[Tuple[int, int], int] = {}
+        for pair in zip(self.ents, self.sources):
+            by_id[pair] = by_id.get(pair, 0) + 1
+        names = _NAMES
+        return {(names[e], names[s]): n for (e, s), n in by_id.items()}
+
+    def rows(self) -> List[Row]:
+        names = _NAMES
+        return [
+            (s, e, names[ent], c, names[src])
+            for s, e, ent, c, src in zip(
+                self.starts, self.ends, self.ents, self.confs, self.sources
+            )
+        ]
+
+    def to_spans(self, replacements: Optional[Sequence[str]] = None) -> List[Span]:
+        names = _NAMES
+        spans = [
+            Span(start=s, end=e, ent=names[ent], conf=c, source=names[src])
+            for s, e, ent, c, src in zip(
+                self.starts, self.ends, self.ents, self.confs, self.sources
+            )
+        ]
+        if replacements is not None:
+            for span, rep in zip(spans, replacements):
+                span.replacement = rep
+        return spans
+
+
+def _from_named(starts, ends, ents, confs, sources, labels) -> SpanBatch:
+    return SpanBatch(
+        starts,
+        ends,
+        array("H", [name_id(n) for n in ents]),
+        confs,
+        array("H", [name_id(n) for n in sources]),
+        array("H", [name_id(n) for n in labels]),
+    )
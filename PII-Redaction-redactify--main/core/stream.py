@@ -0,0 +1,158 @@
+# core/stream.py
+
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import Iterable, Iterator, List, Optional
+
+import regex as re
+
+from .metrics import METRICS, timed
+from .pipeline import _collect_batch, _filter_allowed
+from .policy import Policy
+from .pseudonyms import PseudonymTable, batch_table
+from .registry import CompiledPolicy, resolve_policy
+from .span_batch import SpanBatch
+from .transform import apply_batch
+
+
+# Last whitespace in a range (backwards search)
+_LAST_WS_RE = re.compile(r"(?r)\s")
+
+READ_BLOCK = 64 * 1024
+
+
+def _safe_cut(buf: str, spans: SpanBatch, lookahead: int) -> int:
+    """
+    Offset up to which buf can be emitted now.
+
+    The last `lookahead` chars are held back, the cut is moved onto
+    whitespace, and then pulled in front of any span that straddles it.
+    """
+    limit = len(buf) - lookahead
+    m = _LAST_WS_RE.search(buf, 0, limit) if limit > 0 else None
+    cut = m.end() if m else max(limit, 0)
+    for start, end in zip(spans.starts, spans.ends):
+        if start < cut < end:
+            cut = start
+            break
+    return cut
+
+
+def _forced_cut(buf: str, spans: SpanBatch, lookahead: int) -> int:
+    """
+    Cut for when _safe_cut finds none: the lookahead boundary, pushed
+    past any span straddling it so that span is emitted (and redacted)
+    whole instead of being dropped from both halves.
+    """
+    cut = len(buf) - lookahead
+    for start, end in zip(spans.starts, spans.ends):
+        if start < cut < end:
+            return end
+    return cut
+
+
+def redact_stream(
+    chunks: Iterable[str],
+    policy: Optional[Policy | CompiledPolicy] = None,
+    policy_path: str = "configs/policy.yaml",
+    mode: str = "placeholder",
+    allowed_entities: Optional[Iterable[str]] = None,
+    window: Optional[int] = None,
+    lookahead: Optional[int] = None,
+    pseudonyms: Optional[PseudonymTable] = None,
+) -> Iterator[str]:
+    """
+    Redact an arbitrarily long stream of text pieces, yielding output as
+    it becomes safe to emit.
+
+    Input is buffered until `window + lookahead` chars are available (by
+    default lookahead is the policy's chunk_overlap and the two add up to
+    its chunk_size). Detection runs on the buffer, and everything before a
+    safe cut point is transformed and yielded. Only the tail after the cut is kept, so memory stays
+    proportional to the window, not the stream. `lookahead` should be
+    longer than the longest entity you expect.
+
+    One pseudonym table is used for the whole stream (it's one document),
+    so PERSON_{n} numbering is the same as for a single redact_text call.
+    """
+    policy = resolve_policy(policy, policy_path)
+    lookahead = policy.chunk_overlap if lookahead is None else lookahead
+    window = window or max((policy.chunk_size or 100_000) - lookahead, lookahead, 1)
+    allowed = list(allowed_entities) if allowed_entities is not None else None
+    table = pseudonyms or batch_table(policy) or PseudonymTable()
+
+    pending: List[str] = []
+    pending_len = 0
+    for piece in chunks:
+        if not piece:
+            continue
+        pending.append(piece)
+        pending_len += len(piece)
+        if pending_len < window + lookahead:
+            continue
+
+        buf = "".join(pending)
+        while len(buf) >= window + lookahead:
+            spans = _collect_batch(buf, policy)
+            cut = _safe_cut(buf, spans, lookahead)
+            if cut <= 0:
+                # One entity longer than the whole buffer; give up on
+                # holding it back rather than growing without bound.
+                cut = _forced_cut(buf, spans, lookahead)
+            emit = _filter_allowed(spans.compress([e <= cut for e in spans.ends]), allowed)
+            yield _transform(buf[:cut], emit, policy, mode, table)
+            buf = buf[cut:]
+        pending = [buf]
+        pending_len = len(buf)
+
+    buf = "".join(pending)
+    if buf:
+        spans = _filter_allowed(_collect_batch(buf, policy), allowed)
+        yield _transform(buf, spans, policy, mode, table)
+
+
+def _transform(text, spans, policy, mode, table) -> str:
+    METRICS.observe("redactify_input_chars", len(text))
+    METRICS.record_spans(spans)
+    with timed("transform"):
+        return apply_batch(text, spans, policy, mode, table)[0]
+
+
+def _read_blocks(f, size: int = READ_BLOCK) -> Iterator[str]:
+    while True:
+        block = f.read(size)
+        if not block:
+            return
+        yield block
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(
+        description="Redact a text file (or stdin) to stdout with constant memory."
+    )
+    ap.add_argument("input", nargs="?", help="input file (default: stdin)")
+    ap.add_argument("--policy", default="configs/policy.yaml")
+    ap.add_argument("--mode", default="placeholder")
+    ap.add_argument("--window", type=int, default=None)
+    ap.add_argument("--lookahead", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    src = open(args.input, "r", encoding="utf-8", errors="replace") if args.input else sys.stdin
+    try:
+        for out in redact_stream(
+            _read_blocks(src),
+            policy_path=args.policy,
+            mode=args.mode,
+            window=args.window,
+            lookahead=args.lookahead,
+        ):
+            sys.stdout.write(out)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+
+
+if __name__ == "__main__":
+    main()
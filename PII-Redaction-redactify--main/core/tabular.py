@@ -0,0 +1,394 @@
+# core/tabular.py
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import replace
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+import regex as re
+
+from .cascade import routed_ner_batches
+from .detect_dict import dict_batch
+from .detect_ner import _needs_ner
+from .detect_regex import regex_batch
+from .metrics import METRICS, timed
+from .policy import ColumnRule, Policy
+from .pseudonyms import PseudonymTable, batch_table
+from .registry import CompiledPolicy, compile_policy, resolve_policy
+from .resolve import resolver_for
+from .scoring import scorer_for
+from .span_batch import SpanBatch
+from .transform import apply_batch
+
+# Rows per chunk: detection runs once per column per chunk
+DEFAULT_CHUNK_ROWS = 2000
+
+# Cells of a column are joined with this for one scan per column chunk.
+# No detector can match across it: \x00 is neither whitespace nor a word
+# char, and the line break stops EMAIL / dictionary terms.
+_SEP = "\x00\n\x00"
+
+# Profiled cells that can't hold any entity: short numbers, booleans
+_SCALAR_RE = re.compile(r"(?i)^\s*(?:[+-]?\d{1,6}(?:[.,]\d+)?|true|false|null|none|nan)?\s*$")
+# Free text, worth NER: long enough, several words
+_FREE_TEXT_CHARS = 24
+_FREE_TEXT_WORDS = 4
+
+Columns = Dict[str, List[Any]]
+
+# CSV cells past the header's width, all rows of a chunk in one column
+EXTRA_COLUMN = "(extra)"
+
+
+class TabularRedactor:
+    """
+    Column-aware redaction of table chunks ({column: [cells]}).
+
+    Each column gets a route, from the policy's tabular.columns rule or
+    else from profiling the first rows it sees:
+    - "entity": every non-empty cell is the rule's entity (no detection)
+    - "none": passed through (empty / short numeric / boolean columns).
+      Profiled "none" is provisional: such a column is profiled again
+      with every chunk and moves up as soon as one has text in it
+    - "regex": regex + dictionary detectors
+    - "full": regex + dictionary + NER (free-text columns)
+
+    Detection runs once per column chunk over its cells joined by _SEP,
+    then the redacted text is split back into cells. Only "full" columns
+    go through NER, batched over their cells. Pseudonym numbering is
+    shared by the whole table (one document).
+    """
+
+    def __init__(
+        self,
+        policy: Policy | CompiledPolicy,
+        mode: str = "placeholder",
+        pseudonyms: Optional[PseudonymTable] = None,
+    ):
+        self.policy = compile_policy(policy)
+        self.mode = mode
+        self.pseudonyms = pseudonyms or batch_table(self.policy) or PseudonymTable()
+        self.routes: Dict[str, str] = {}
+        self.span_counts: Dict[str, Counter] = {}
+        # profiled "none" so far, re-profiled on every chunk
+        self._no_text: Set[str] = set()
+        self._column_policies: Dict[str, CompiledPolicy] = {}
+
+    # -- routing ------------------------------------------------------
+    def profile(self, columns: Columns) -> Dict[str, str]:
+        """
+        Pick routes for columns not seen yet, from their first text cells;
+        columns profiled "none" so far get another look at this chunk.
+        """
+        for name, cells in columns.items():
+            if name in self.routes and name not in self._no_text:
+                continue
+            rule = self.policy.column_rules.get(name, ColumnRule())
+            if rule.entity is not None:
+                route = "entity"
+            elif rule.detect != "auto":
+                route = rule.detect
+            else:
+                route = self._profile_cells(cells)
+                if route == "none":
+                    self._no_text.add(name)
+                else:
+                    self._no_text.discard(name)
+            self.routes[name] = route
+            self.span_counts.setdefault(name, Counter())
+        return self.routes
+
+    def _profile_cells(self, cells: Sequence[Any]) -> str:
+        # the first profile_rows cells with text in them, however far down
+        texts: List[str] = []
+        for c in cells:
+            if isinstance(c, str) and not _SCALAR_RE.match(c):
+                texts.append(c)
+                if len(texts) >= self.policy.profile_rows:
+                    break
+        if not texts:
+            return "none"
+        if _needs_ner(self.policy):
+            long_texts = sum(
+                len(t) >= _FREE_TEXT_CHARS and len(t.split()) >= _FREE_TEXT_WORDS
+                for t in texts
+            )
+            if long_texts * 2 >= len(texts):
+                return "full"
+        return "regex"
+
+    def _policy_for(self, column: str, rule: ColumnRule) -> CompiledPolicy:
+        # the column's own action for its entity, compiled once
+        compiled = self._column_policies.get(column)
+        if compiled is None:
+            compiled = self.policy
+            if rule.action is not None:
+                plain = self.policy.to_policy()
+                ep = plain.entities[rule.entity]
+                plain.entities[rule.entity] = replace(ep, action=rule.action)
+                compiled = compile_policy(plain)
+            self._column_policies[column] = compiled
+        return compiled
+
+    # -- redaction ----------------------------------------------------
+    def redact_columns(self, columns: Columns) -> Columns:
+        """Redacted copy of a chunk; non-string cells are kept as they are."""
+        self.profile(columns)
+        out: Columns = {}
+        for name, cells in columns.items():
+            route = self.routes[name]
+            if route == "none":
+                out[name] = cells
+                continue
+            with timed("tabular"):
+                out[name] = self._redact_column(name, cells, route)
+        return out
+
+    def _redact_column(self, name: str, cells: List[Any], route: str) -> List[Any]:
+        idx = [i for i, c in enumerate(cells) if isinstance(c, str) and c]
+        if not idx:
+            return cells
+        texts = [cells[i] for i in idx]
+        if any(_SEP[0] in t for t in texts):
+            # can't join safely; one cell at a time
+            redacted: List[str] = []
+            for t in texts:
+                redacted.extend(self._redact_texts([t], name, route))
+        else:
+            redacted = self._redact_texts(texts, name, route)
+        out = list(cells)
+        for i, value in zip(idx, redacted):
+            out[i] = value
+        return out
+
+    def _redact_texts(self, texts: List[str], name: str, route: str) -> List[str]:
+        joined = _SEP.join(texts)
+        starts: List[int] = []
+        pos = 0
+        for t in texts:
+            starts.append(pos)
+            pos += len(t) + len(_SEP)
+
+        policy = self.policy
+        if route == "entity":
+            rule = policy.column_rules[name]
+            policy = self._policy_for(name, rule)
+            batch = SpanBatch()
+            for s, t in zip(starts, texts):
+                batch.append(s, s + len(t), rule.entity, 1.0, "column", rule.entity)
+        else:
+            batch = self._detect(joined, texts, starts, route)
+
+        self.span_counts[name].update(batch.ent_names())
+        METRICS.record_spans(batch)
+        redacted, _ = apply_batch(joined, batch, policy, self.mode, self.pseudonyms)
+        return redacted.split(_SEP)
+
+    def _detect(self, joined: str, texts: List[str], starts: List[int], route: str) -> SpanBatch:
+        policy = self.policy
+        scorer = scorer_for(policy)
+        streams = [regex_batch(joined, policy), dict_batch(joined, policy)]
+        if route == "full":
+            ner = SpanBatch()
+            for s, found in zip(starts, routed_ner_batches(texts, policy)):
+                ner.extend(found, offset=s)
+            streams.append(ner)
+        batch = resolver_for(policy).resolve([scorer.apply(b) for b in streams])
+        # drop anything that runs over a cell boundary
+        keep = []
+        for s, e in zip(batch.starts, batch.ends):
+            k = bisect_right(starts, s) - 1
+            keep.append(e <= starts[k] + len(texts[k]))
+        return batch if all(keep) else batch.compress(keep)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            name: {"route": route, "spans": dict(self.span_counts.get(name, {}))}
+            for name, route in self.routes.items()
+        }
+
+
+# ---------------------------------------------------------------------
+# Formats
+# ---------------------------------------------------------------------
+def _chunks(rows: Iterator[Any], n: int) -> Iterator[List[Any]]:
+    chunk: List[Any] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= n:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _atomic_path(dst: str) -> str:
+    return os.path.join(os.path.dirname(dst) or ".", f".{os.path.basename(dst)}.{os.getpid()}.tmp")
+
+
+def redact_csv(src: str, dst: str, redactor: TabularRedactor, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> None:
+    tmp = _atomic_path(dst)
+    with open(src, "r", encoding="utf-8", newline="") as fin, \
+            open(tmp, "w", encoding="utf-8", newline="") as fout:
+        reader = csv.reader(fin)
+        header = next(reader, None)
+        if header is None:
+            os.replace(tmp, dst)
+            return
+        writer = csv.writer(fout)
+        writer.writerow(header)
+        width = len(header)
+        for rows in _chunks(reader, chunk_rows):
+            # short rows are padded so every column has a cell per row
+            columns = {
+                name: [r[j] if j < len(r) else "" for r in rows]
+                for j, name in enumerate(header)
+            }
+            extra = [c for r in rows for c in r[width:]]
+            if extra:
+                columns[EXTRA_COLUMN] = extra
+            out = redactor.redact_columns(columns)
+            cols = [out[name] for name in header]
+            extra = iter(out.get(EXTRA_COLUMN, ()))
+            for i, r in enumerate(rows):
+                writer.writerow([c[i] for c in cols] + [next(extra) for _ in r[width:]])
+    os.replace(tmp, dst)
+
+
+def _nested_leaves(value: Any, path: str, columns: Columns, slots: Dict[str, List[Any]]) -> None:
+    """
+    Collect the string leaves of a nested JSON value into columns named
+    by their path ("user.email", "tags[]"), with the (container, key)
+    each one came from.
+    """
+    items = value.items() if isinstance(value, dict) else enumerate(value)
+    for key, v in items:
+        sub = f"{path}.{key}" if isinstance(value, dict) else f"{path}[]"
+        if isinstance(v, str):
+            columns.setdefault(sub, []).append(v)
+            slots.setdefault(sub, []).append((value, key))
+        elif isinstance(v, (dict, list)):
+            _nested_leaves(v, sub, columns, slots)
+
+
+def redact_jsonl_table(src: str, dst: str, redactor: TabularRedactor, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> None:
+    """
+    JSONL as a table: top-level keys are columns, strings nested in
+    objects / lists are columns by path ("user.email", "tags[]"); other
+    lines are kept.
+    """
+    tmp = _atomic_path(dst)
+    with open(src, "r", encoding="utf-8") as fin, open(tmp, "w", encoding="utf-8") as fout:
+        for lines in _chunks((line for line in fin if line.strip()), chunk_rows):
+            records = [json.loads(line) for line in lines]
+            rows = [r for r in records if isinstance(r, dict)]
+            names = list(dict.fromkeys(k for r in rows for k in r))
+            missing = object()
+            columns = {name: [r.get(name, missing) for r in rows] for name in names}
+            slots: Dict[str, List[Any]] = {}
+            for r in rows:
+                for name, value in r.items():
+                    if isinstance(value, (dict, list)):
+                        _nested_leaves(value, name, columns, slots)
+            out = redactor.redact_columns(columns)
+            for path, refs in slots.items():
+                for (container, key), value in zip(refs, out[path]):
+                    container[key] = value
+            it = iter(range(len(rows)))
+            for record in records:
+                if isinstance(record, dict):
+                    i = next(it)
+                    record = {
+                        name: out[name][i] for name in names if out[name][i] is not missing
+                    }
+                fout.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp, dst)
+
+
+def load_pyarrow():
+    """Import pyarrow on first use; only Parquet needs it."""
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:  # pragma: no cover
+        raise RuntimeError("pyarrow is required for Parquet files (pip install pyarrow)") from e
+    return pyarrow
+
+
+def redact_parquet(src: str, dst: str, redactor: TabularRedactor, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> None:
+    """Record batch by record batch; only string columns are looked at."""
+    pa = load_pyarrow()
+    tmp = _atomic_path(dst)
+    pf = pa.parquet.ParquetFile(src)
+    schema = pf.schema_arrow
+    text_cols = [
+        f.name for f in schema if pa.types.is_string(f.type) or pa.types.is_large_string(f.type)
+    ]
+    writer = pa.parquet.ParquetWriter(tmp, schema)
+    try:
+        for rb in pf.iter_batches(batch_size=chunk_rows):
+            columns = {name: rb.column(name).to_pylist() for name in text_cols}
+            out = redactor.redact_columns(columns)
+            arrays = [
+                pa.array(out[f.name], type=f.type) if f.name in out else rb.column(f.name)
+                for f in schema
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+    finally:
+        writer.close()
+    os.replace(tmp, dst)
+
+
+_FORMATS = {".csv": redact_csv, ".jsonl": redact_jsonl_table, ".parquet": redact_parquet}
+
+
+def redact_table(
+    src: str,
+    dst: str,
+    policy: Optional[Policy | CompiledPolicy] = None,
+    policy_path: str = "configs/policy.yaml",
+    mode: str = "placeholder",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    pseudonyms: Optional[PseudonymTable] = None,
+) -> Dict[str, Any]:
+    """
+    Redact a .csv / .jsonl / .parquet file into dst, chunk_rows rows at a
+    time. Returns the per-column report: route and spans per entity.
+    """
+    suffix = os.path.splitext(src)[1].lower()
+    fn = _FORMATS.get(suffix)
+    if fn is None:
+        raise ValueError(f"Unsupported table format: {suffix!r}")
+    redactor = TabularRedactor(resolve_policy(policy, policy_path), mode, pseudonyms)
+    fn(src, dst, redactor, chunk_rows)
+    return redactor.report()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(
+        description="Redact a CSV / JSONL / Parquet table column by column."
+    )
+    ap.add_argument("input")
+    ap.add_argument("output")
+    ap.add_argument("--policy", default="configs/policy.yaml")
+    ap.add_argument("--mode", default="placeholder")
+    ap.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = ap.parse_args(argv)
+
+    report = redact_table(
+        args.input, args.output,
+        policy_path=args.policy, mode=args.mode, chunk_rows=args.chunk_rows,
+    )
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
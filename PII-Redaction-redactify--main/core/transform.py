@@ -2,12 +2,144 @@
 
 from __future__ import annotations
 
-from typing import List, Dict
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
 from core.models import Span
 from core.policy import Policy
+from core.pseudonyms import PseudonymTable
+from core.span_batch import SpanBatch, id_name
 
+MODES = ("placeholder", "mask", "blackout", "whiteout")
 
-def apply_actions(text: str, spans: List[Span], policy: Policy, mode: str) -> str:
+# str.translate tables for the ASCII fast paths of the masks
+_ASCII_DIGITS = "0123456789"
+_ASCII_ALNUM = _ASCII_DIGITS + "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_STAR_DIGITS = str.maketrans(_ASCII_DIGITS, "*" * len(_ASCII_DIGITS))
+_STAR_ALNUM = str.maketrans(_ASCII_ALNUM, "*" * len(_ASCII_ALNUM))
+_DROP_DIGITS = str.maketrans("", "", _ASCII_DIGITS)
+
+
+def _numbered_placeholder(ep, action: str, ent: str) -> Optional[str]:
+    """The placeholder if this action numbers values ({n}), else None."""
+    if action == "pseudonymize":
+        return ep.placeholder or f"{ent}_{{n}}"
+    if action == "redact":
+        placeholder = ep.placeholder or f"[{ent}]"
+    elif action == "replace":
+        placeholder = ep.placeholder or f"{ent}_VALUE"
+    else:
+        return None
+    return placeholder if "{n}" in placeholder else None
+
+
+# ---------------------------------------------------------------------
+# Compiled plans
+# ---------------------------------------------------------------------
+# render(original, n) -> replacement; n is the pseudonym number or None
+Render = Callable[[str, Optional[int]], str]
+
+
+@dataclass(frozen=True)
+class EntityPlan:
+    ent: str
+    render: Render
+    numbered: bool = False  # needs a pseudonym number
+
+
+@dataclass(frozen=True)
+class TransformPlan:
+    """
+    What to do with each entity of a policy in one mode, resolved once:
+    placeholders are pre-split around {n}, mask rules bound, and the
+    blackout / whiteout override folded in.
+    """
+
+    mode: str
+    entities: Dict[str, EntityPlan]
+    default: EntityPlan  # entities the policy doesn't list
+
+    def for_entity(self, ent: str) -> EntityPlan:
+        return self.entities.get(ent) or EntityPlan(ent, self.default.render)
+
+
+def _keep(original: str, n: Optional[int]) -> str:
+    return original
+
+
+def _blackout(original: str, n: Optional[int]) -> str:
+    # block characters ▉/█ for the entire span
+    return "█" * len(original)
+
+
+def _whiteout(original: str, n: Optional[int]) -> str:
+    # white space for the entire span (keeps length)
+    return " " * len(original)
+
+
+def _constant(text: str) -> Render:
+    return lambda original, n: text
+
+
+def _template(placeholder: str) -> Render:
+    parts = placeholder.split("{n}")
+    if len(parts) == 2:
+        head, tail = parts
+        return lambda original, n: f"{head}{'' if n is None else n}{tail}"
+    return lambda original, n: ("" if n is None else str(n)).join(parts)
+
+
+def _entity_render(ep, action: str, ent: str) -> Render:
+    if action == "pseudonymize":
+        return _template(ep.placeholder or f"{ent}_{{n}}")
+    if action in ("redact", "replace"):
+        default = f"[{ent}]" if action == "redact" else f"{ent}_VALUE"
+        placeholder = ep.placeholder or default
+        if "{n}" in placeholder:
+            # support ADDRESS_{n} / DATE_{n} style placeholders
+            return _template(placeholder)
+        return _constant(placeholder)
+    if action == "mask":
+        return _mask_render(ep)
+    return _keep
+
+
+def compile_transform(policy: Policy, mode: str) -> TransformPlan:
+    """Build the per-entity plan for policy + mode."""
+    override = {"blackout": _blackout, "whiteout": _whiteout}.get(mode)
+    entities: Dict[str, EntityPlan] = {}
+    for ent in policy.entities:
+        ep = policy.entity_policy(ent)
+        action = policy.action_for(ent)
+        if override is not None:
+            # placeholders never show, so nothing gets numbered either
+            entities[ent] = EntityPlan(ent, override)
+            continue
+        entities[ent] = EntityPlan(
+            ent,
+            _entity_render(ep, action, ent),
+            numbered=_numbered_placeholder(ep, action, ent) is not None,
+        )
+    return TransformPlan(mode, entities, EntityPlan("", override or _keep))
+
+
+def plan_for(policy: Policy, mode: str) -> TransformPlan:
+    """The policy's compiled plan for mode, or a fresh one."""
+    plans = getattr(policy, "transforms", None)
+    plan = plans.get(mode) if plans else None
+    return plan if plan is not None else compile_transform(policy, mode)
+
+
+# ---------------------------------------------------------------------
+# Applying
+# ---------------------------------------------------------------------
+def apply_actions(
+    text: str,
+    spans: List[Span],
+    policy: Policy,
+    mode: str,
+    pseudonyms: Optional[PseudonymTable] = None,
+) -> str:
     """
     Apply mask/pseudonymization/redaction/etc. to text.
 
@@ -16,103 +148,118 @@ def apply_actions(text: str, spans: List[Span], policy: Policy, mode: str) -> st
       - "mask": preserve some structure (e.g., j***e@domain.com)
       - "blackout": cover PII spans with █ characters
       - "whiteout": cover PII spans with spaces
+
+    pseudonyms:
+      Where {n} comes from: the same value always gets the same number
+      within one table. Pass the same table across calls to share numbers
+      over pieces of a document, a batch, or globally (core/pseudonyms.py).
+      Defaults to a fresh table, i.e. per-document numbering.
+
+    Sets each span's .replacement. The pipeline itself works on a
+    SpanBatch, see apply_batch.
     """
-    pseudo_counters: Dict[str, int] = {}
+    redacted, replacements = apply_batch(
+        text, SpanBatch.from_spans(spans), policy, mode, pseudonyms
+    )
+    for span, replacement in zip(spans, replacements):
+        span.replacement = replacement
+    return redacted
 
-    spans_sorted = sorted(spans, key=lambda s: s.start)
-    out_parts = []
-    cursor = 0
 
-    for span in spans_sorted:
-        if span.start > cursor:
-            out_parts.append(text[cursor:span.start])
+def apply_batch(
+    text: str,
+    batch: SpanBatch,
+    policy: Policy,
+    mode: str,
+    pseudonyms: Optional[PseudonymTable] = None,
+) -> Tuple[str, List[str]]:
+    """
+    apply_actions for a SpanBatch of non-overlapping spans.
 
-        ent = span.ent
-        ep = policy.entity_policy(ent)
-        action = policy.action_for(ent)
-        original = text[span.start:span.end]
-        replacement = original
-
-        # --- Policy-driven action ---
-        if action == "pseudonymize":
-            ix = pseudo_counters.get(ent, 0) + 1
-            pseudo_counters[ent] = ix
-            placeholder = (ep.placeholder or f"{ent}_{{n}}").replace("{n}", str(ix))
-            replacement = placeholder
-
-        elif action == "redact":
-            placeholder = ep.placeholder or f"[{ent}]"
-            # support ADDRESS_{n} / DATE_{n} style placeholders
-            if "{n}" in placeholder:
-                ix = pseudo_counters.get(ent, 0) + 1
-                pseudo_counters[ent] = ix
-                placeholder = placeholder.replace("{n}", str(ix))
-            replacement = placeholder
-
-        elif action == "replace":
-            placeholder = ep.placeholder or f"{ent}_VALUE"
-            if "{n}" in placeholder:
-                ix = pseudo_counters.get(ent, 0) + 1
-                pseudo_counters[ent] = ix
-                placeholder = placeholder.replace("{n}", str(ix))
-            replacement = placeholder
-
-        elif action == "mask":
-            replacement = _mask_value(original, ep)
-
-        elif action == "none":
-            replacement = original
-
-        # --- Global mode override: blackout / whiteout ---
-        if mode == "blackout":
-            # block characters ▉/█ for the entire span
-            replacement = "█" * len(original)
-        elif mode == "whiteout":
-            # white space for the entire span (keeps length)
-            replacement = " " * len(original)
+    Returns the redacted text and the replacement of each row, in batch
+    order.
+    """
+    starts, ends, ents = batch.starts, batch.ends, batch.ents
+    order = list(range(len(batch)))
+    if any(starts[i] > starts[i + 1] for i in range(len(order) - 1)):
+        order.sort(key=starts.__getitem__)
 
-        span.replacement = replacement
+    plan = plan_for(policy, mode)
+    plans = {eid: plan.for_entity(id_name(eid)) for eid in set(ents)}
+
+    # Number all {n} values in one call (one transaction for durable tables)
+    numbers: Dict[int, int] = {}
+    numbered = [i for i in order if plans[ents[i]].numbered]
+    if numbered:
+        if pseudonyms is None:
+            pseudonyms = PseudonymTable()
+        found = pseudonyms.numbers(
+            [(plans[ents[i]].ent, text[starts[i]:ends[i]]) for i in numbered]
+        )
+        numbers = dict(zip(numbered, found))
+
+    renders = {eid: p.render for eid, p in plans.items()}
+    get_number = numbers.get
+    out_parts = []
+    replacements: List[str] = [""] * len(order)
+    cursor = 0
+    for i in order:
+        start = starts[i]
+        if start > cursor:
+            out_parts.append(text[cursor:start])
+        cursor = ends[i]
+        replacement = renders[ents[i]](text[start:cursor], get_number(i))
+        replacements[i] = replacement
         out_parts.append(replacement)
-        cursor = span.end
 
     if cursor < len(text):
         out_parts.append(text[cursor:])
 
-    return "".join(out_parts)
-
-
-def _mask_value(original: str, ep) -> str:
-    ent = ep.id
-
-    if ent == "EMAIL":
-        return _mask_email(original, ep.mask_rules or {})
-
-    if ent == "PHONE":
-        rules = ep.mask_rules or {}
-        mask_last = int(rules.get("mask_last", 4))
-        digits = [c for c in original if c.isdigit()]
-        if len(digits) <= mask_last:
-            return "*" * len(original)
-        keep = digits[-mask_last:]
-        masked_digits = ["*"] * (len(digits) - mask_last) + keep
-
-        out = []
-        di = 0
-        for ch in original:
-            if ch.isdigit():
-                out.append(masked_digits[di])
-                di += 1
-            else:
-                out.append(ch)
-        return "".join(out)
-
-    out = []
-    for ch in original:
-        if ch.isalnum():
-            out.append("*")
-        else:
-            out.append(ch)
-    return "".join(out)
+    return "".join(out_parts), replacements
+
+
+# ---------------------------------------------------------------------
+# Masks
+# ---------------------------------------------------------------------
+def _mask_render(ep) -> Render:
+    rules = ep.mask_rules or {}
+    if ep.id == "EMAIL":
+        return partial(_mask_email_render, rules)
+    if ep.id == "PHONE":
+        return partial(_mask_phone, int(rules.get("mask_last", 4)))
+    return _mask_alnum
+
+
+def _mask_email_render(rules: dict, original: str, n: Optional[int]) -> str:
+    return _mask_email(original, rules)
+
+
+def _mask_phone(mask_last: int, original: str, n: Optional[int]) -> str:
+    """Every digit but the last mask_last becomes *, separators stay."""
+    if original.isascii():
+        n_digits = len(original) - len(original.translate(_DROP_DIGITS))
+    else:
+        n_digits = sum(c.isdigit() for c in original)
+    if n_digits <= mask_last:
+        return "*" * len(original)
+
+    # the kept digits are at the end: find where they start
+    cut = len(original)
+    seen = 0
+    while seen < mask_last:
+        cut -= 1
+        if original[cut].isdigit():
+            seen += 1
+    head = original[:cut]
+    if head.isascii():
+        return head.translate(_STAR_DIGITS) + original[cut:]
+    return "".join("*" if c.isdigit() else c for c in head) + original[cut:]
+
+
+def _mask_alnum(original: str, n: Optional[int]) -> str:
+    if original.isascii():
+        return original.translate(_STAR_ALNUM)
+    return "".join("*" if c.isalnum() else c for c in original)
 
 
 def _mask_email(email: str, rules: dict) -> str:
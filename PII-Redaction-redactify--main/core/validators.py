@@ -17,3 +17,17 @@ def luhn_ok(digits: str) -> bool:
                 n -= 9
         total += n
     return total % 10 == 0
+
+
+def ssn_ok(digits: str) -> bool:
+    """
+    Return True if a 9-digit string is a plausible US SSN
+    (no 000/666/9xx area, no 00 group, no 0000 serial).
+    """
+    if len(digits) != 9 or not digits.isdigit():
+        return False
+
+    area, group, serial = digits[:3], digits[3:5], digits[5:]
+    if area in ("000", "666") or area[0] == "9":
+        return False
+    return group != "00" and serial != "0000"
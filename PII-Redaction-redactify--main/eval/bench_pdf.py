@@ -0,0 +1,52 @@
+# eval/bench_pdf.py
+"""
+PDF redaction throughput (pages/sec) against worker count.
+
+    python -m eval.bench_pdf --pages 200 --workers 1 2 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import fitz
+
+from core.redact_pdf import redact_pdf_bytes
+from core.registry import get_policy
+from eval.corpus import synthetic_corpus
+
+
+def make_pdf(n_pages: int, words_per_page: int = 350) -> bytes:
+    doc = fitz.open()
+    for sample in synthetic_corpus(n_docs=n_pages, n_words=words_per_page):
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (36, 36, -36, -36), sample.text, fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--pages", type=int, default=200)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--policy", default="configs/policy.yaml")
+    args = ap.parse_args()
+
+    policy = get_policy(args.policy)
+    data = make_pdf(args.pages)
+    print(f"{args.pages} pages, {len(data) / 1e6:.2f} MB")
+
+    base = None
+    for workers in args.workers:
+        t0 = time.perf_counter()
+        redact_pdf_bytes(data, policy=policy, workers=workers)
+        elapsed = time.perf_counter() - t0
+        rate = args.pages / elapsed
+        base = base or rate
+        print(f"workers={workers:<3d} {rate:8.1f} pages/s  ({rate / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# eval/bench_spans.py
+"""
+Span representation on the hot path: one Span object per candidate vs.
+the columnar SpanBatch, over a log with many emails / phone numbers.
+Both run regex -> threshold -> merge -> transform.
+
+    python -m eval.bench_spans --lines 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from core.detect_regex import find_regex_spans, regex_batch
+from core.registry import get_policy
+from core.resolve import merge_batch, merge_spans
+from core.scoring import scorer_for
+from core.transform import apply_actions, apply_batch
+
+
+def _build_log(n_lines: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(n_lines):
+        user = f"user{rng.randrange(10**6)}"
+        phone = f"555-{rng.randrange(100, 1000)}-{rng.randrange(1000, 10000)}"
+        lines.append(
+            f"2024-05-01T12:{i % 60:02d}:00Z INFO login ok "
+            f"email={user}@example.com phone={phone} req={i}"
+        )
+    return "\n".join(lines)
+
+
+def _objects(text, policy):
+    spans = find_regex_spans(text, policy)
+    spans = [s for s in spans if s.conf >= policy.threshold_for(s.ent)]
+    spans = merge_spans(spans)
+    return apply_actions(text, spans, policy, "mask"), len(spans)
+
+
+def _columnar(text, policy):
+    batch = merge_batch(scorer_for(policy).apply(regex_batch(text, policy)))
+    return apply_batch(text, batch, policy, "mask")[0], len(batch)
+
+
+def _measure(fn, text, policy, repeat):
+    best = float("inf")
+    gc.collect()
+    collections = sum(s["collections"] for s in gc.get_stats())
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out, n = fn(text, policy)
+        best = min(best, time.perf_counter() - t0)
+    collections = sum(s["collections"] for s in gc.get_stats()) - collections
+
+    del out
+    gc.collect()
+    tracemalloc.start()
+    fn(text, policy)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "mb_s": len(text) / 1e6 / best,
+        "spans": n,
+        "peak_mb": peak / 1e6,
+        "gc_runs": collections / repeat,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--lines", type=int, default=200_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--policy", default="configs/policy.yaml")
+    args = ap.parse_args()
+
+    policy = get_policy(args.policy)
+    text = _build_log(args.lines)
+
+    before = _measure(_objects, text, policy, args.repeat)
+    after = _measure(_columnar, text, policy, args.repeat)
+    assert _objects(text, policy)[0] == _columnar(text, policy)[0]
+
+    print(f"log: {len(text) / 1e6:.2f} MB, {args.lines} lines, {after['spans']} spans")
+    for name, r in (("span objects", before), ("span batch", after)):
+        print(
+            f"{name:<12}: {r['mb_s']:8.2f} MB/s  peak {r['peak_mb']:8.1f} MB"
+            f"  gc runs/pass {r['gc_runs']:6.1f}"
+        )
+    print(f"speedup     : {after['mb_s'] / before['mb_s']:8.2f}x")
+    print(f"peak memory : {after['peak_mb'] / before['peak_mb']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# eval/bench_transform.py
+"""
+Transform throughput on span-dense text: per-span policy lookups (the
+reference implementation) vs. compiled transform plans.
+
+    python -m eval.bench_transform --spans 200000 --mode placeholder
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import random
+import time
+from typing import List, Optional
+
+from core.models import Span
+from core.policy import Policy
+from core.pseudonyms import PseudonymTable
+from core.registry import get_policy
+from core.span_batch import SpanBatch
+from core.transform import _mask_email, _numbered_placeholder, apply_actions, apply_batch
+
+# One value per entity the default policy knows, so every action runs
+_VALUES = {
+    "EMAIL": ["jane.doe@example.com", "a.b@corp.example.org"],
+    "PHONE": ["(555) 123-4567", "+1 555 987 6543"],
+    "SSN_US": ["123-45-6789"],
+    "CREDIT_CARD": ["4111 1111 1111 1111"],
+    "DOB": ["03/14/1985", "1990-01-02"],
+    "PERSON_NAME": ["Jane Doe", "John Smith", "Maria Garcia"],
+    "ADDRESS": ["Boston", "12 Main Street"],
+}
+
+
+def apply_actions_reference(
+    text: str,
+    spans: List[Span],
+    policy: Policy,
+    mode: str,
+    pseudonyms: Optional[PseudonymTable] = None,
+) -> str:
+    """
+    The baseline apply_actions: policy lookups and placeholder formatting
+    per span. Numbering goes through the same PseudonymTable call as
+    apply_actions, so both give identical output.
+    """
+    spans_sorted = sorted(spans, key=lambda s: s.start)
+
+    # Number all {n} values in one call (one transaction for durable tables).
+    # Blackout / whiteout never show the placeholder, so skip it there.
+    numbers = {}
+    if mode not in ("blackout", "whiteout"):
+        numbered = [
+            i for i, span in enumerate(spans_sorted)
+            if _numbered_placeholder(
+                policy.entity_policy(span.ent), policy.action_for(span.ent), span.ent
+            )
+        ]
+        if numbered:
+            if pseudonyms is None:
+                pseudonyms = PseudonymTable()
+            found = pseudonyms.numbers(
+                [(spans_sorted[i].ent, text[spans_sorted[i].start:spans_sorted[i].end]) for i in numbered]
+            )
+            numbers = dict(zip(numbered, found))
+    out_parts = []
+    cursor = 0
+
+    for i, span in enumerate(spans_sorted):
+        if span.start > cursor:
+            out_parts.append(text[cursor:span.start])
+
+        ent = span.ent
+        ep = policy.entity_policy(ent)
+        action = policy.action_for(ent)
+        original = text[span.start:span.end]
+        replacement = original
+
+        # --- Policy-driven action ---
+        if action == "pseudonymize":
+            placeholder = ep.placeholder or f"{ent}_{{n}}"
+            replacement = placeholder.replace("{n}", str(numbers.get(i, "")))
+
+        elif action == "redact":
+            placeholder = ep.placeholder or f"[{ent}]"
+            # support ADDRESS_{n} / DATE_{n} style placeholders
+            if "{n}" in placeholder:
+                placeholder = placeholder.replace("{n}", str(numbers.get(i, "")))
+            replacement = placeholder
+
+        elif action == "replace":
+            placeholder = ep.placeholder or f"{ent}_VALUE"
+            if "{n}" in placeholder:
+                placeholder = placeholder.replace("{n}", str(numbers.get(i, "")))
+            replacement = placeholder
+
+        elif action == "mask":
+            replacement = _mask_value(original, ep)
+
+        elif action == "none":
+            replacement = original
+
+        # --- Global mode override: blackout / whiteout ---
+        if mode == "blackout":
+            # block characters ▉/█ for the entire span
+            replacement = "█" * len(original)
+        elif mode == "whiteout":
+            # white space for the entire span (keeps length)
+            replacement = " " * len(original)
+
+        span.replacement = replacement
+        out_parts.append(replacement)
+        cursor = span.end
+
+    if cursor < len(text):
+        out_parts.append(text[cursor:])
+
+    return "".join(out_parts)
+
+
+def _mask_value(original: str, ep) -> str:
+    ent = ep.id
+
+    if ent == "EMAIL":
+        return _mask_email(original, ep.mask_rules or {})
+
+    if ent == "PHONE":
+        rules = ep.mask_rules or {}
+        mask_last = int(rules.get("mask_last", 4))
+        digits = [c for c in original if c.isdigit()]
+        if len(digits) <= mask_last:
+            return "*" * len(original)
+        keep = digits[-mask_last:]
+        masked_digits = ["*"] * (len(digits) - mask_last) + keep
+
+        out = []
+        di = 0
+        for ch in original:
+            if ch.isdigit():
+                out.append(masked_digits[di])
+                di += 1
+            else:
+                out.append(ch)
+        return "".join(out)
+
+    out = []
+    for ch in original:
+        if ch.isalnum():
+            out.append("*")
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def _build(n_spans: int, policy, seed: int = 0):
+    rng = random.Random(seed)
+    ents = [e for e in _VALUES if e in policy.entities]
+    parts, spans, pos = [], [], 0
+    for _ in range(n_spans):
+        ent = rng.choice(ents)
+        value = rng.choice(_VALUES[ent])
+        gap = " x " if rng.random() < 0.5 else ", "
+        parts.append(gap)
+        pos += len(gap)
+        spans.append(Span(pos, pos + len(value), ent, 0.99, "regex"))
+        parts.append(value)
+        pos += len(value)
+    return "".join(parts), spans
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--spans", type=int, default=200_000)
+    ap.add_argument("--mode", default="placeholder")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--policy", default="configs/policy.yaml")
+    args = ap.parse_args()
+
+    policy = get_policy(args.policy)
+    text, spans = _build(args.spans, policy)
+    batch = SpanBatch.from_spans(spans)
+    copies = [copy.deepcopy(spans) for _ in range(args.repeat)]
+
+    want = apply_actions_reference(text, copy.deepcopy(spans), policy, args.mode)
+    assert apply_batch(text, batch, policy, args.mode)[0] == want
+
+    results = {
+        "per-span lookups": _best(
+            lambda: apply_actions_reference(text, copies.pop(), policy, args.mode),
+            args.repeat,
+        ),
+        "plan (Span list)": _best(
+            lambda: apply_actions(text, spans, policy, args.mode), args.repeat
+        ),
+        "plan (SpanBatch)": _best(
+            lambda: apply_batch(text, batch, policy, args.mode), args.repeat
+        ),
+    }
+
+    base = results["per-span lookups"]
+    print(f"text: {len(text) / 1e6:.2f} MB, {len(spans)} spans, mode {args.mode}")
+    for name, secs in results.items():
+        print(
+            f"{name:<17}: {len(spans) / secs / 1e6:6.2f} M spans/s"
+            f"  {base / secs:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
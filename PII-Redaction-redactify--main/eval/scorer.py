@@ -0,0 +1,497 @@
+# eval/scorer.py
+"""
+Accuracy + throughput harness for the redaction pipeline.
+
+    # score and benchmark on a synthetic corpus, write JSON results
+    python -m eval.scorer --synthetic 200 --out results.json
+
+    # same on a labeled JSONL corpus ({"text": ..., "spans": [{"start", "end", "ent"}]})
+    python -m eval.scorer --corpus gold.jsonl --out results.json
+
+    # dump the synthetic corpus as JSONL to label / inspect
+    python -m eval.scorer --synthetic 200 --write-corpus corpus.jsonl
+
+    # NER backends side by side (backend[:quantize])
+    python -m eval.scorer --corpus gold.jsonl --ner-backends spacy,transformer:int8,transformer:onnx
+
+Results are plain JSON so runs can be diffed or plotted over time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import replace
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.cascade import routed_ner_batch
+from core.detect_dict import dict_batch
+from core.detect_ner import ner_backend, ner_batches
+from core.detect_regex import regex_batch
+from core.pipeline import redact_text
+from core.policy import NerSpec
+from core.registry import CompiledPolicy, compile_policy, get_policy
+from core.resolve import resolver_for
+from core.scoring import scorer_for
+from core.transform import apply_batch
+from eval.corpus import Doc, synthetic_corpus
+
+Triple = Tuple[int, int, str]
+
+
+# ---------------------------------------------------------------------
+# Corpora
+# ---------------------------------------------------------------------
+def load_corpus(path: str) -> List[Doc]:
+    docs: List[Doc] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            gold = [(s["start"], s["end"], s["ent"]) for s in row.get("spans", [])]
+            docs.append(Doc(text=row["text"], gold=gold))
+    return docs
+
+
+def write_corpus(docs: Iterable[Doc], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for doc in docs:
+            spans = [{"start": s, "end": e, "ent": ent} for s, e, ent in doc.gold]
+            f.write(json.dumps({"text": doc.text, "spans": spans}) + "\n")
+
+
+# ---------------------------------------------------------------------
+# Accuracy
+# ---------------------------------------------------------------------
+def _match(pred: List[Triple], gold: List[Triple], exact: bool) -> Tuple[set, set]:
+    """Return (matched pred indices, matched gold indices), one-to-one."""
+    used_p, used_g = set(), set()
+    for gi, (gs, ge, gent) in enumerate(gold):
+        for pi, (ps, pe, pent) in enumerate(pred):
+            if pi in used_p or pent != gent:
+                continue
+            hit = (ps, pe) == (gs, ge) if exact else (ps < ge and gs < pe)
+            if hit:
+                used_p.add(pi)
+                used_g.add(gi)
+                break
+    return used_p, used_g
+
+
+def _prf(tp: int, fp: int, fn: int) -> Dict[str, float]:
+    p = tp / (tp + fp) if tp + fp else 0.0
+    r = tp / (tp + fn) if tp + fn else 0.0
+    f = 2 * p * r / (p + r) if p + r else 0.0
+    return {"tp": tp, "fp": fp, "fn": fn, "precision": p, "recall": r, "f1": f}
+
+
+def score(
+    docs: Sequence[Doc],
+    policy: CompiledPolicy,
+    predict: Optional[Callable[[str], List[Triple]]] = None,
+) -> Dict[str, Dict]:
+    """
+    Per-entity precision / recall / F1 of predicted spans vs gold offsets,
+    under exact-offset and any-overlap matching. Only entities the policy
+    defines are scored.
+    """
+    if predict is None:
+        def predict(text: str) -> List[Triple]:
+            _, spans = redact_text(text, policy=policy)
+            return [(s.start, s.end, s.ent) for s in spans]
+
+    counts = {m: defaultdict(lambda: [0, 0, 0]) for m in ("exact", "overlap")}
+    for doc in docs:
+        gold = [g for g in doc.gold if g[2] in policy.entity_ids]
+        pred = predict(doc.text)
+        for mode in ("exact", "overlap"):
+            mp, mg = _match(pred, gold, exact=(mode == "exact"))
+            c = counts[mode]
+            for i, (_, _, ent) in enumerate(pred):
+                c[ent][0 if i in mp else 1] += 1
+            for i, (_, _, ent) in enumerate(gold):
+                if i not in mg:
+                    c[ent][2] += 1
+
+    out: Dict[str, Dict] = {}
+    for mode, c in counts.items():
+        per_ent = {ent: _prf(*v) for ent, v in sorted(c.items())}
+        total = [sum(v[k] for v in c.values()) for k in range(3)]
+        out[mode] = {"per_entity": per_ent, "micro": _prf(*total)}
+    return out
+
+
+# ---------------------------------------------------------------------
+# Throughput / latency / memory
+# ---------------------------------------------------------------------
+def _stages(policy: CompiledPolicy, mode: str):
+    """The pipeline broken into named stages, each (state) -> state."""
+    scorer = scorer_for(policy)
+    resolver = resolver_for(policy)
+
+    def regex(st):
+        st["regex"] = regex_batch(st["text"], policy)
+
+    def dictionary(st):
+        st["dict"] = dict_batch(st["text"], policy)
+
+    def ner(st):
+        st["ner"] = routed_ner_batch(st["text"], policy)
+
+    def threshold(st):
+        st["streams"] = [scorer.apply(st[k]) for k in ("regex", "dict", "ner")]
+
+    def merge(st):
+        st["spans"] = resolver.resolve(st["streams"])
+
+    def transform(st):
+        st["out"] = apply_batch(st["text"], st["spans"], policy, mode)[0]
+
+    return [
+        ("regex", regex),
+        ("dict", dictionary),
+        ("ner", ner),
+        ("threshold", threshold),
+        ("merge", merge),
+        ("transform", transform),
+    ]
+
+
+def _pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def _latency_summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "mean_ms": statistics.fmean(values) * 1000 if values else 0.0,
+        "p50_ms": _pct(values, 50) * 1000,
+        "p95_ms": _pct(values, 95) * 1000,
+        "p99_ms": _pct(values, 99) * 1000,
+    }
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def benchmark(
+    docs: Sequence[Doc],
+    policy: CompiledPolicy,
+    mode: str = "placeholder",
+    trace_memory: bool = True,
+) -> Dict[str, Dict]:
+    """
+    Time each stage per document (docs/sec, chars/sec, p50/p95/p99), then
+    optionally re-run under tracemalloc to get the peak Python heap of each
+    stage. Peak RSS is process-wide and reported after the timing run.
+    """
+    stages = _stages(policy, mode)
+
+    # Warm-up: model load and regex compilation are not what we measure
+    if docs:
+        st = {"text": docs[0].text}
+        for _, fn in stages:
+            fn(st)
+
+    per_stage: Dict[str, List[float]] = {name: [] for name, _ in stages}
+    per_doc: List[float] = []
+    n_chars = 0
+    t_start = time.perf_counter()
+    for doc in docs:
+        st = {"text": doc.text}
+        t_doc = time.perf_counter()
+        for name, fn in stages:
+            t0 = time.perf_counter()
+            fn(st)
+            per_stage[name].append(time.perf_counter() - t0)
+        per_doc.append(time.perf_counter() - t_doc)
+        n_chars += len(doc.text)
+    wall = time.perf_counter() - t_start
+
+    result: Dict[str, Dict] = {
+        "total": {
+            "docs": len(docs),
+            "chars": n_chars,
+            "seconds": wall,
+            "docs_per_s": len(docs) / wall if wall else 0.0,
+            "chars_per_s": n_chars / wall if wall else 0.0,
+            "peak_rss_mb": _peak_rss_mb(),
+            **_latency_summary(per_doc),
+        },
+        "stages": {},
+    }
+    for name, times in per_stage.items():
+        spent = sum(times)
+        result["stages"][name] = {
+            "seconds": spent,
+            "share": spent / wall if wall else 0.0,
+            "chars_per_s": n_chars / spent if spent else 0.0,
+            **_latency_summary(times),
+        }
+
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            for name, fn in stages:
+                peak = 0
+                for doc in docs:
+                    st = {"text": doc.text}
+                    for prev_name, prev_fn in stages:
+                        if prev_name == name:
+                            break
+                        prev_fn(st)
+                    tracemalloc.reset_peak()
+                    base = tracemalloc.get_traced_memory()[0]
+                    fn(st)
+                    peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+                result["stages"][name]["peak_heap_kb"] = peak / 1024
+        finally:
+            tracemalloc.stop()
+
+    return result
+
+
+# ---------------------------------------------------------------------
+# NER cascade
+# ---------------------------------------------------------------------
+def cascade_cost(docs: Sequence[Doc], policy: CompiledPolicy) -> Optional[Dict]:
+    """
+    What the NER pre-filter (core/cascade.py) saves and costs: NER time and
+    share of chars sent to NER, and recall with vs. without it. None if
+    the policy has no NER entities.
+    """
+    if not policy.ner_entities:
+        return None
+    variants = {
+        "all_text": compile_policy(replace(policy.to_policy(), ner_cascade=False)),
+        "cascade": compile_policy(replace(policy.to_policy(), ner_cascade=True)),
+    }
+    out: Dict[str, Dict] = {}
+    for name, variant in variants.items():
+        t0 = time.perf_counter()
+        for doc in docs:
+            routed_ner_batch(doc.text, variant)
+        ner_s = time.perf_counter() - t0
+        router = variant.router
+        n_chars = sum(len(d.text) for d in docs)
+        sent = (
+            sum(e - s for d in docs for s, e in router.route(d.text)) if router else n_chars
+        )
+        acc = score(docs, variant)["overlap"]
+        out[name] = {
+            "ner_seconds": ner_s,
+            "ner_char_share": sent / n_chars if n_chars else 0.0,
+            "recall": {ent: m["recall"] for ent, m in acc["per_entity"].items()},
+            "micro_recall": acc["micro"]["recall"],
+        }
+    full, cas = out["all_text"], out["cascade"]
+    out["recall_cost"] = {
+        ent: full["recall"][ent] - cas["recall"].get(ent, 0.0)
+        for ent in full["recall"]
+        if ent in policy.ner_entities
+    }
+    out["micro_recall_cost"] = full["micro_recall"] - cas["micro_recall"]
+    return out
+
+
+# ---------------------------------------------------------------------
+# NER backends
+# ---------------------------------------------------------------------
+def _backend_spec(name: str, current: NerSpec) -> NerSpec:
+    """'transformer:int8' -> NerSpec; the policy's own backend keeps its settings."""
+    backend, _, quantize = name.partition(":")
+    spec = current if backend == current.backend else NerSpec(backend=backend)
+    return replace(spec, quantize=quantize) if quantize else spec
+
+
+def compare_ner(
+    docs: Sequence[Doc], policy: CompiledPolicy, backends: Sequence[str]
+) -> Optional[Dict]:
+    """
+    The same policy with each NER backend: overlap P / R / F1 on the NER
+    entities, batched NER throughput (model load excluded). A backend that
+    can't load (package or model missing) is reported with its error
+    instead. None if the policy has no NER entities.
+    """
+    if not policy.ner_entities or not backends:
+        return None
+    texts = [d.text for d in docs]
+    n_chars = sum(len(t) for t in texts)
+    out: Dict[str, Dict] = {}
+    for name in backends:
+        variant = compile_policy(
+            replace(policy.to_policy(), ner=_backend_spec(name, policy.ner))
+        )
+        try:
+            backend = ner_backend(variant)
+            t0 = time.perf_counter()
+            backend.load()
+            load_s = time.perf_counter() - t0
+        except (ImportError, OSError, ValueError) as e:
+            out[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+
+        t0 = time.perf_counter()
+        ner_batches(texts, variant)
+        ner_s = time.perf_counter() - t0
+
+        per_ent = score(docs, variant)["overlap"]["per_entity"]
+        ner_ents = {e: m for e, m in per_ent.items() if e in policy.ner_entities}
+        total = [sum(m[k] for m in ner_ents.values()) for k in ("tp", "fp", "fn")]
+        out[name] = {
+            "version": backend.version(),
+            "load_seconds": load_s,
+            "ner_seconds": ner_s,
+            "chars_per_s": n_chars / ner_s if ner_s else 0.0,
+            "per_entity": ner_ents,
+            "micro": _prf(*total),
+        }
+    return out
+
+
+# ---------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    docs: Sequence[Doc],
+    policy_path: str,
+    mode: str = "placeholder",
+    trace_memory: bool = True,
+    ner_backends: Sequence[str] = (),
+) -> Dict:
+    policy = get_policy(policy_path)
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "policy": policy_path,
+            "policy_fingerprint": policy.fingerprint,
+            "mode": mode,
+        },
+        "accuracy": score(docs, policy),
+        "throughput": benchmark(docs, policy, mode, trace_memory=trace_memory),
+        "ner_cascade": cascade_cost(docs, policy),
+    }
+    if ner_backends:
+        results["ner_backends"] = compare_ner(docs, policy, ner_backends)
+    return results
+
+
+def _print_summary(results: Dict) -> None:
+    acc = results["accuracy"]["exact"]
+    print(f"{'entity':<14}{'P':>7}{'R':>7}{'F1':>7}   (exact offsets)")
+    for ent, m in acc["per_entity"].items():
+        print(f"{ent:<14}{m['precision']:7.3f}{m['recall']:7.3f}{m['f1']:7.3f}")
+    m = acc["micro"]
+    print(f"{'micro':<14}{m['precision']:7.3f}{m['recall']:7.3f}{m['f1']:7.3f}")
+
+    tot = results["throughput"]["total"]
+    print(
+        f"\n{tot['docs_per_s']:.1f} docs/s, {tot['chars_per_s'] / 1e3:.1f} kchars/s, "
+        f"p50 {tot['p50_ms']:.2f} ms, p95 {tot['p95_ms']:.2f} ms, "
+        f"p99 {tot['p99_ms']:.2f} ms, peak RSS {tot['peak_rss_mb']:.0f} MB"
+    )
+    for name, st in results["throughput"]["stages"].items():
+        heap = st.get("peak_heap_kb")
+        heap_s = f", peak heap {heap:.0f} KB" if heap is not None else ""
+        print(f"  {name:<12} {st['share'] * 100:5.1f}%  p95 {st['p95_ms']:.3f} ms{heap_s}")
+
+    cascade = results.get("ner_cascade")
+    if cascade:
+        print(f"\n{'NER on':<14}{'chars':>8}{'NER s':>8}{'recall':>8}   (overlap)")
+        for name in ("all_text", "cascade"):
+            c = cascade[name]
+            print(
+                f"{name:<14}{c['ner_char_share'] * 100:7.1f}%{c['ner_seconds']:8.2f}"
+                f"{c['micro_recall']:8.3f}"
+            )
+        costs = ", ".join(f"{e} {d:+.3f}" for e, d in cascade["recall_cost"].items())
+        print(f"recall cost of the cascade: {costs or 'none'}")
+
+    backends = results.get("ner_backends")
+    if backends:
+        ents = sorted({e for b in backends.values() for e in b.get("per_entity", {})})
+        head = "".join(f"{e[:12] + ' F1':>16}" for e in ents)
+        print(f"\n{'NER backend':<22}{'P':>7}{'R':>7}{'F1':>7}{head}{'kchars/s':>10}{'load s':>8}")
+        for name, b in backends.items():
+            if "error" in b:
+                print(f"{name:<22}unavailable: {b['error']}")
+                continue
+            m = b["micro"]
+            f1s = "".join(f"{b['per_entity'].get(e, {}).get('f1', 0.0):16.3f}" for e in ents)
+            print(
+                f"{name:<22}{m['precision']:7.3f}{m['recall']:7.3f}{m['f1']:7.3f}{f1s}"
+                f"{b['chars_per_s'] / 1e3:10.1f}{b['load_seconds']:8.1f}"
+            )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--corpus", help="labeled JSONL corpus")
+    src.add_argument("--synthetic", type=int, default=200, help="number of synthetic docs")
+    ap.add_argument("--words", type=int, default=200, help="words per synthetic doc")
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("--policy", default="configs/policy.yaml")
+    ap.add_argument("--mode", default="placeholder")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    ap.add_argument("--write-corpus", help="write the corpus as JSONL and exit")
+    ap.add_argument(
+        "--ner-backends",
+        help="comma-separated NER backends to compare, e.g. spacy,transformer:int8",
+    )
+    ap.add_argument("--out", help="write results JSON here (default: stdout summary only)")
+    args = ap.parse_args(argv)
+
+    if args.corpus:
+        docs = load_corpus(args.corpus)
+    else:
+        docs = list(synthetic_corpus(args.synthetic, n_words=args.words, seed=args.seed))
+
+    if args.write_corpus:
+        write_corpus(docs, args.write_corpus)
+        print(f"wrote {len(docs)} docs to {args.write_corpus}")
+        return
+
+    results = run(
+        docs, args.policy, args.mode,
+        trace_memory=not args.no_memory,
+        ner_backends=[b for b in (args.ner_backends or "").split(",") if b],
+    )
+    _print_summary(results)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nresults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# tests/conftest.py
+
+import pytest
+
+
+# Policy with only regex-backed entities, so tests don't need the spaCy model
+REGEX_ONLY_POLICY = """
+entities:
+  EMAIL:
+    action: mask
+    mask_rules:
+      keep_domain: true
+      keep_edge_chars: 1
+  PHONE:
+    action: mask
+    mask_rules:
+      mask_last: 4
+  SSN_US:
+    action: redact
+  CREDIT_CARD:
+    action: redact
+"""
+
+
+@pytest.fixture
+def regex_policy_path(tmp_path):
+    path = tmp_path / "regex_policy.yaml"
+    path.write_text(REGEX_ONLY_POLICY, encoding="utf-8")
+    return str(path)
@@ -0,0 +1,76 @@
+# tests/test_api.py
+
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.workers import DetectionPool, PoolSaturated
+
+
+def test_redact_endpoint_in_process(monkeypatch, regex_policy_path):
+    monkeypatch.setenv("REDACTIFY_WORKERS", "0")
+    with TestClient(app) as client:
+        resp = client.post(
+            "/redact",
+            json={"text": "SSN 123-45-6789", "policy_name": regex_policy_path},
+        )
+    assert resp.status_code == 200
+    assert resp.json()["redacted_text"] == "SSN [SSN_US]"
+
+
+def test_pool_rejects_when_saturated():
+    pool = DetectionPool(workers=0, max_pending=1, timeout=5)
+
+    async def scenario():
+        first = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+        await asyncio.sleep(0)
+        with pytest.raises(PoolSaturated):
+            await pool.run(time.sleep, 0)
+        await first
+        assert pool.pending == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+
+def test_batch_endpoint_streams_ndjson_in_order(monkeypatch, regex_policy_path):
+    monkeypatch.setenv("REDACTIFY_WORKERS", "0")
+    body = "\n".join(
+        json.dumps({"id": f"doc-{i}", "text": f"SSN 123-45-{6000 + i}"}) for i in range(5)
+    )
+    with TestClient(app) as client:
+        resp = client.post(
+            "/redact/batch",
+            params={"policy_name": regex_policy_path},
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+    assert resp.status_code == 200
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["id"] for line in lines] == [f"doc-{i}" for i in range(5)]
+    assert all(line["redacted_text"] == "SSN [SSN_US]" for line in lines)
+
+
+def test_batch_chunks_respect_max_pending(monkeypatch, regex_policy_path):
+    monkeypatch.setenv("REDACTIFY_WORKERS", "0")
+    monkeypatch.setenv("REDACTIFY_MAX_PENDING", "1")
+    monkeypatch.setenv("REDACTIFY_WARMUP", "off")
+    monkeypatch.setattr("api.main.BATCH_CHUNK", 1)
+    body = "\n".join(json.dumps({"id": i, "text": "SSN 123-45-6789"}) for i in range(3))
+    with TestClient(app) as client:
+        resp = client.post(
+            "/redact/batch",
+            params={"policy_name": regex_policy_path},
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    # chunk 1 is submitted while chunk 0 holds the only slot
+    assert [line.get("error") for line in lines] == [None, "busy", None]
+    assert lines[2]["redacted_text"] == "SSN [SSN_US]"
@@ -0,0 +1,71 @@
+# tests/test_batch.py
+
+import json
+import os
+
+from core.batch import MANIFEST, load_manifest, run_batch
+
+
+def _tree(root):
+    (root / "sub").mkdir(parents=True)
+    (root / "a.txt").write_text("mail jane@example.com\n", encoding="utf-8")
+    (root / "sub" / "b.jsonl").write_text(
+        '{"id": 1, "text": "ssn 123-45-6789"}\n\n{"id": 2}\n', encoding="utf-8"
+    )
+    (root / "skip.csv").write_text("jane@example.com", encoding="utf-8")
+
+
+def test_outputs_and_manifest(regex_policy_path, tmp_path):
+    src, out = tmp_path / "in", tmp_path / "out"
+    _tree(src)
+    counts = run_batch(str(src), str(out), policy_path=regex_policy_path, workers=0)
+    assert (counts["ok"], counts["skipped"], counts["error"]) == (2, 0, 0)
+
+    assert (out / "a.txt").read_text(encoding="utf-8") == "mail j**e@example.com\n"
+    lines = (out / "sub" / "b.jsonl").read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0]) == {"id": 1, "text": "ssn [SSN_US]"}
+    assert lines[1] == ""
+    assert json.loads(lines[2]) == {"id": 2}
+    assert not (out / "skip.csv").exists()
+
+    done = load_manifest(str(out / MANIFEST))
+    assert set(done) == {"a.txt", "sub/b.jsonl"}
+    assert all(len(e.sha256) == 32 and e.mode == "placeholder" for e in done.values())
+    manifest = (out / MANIFEST).read_text(encoding="utf-8")
+    records = [json.loads(line) for line in manifest.splitlines()]
+    assert all(r["status"] == "ok" and len(r["sha256"]) == 64 for r in records)
+    assert not [n for n in os.listdir(out) if n.endswith(".tmp")]
+
+
+def test_resume_skips_finished_files(regex_policy_path, tmp_path):
+    src, out = tmp_path / "in", tmp_path / "out"
+    _tree(src)
+    run_batch(str(src), str(out), policy_path=regex_policy_path, workers=0)
+
+    # interrupted after a.txt: the torn record for b.jsonl doesn't count
+    manifest = out / MANIFEST
+    first = manifest.read_text(encoding="utf-8").splitlines()[0]
+    manifest.write_text(first + "\n" + '{"path": "sub/b.js', encoding="utf-8")
+    counts = run_batch(str(src), str(out), policy_path=regex_policy_path, workers=0)
+    assert (counts["ok"], counts["skipped"]) == (1, 1)
+
+    # a copy (new mtime, same bytes) is still done; an edit is not
+    data = (src / "a.txt").read_bytes()
+    os.utime(src / "a.txt", ns=(1, 1))
+    assert run_batch(str(src), str(out), policy_path=regex_policy_path, workers=0)["ok"] == 0
+    (src / "a.txt").write_bytes(data.replace(b"mail", b"email"))
+    counts = run_batch(str(src), str(out), policy_path=regex_policy_path, workers=0)
+    assert (counts["ok"], counts["skipped"]) == (1, 1)
+    assert (out / "a.txt").read_text(encoding="utf-8").startswith("email ")
+
+    # another JSONL field is another job for the .jsonl file only
+    counts = run_batch(str(src), str(out), policy_path=regex_policy_path, workers=0, field="body")
+    assert (counts["ok"], counts["skipped"]) == (1, 1)
+
+
+def test_process_pool(regex_policy_path, tmp_path):
+    src, out = tmp_path / "in", tmp_path / "out"
+    _tree(src)
+    counts = run_batch(str(src), str(out), policy_path=regex_policy_path, workers=2)
+    assert (counts["ok"], counts["error"]) == (2, 0)
+    assert (out / "sub" / "b.jsonl").exists()
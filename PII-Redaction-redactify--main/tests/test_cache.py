@@ -0,0 +1,66 @@
+# tests/test_cache.py
+
+import pickle
+
+import pytest
+
+from core.cache import MemoryCache, SqliteCache, set_detection_cache, split_paragraphs
+from core.metrics import METRICS
+from core.pipeline import redact_text, redact_texts
+
+
+@pytest.fixture
+def memory_cache():
+    cache = MemoryCache()
+    set_detection_cache(cache)
+    yield cache
+    set_detection_cache(None)
+
+
+def _counter(name):
+    return sum(
+        v for (n, _labels), v in METRICS.snapshot()["counters"].items() if n == name
+    )
+
+
+def test_split_paragraphs():
+    text = "first para\nstill first\n\n  \n second\n\n\n"
+    assert [text[s:e] for s, e in split_paragraphs(text)] == [
+        "first para\nstill first",
+        "second",
+    ]
+
+
+def test_cached_results_match_uncached(memory_cache, regex_policy_path):
+    boiler = "Contact privacy@example.com or 555-123-4567 with questions."
+    doc_a = f"Dear customer, SSN 123-45-6789 is on file.\n\n{boiler}"
+    doc_b = f"Card 4111 1111 1111 1111 was charged.\n\n{boiler}"
+
+    set_detection_cache(None)
+    expected = [redact_text(d, policy_path=regex_policy_path)[0] for d in (doc_a, doc_b)]
+
+    set_detection_cache(memory_cache)
+    hits, misses = _counter("redactify_cache_hits_total"), _counter("redactify_cache_misses_total")
+    assert redact_text(doc_a, policy_path=regex_policy_path)[0] == expected[0]
+    # second doc shares its boilerplate paragraph with the first
+    assert redact_texts([doc_b], policy_path=regex_policy_path)[0][0] == expected[1]
+    assert _counter("redactify_cache_hits_total") - hits == 1
+    assert _counter("redactify_cache_misses_total") - misses == 3
+    assert "# TYPE redactify_cache_hits_total counter" in METRICS.render_prometheus()
+
+
+def test_memory_cache_evicts_by_size():
+    cache = MemoryCache(max_bytes=1000)
+    for i in range(50):
+        cache.put_many({f"k{i}": [(0, 5, "EMAIL", 0.99, "regex")]})
+    assert cache.size_bytes <= 1000
+    assert "k49" in cache.get_many(["k0", "k49"])
+    assert "k0" not in cache.get_many(["k0"])
+
+
+def test_sqlite_cache_is_shared_and_picklable(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SqliteCache(path).put_many({"k": [(0, 5, "EMAIL", 0.99, "regex")]})
+
+    other = pickle.loads(pickle.dumps(SqliteCache(path)))
+    assert other.get_many(["k", "missing"]) == {"k": [(0, 5, "EMAIL", 0.99, "regex")]}
@@ -0,0 +1,42 @@
+# tests/test_cascade.py
+
+from core.cascade import NerRouter
+from core.metrics import METRICS
+
+TEXT = (
+    "2024-01-02 12:00:01 worker started pid=4411\n"
+    "Patient Jane Doe was seen in Boston.\n"
+    "She returns on march 3.\n"
+    "\n"
+    "| 1 | 2.50 | 3.75 | 100 |\n"
+    "Traceback (most recent call last):\n"
+    '  File "/srv/app.py", line 12, in <module>\n'
+    "blob QmFzZTY0RW5jb2RlZERhdGFUaGF0TG9va3NMaWtlTm9pc2VBbmRTaG91bGRCZVNraXBwZWQ=\n"
+    "Signed by Dr. Smith\n"
+)
+
+
+def _lines(text, runs):
+    return [text[s:e] for s, e in runs]
+
+
+def test_routes_only_plausible_lines():
+    METRICS.reset()
+    runs = NerRouter().route(TEXT)
+    # neighbouring lines share one run; the blank line ends it
+    assert _lines(TEXT, runs) == [
+        "Patient Jane Doe was seen in Boston.\nShe returns on march 3.",
+        "Signed by Dr. Smith",
+    ]
+    snap = METRICS.snapshot()["counters"]
+    routed = {dict(labels)["route"]: v for (name, labels), v in snap.items()
+              if name == "redactify_ner_route_lines_total"}
+    assert routed == {"ner": 3, "skip": 5}
+
+
+def test_thresholds():
+    table = "Total 12 34 56 78 90 11 22 33"
+    assert not NerRouter(min_alpha=0.5).plausible(table)
+    assert NerRouter(min_alpha=0.2).plausible(table)
+    assert NerRouter(max_token=200).plausible("Abcdefghij" * 10)
+    assert not NerRouter(max_token=40).plausible("Abcdefghij" * 10)
@@ -0,0 +1,32 @@
+# tests/test_chunking.py
+
+import dataclasses
+
+from core.chunking import iter_chunks
+from core.pipeline import _collect_spans
+from core.registry import get_policy
+
+
+def test_chunks_cover_text_and_respect_size():
+    text = ("Call 555-123-4567 today. Mail a.b@example.com please.\n\n" * 200).strip()
+    windows = list(iter_chunks(text, chunk_size=500, overlap=50))
+
+    assert windows[0][0] == 0
+    assert windows[-1][1] == len(text)
+    for (s1, e1), (s2, _) in zip(windows, windows[1:]):
+        assert s2 < e1  # overlapping, no gaps
+    assert all(e - s <= 500 for s, e in windows)
+
+
+def test_chunked_detection_matches_whole_text(regex_policy_path):
+    text = " ".join(
+        f"record {i}: 555-123-{1000 + i} and user{i}@example.com" for i in range(300)
+    )
+    policy = get_policy(regex_policy_path)
+    chunked = dataclasses.replace(policy, chunk_size=700, chunk_overlap=64)
+    whole = dataclasses.replace(policy, chunk_size=0)
+
+    got = [(s.start, s.end, s.ent) for s in _collect_spans(text, chunked)]
+    want = [(s.start, s.end, s.ent) for s in _collect_spans(text, whole)]
+    assert got == want
+    assert len(got) == 600
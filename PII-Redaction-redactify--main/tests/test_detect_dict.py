@@ -0,0 +1,146 @@
+# tests/test_detect_dict.py
+
+import pickle
+import random
+
+import pytest
+import yaml
+
+from core.detect_dict import DictMatcher, build_automaton, dict_batch, write_automaton
+from core.pipeline import redact_text
+from core.policy import DictionarySpec, parse_policy
+from core.registry import compile_policy, get_policy
+from core.span_batch import id_name
+
+
+@pytest.fixture(autouse=True)
+def dict_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("REDACTIFY_DICT_CACHE", str(tmp_path / "automata"))
+
+
+def _policy(tmp_path, terms, **props):
+    path = tmp_path / "terms.txt"
+    path.write_text(terms, encoding="utf-8")
+    cfg = {
+        "entities": {"EMPLOYEE": {"action": "redact"}, "EMAIL": {"action": "redact"}},
+        "dictionaries": {"staff": dict({"entity": "EMPLOYEE", "path": str(path)}, **props)},
+    }
+    return compile_policy(parse_policy(cfg))
+
+
+def _found(text, policy):
+    batch = dict_batch(text, policy)
+    return [
+        (text[s:e], id_name(ent), id_name(label))
+        for s, e, ent, label in zip(batch.starts, batch.ends, batch.ents, batch.labels)
+    ]
+
+
+def test_case_whitespace_and_word_boundaries(tmp_path):
+    policy = _policy(tmp_path, "# staff list\nJane  Doe\n\nACME-7\nDoe\n")
+    text = "Ask JANE\tdoe or acme-7, not Doesburg or xacme-7."
+    assert sorted(_found(text, policy)) == [
+        ("JANE\tdoe", "EMPLOYEE", "staff"),
+        ("acme-7", "EMPLOYEE", "staff"),
+        ("doe", "EMPLOYEE", "staff"),
+    ]
+
+    strict = _policy(tmp_path, "Jane Doe\n", case_sensitive=True, word_boundary=False)
+    assert _found("jane doe / Jane Doe / xJane Doex", strict) == [
+        ("Jane Doe", "EMPLOYEE", "staff"), ("Jane Doe", "EMPLOYEE", "staff"),
+    ]
+
+
+def test_matches_naive_search(tmp_path):
+    rng = random.Random(3)
+    terms = {"".join(rng.choice("abc") for _ in range(rng.randrange(1, 6))) for _ in range(60)}
+    policy = _policy(tmp_path, "\n".join(terms), word_boundary=False)
+    for _ in range(20):
+        text = "".join(rng.choice("abcd") for _ in range(200))
+        want = sorted(
+            (i, i + len(t)) for t in terms for i in range(len(text)) if text.startswith(t, i)
+        )
+        got = sorted((s.start, s.end) for s in dict_batch(text, policy).to_spans())
+        assert got == want
+
+
+def _naive(text, terms):
+    # a space in a term matches any run of whitespace; case folded
+    found = set()
+    for i in range(len(text)):
+        for term in terms:
+            j = i
+            for ch in term:
+                if ch == " ":
+                    if j >= len(text) or not text[j].isspace():
+                        break
+                    while j < len(text) and text[j].isspace():
+                        j += 1
+                elif j < len(text) and text[j].lower() == ch:
+                    j += 1
+                else:
+                    break
+            else:
+                found.add((i, j))
+    return sorted(found)
+
+
+def test_whitespace_runs_match_naive_scan(tmp_path):
+    policy = _policy(tmp_path, "John Smith\nann b\nb c d\n", word_boundary=False)
+    assert _found("john  smith / John \n Smith", policy) == [
+        ("john  smith", "EMPLOYEE", "staff"), ("John \n Smith", "EMPLOYEE", "staff"),
+    ]
+
+    rng = random.Random(5)
+    terms = ["john smith", "ann b", "b c d"]
+    for _ in range(300):
+        text = "".join(
+            rng.choice(["john", "smith", "ann", "b", "c", "d", "x", " ", "  ", "\n", "\t "])
+            for _ in range(30)
+        )
+        got = sorted((s.start, s.end) for s in dict_batch(text, policy).to_spans())
+        assert got == _naive(text, terms), text
+
+
+def test_automaton_file_roundtrip(tmp_path):
+    path = tmp_path / "t.txt"
+    path.write_text("alpha\nalphabet\nbet\n", encoding="utf-8")
+    spec = DictionarySpec("greek", "EMPLOYEE", (str(path),), word_boundary=False)
+    header, arrays = build_automaton([spec], case_sensitive=False)
+    write_automaton(str(tmp_path / "a.ac"), header, arrays)
+
+    matcher = pickle.loads(pickle.dumps(DictMatcher(str(tmp_path / "a.ac"))))
+    spans = matcher.scan("ALPHABET").to_spans()
+    assert sorted((s.start, s.end) for s in spans) == [(0, 5), (0, 8), (5, 8)]
+
+
+def test_redact_text_resolves_dict_against_regex(tmp_path):
+    policy = _policy(tmp_path, "Jane Doe\njane@example.com\n")
+    redacted, spans = redact_text("Mail Jane Doe at jane@example.com", policy=policy)
+    assert redacted == "Mail [EMPLOYEE] at [EMAIL]"  # same span: regex ranks first
+    assert [s.source for s in spans] == ["dict", "regex"]
+
+    with pytest.raises(ValueError):
+        parse_policy(yaml.safe_load("""
+entities: {EMAIL: {action: redact}}
+dictionaries: {staff: {entity: EMPLOYEE, path: x.txt}}
+"""))
+
+
+def test_registry_picks_up_edited_term_files(tmp_path):
+    terms = tmp_path / "terms.txt"
+    terms.write_text("Jane Doe\n", encoding="utf-8")
+    path = tmp_path / "policy.yaml"
+    path.write_text(yaml.safe_dump({
+        "entities": {"EMPLOYEE": {"action": "redact"}},
+        "dictionaries": {"staff": {"entity": "EMPLOYEE", "path": str(terms)}},
+    }), encoding="utf-8")
+    first = get_policy(str(path))
+    assert get_policy(str(path)) is first
+    assert _found("Jane Doe and Bob Ray", first) == [("Jane Doe", "EMPLOYEE", "staff")]
+
+    # the YAML is untouched; only the deny-list changes
+    terms.write_text("Jane Doe\nBob Ray\n", encoding="utf-8")
+    second = get_policy(str(path))
+    assert second.fingerprint != first.fingerprint
+    assert [t for t, _, _ in _found("Jane Doe and Bob Ray", second)] == ["Jane Doe", "Bob Ray"]
@@ -0,0 +1,47 @@
+# tests/test_metrics.py
+
+import logging
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from core.metrics import METRICS, Metrics
+from core.pipeline import redact_text
+
+
+def test_histogram_render_and_merge():
+    worker = Metrics()
+    worker.observe("redactify_stage_seconds", 0.002, stage="regex")
+    worker.inc("redactify_spans_total", 2, ent="EMAIL", source="regex")
+
+    parent = Metrics()
+    parent.observe("redactify_stage_seconds", 2.0, stage="regex")
+    parent.merge(worker.drain())
+    assert worker.snapshot()["counters"] == {}
+
+    text = parent.render_prometheus()
+    assert '# TYPE redactify_stage_seconds histogram' in text
+    assert 'redactify_stage_seconds_bucket{stage="regex",le="0.005"} 1' in text
+    assert 'redactify_stage_seconds_bucket{stage="regex",le="+Inf"} 2' in text
+    assert 'redactify_stage_seconds_count{stage="regex"} 2' in text
+    assert 'redactify_spans_total{ent="EMAIL",source="regex"} 2' in text
+
+
+def test_pii_events_carry_no_raw_text(regex_policy_path, caplog):
+    with caplog.at_level(logging.INFO, logger="pii_events"):
+        redact_text("write to jane@example.com", policy_path=regex_policy_path)
+    record = caplog.records[-1].getMessage()
+    assert "entities=EMAIL:1" in record
+    assert "jane" not in record and "example.com" not in record
+
+
+def test_metrics_endpoint(monkeypatch, regex_policy_path):
+    monkeypatch.setenv("REDACTIFY_WORKERS", "0")
+    METRICS.reset()
+    with TestClient(app) as client:
+        client.post("/redact", json={"text": "SSN 123-45-6789", "policy_name": regex_policy_path})
+        resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert 'redactify_spans_total{ent="SSN_US",source="regex"} 1' in resp.text
+    assert 'redactify_stage_seconds_count{stage="transform"} 1' in resp.text
+    assert "redactify_pool_pending 0" in resp.text
@@ -0,0 +1,123 @@
+# tests/test_ner_backend.py
+
+import numpy as np
+import pytest
+import regex as re
+import yaml
+
+from core import detect_ner
+from core.detect_ner import NerBackend, model_version, ner_backend, register_backend
+from core.ner_transformer import TransformerBackend, decode, windows
+from core.pipeline import redact_text
+from core.policy import NerSpec, parse_policy
+
+POLICY = """
+entities:
+  PERSON_NAME: {action: redact}
+  EMAIL: {action: redact}
+ner:
+  backend: fake
+"""
+
+
+class FakeBackend(NerBackend):
+    """Every capitalized word pair is a PER."""
+
+    def __init__(self, spec):
+        self.spec = spec
+
+    def version(self):
+        return "fake-1"
+
+    def predict(self, texts, batch_size=64, n_process=1):
+        return [
+            [(m.start(), m.end(), "PER", 0.9) for m in re.finditer(r"\p{Lu}\w+ \p{Lu}\w+", t)]
+            for t in texts
+        ]
+
+
+@pytest.fixture
+def fake_backend():
+    register_backend("fake", FakeBackend)
+    yield
+    detect_ner._BACKEND_FACTORIES.pop("fake", None)
+    for spec in [s for s in detect_ner._BACKENDS if s.backend == "fake"]:
+        del detect_ner._BACKENDS[spec]
+
+
+def test_policy_picks_backend(fake_backend):
+    policy = parse_policy(yaml.safe_load(POLICY))
+    redacted, spans = redact_text("ask Jane Smith at js@example.com", policy=policy)
+    assert redacted == "ask [PERSON_NAME] at [EMAIL]"
+    assert model_version(policy) == "fake-1"
+    assert isinstance(ner_backend(policy), FakeBackend)
+
+    with pytest.raises(ValueError, match="Unknown ner.backend"):
+        ner_backend(parse_policy({"entities": {"PERSON_NAME": {}}, "ner": {"backend": "nope"}}))
+    with pytest.raises(ValueError, match="quantize"):
+        parse_policy({"ner": {"quantize": "fp8"}})
+
+
+def test_windows_and_decode():
+    assert windows(5, 14, 4) == [(0, 5)]
+    assert windows(40, 14, 4) == [(0, 14), (10, 24), (20, 34), (26, 40)]
+
+    offsets = [(0, 3), (4, 6), (6, 9), (10, 15), (16, 18)]
+    word_ids = [0, 1, 1, 2, 3]
+    tags = ["O", "B-PER", "I-PER", "I-PER", "B-LOC"]
+    assert decode(offsets, word_ids, tags, [1.0, 0.8, 0.1, 0.6, 0.9]) == [
+        (4, 15, "PER", pytest.approx(0.7)),
+        (16, 18, "LOC", 0.9),
+    ]
+
+
+class _Encoding(dict):
+    def word_ids(self, i):
+        return list(range(len(self["input_ids"][i])))
+
+
+class WordTokenizer:
+    """One token per word: id 1 for capitalized words, 2 otherwise."""
+
+    pad_token_id = 0
+
+    def __call__(self, texts, **_):
+        words = [list(re.finditer(r"\S+", t)) for t in texts]
+        return _Encoding(
+            input_ids=[[1 if m.group()[0].isupper() else 2 for m in ws] for ws in words],
+            offset_mapping=[[m.span() for m in ws] for ws in words],
+        )
+
+    def build_inputs_with_special_tokens(self, ids):
+        return [101] + list(ids) + [102]
+
+
+def _tag_names(input_ids, attention_mask):
+    # B-PER on a capitalized word, I-PER if the previous token was one too;
+    # a name cut at a window start therefore comes out split
+    logits = [[[0.0, 0.0, 0.0] for _ in row] for row in input_ids]
+    for r, row in enumerate(input_ids):
+        for j, tok in enumerate(row):
+            tag = 0 if tok != 1 else (2 if j and row[j - 1] == 1 else 1)
+            logits[r][j][tag] = 5.0
+    return np.array(logits, dtype=np.float32)
+
+
+def test_sliding_windows_merge_at_the_most_central_window():
+    backend = TransformerBackend(NerSpec(backend="transformer", max_length=16, stride=4, batch_size=3))
+    backend._tokenizer = WordTokenizer()
+    backend._run = _tag_names
+    backend._id2label = {0: "O", 1: "B-PER", 2: "I-PER"}
+    backend._prefix, backend._size = 1, 14
+
+    words = ["w"] * 40
+    words[9:11] = ["Jane", "Smith"]     # Smith opens the second window
+    words[30:32] = ["Ann", "Lee"]
+    text = " ".join(words)
+    short = "Bob Ray"
+
+    found = backend.predict([text, short, ""])
+    names = [text[s:e] for s, e, label, _ in found[0]]
+    assert names == ["Jane Smith", "Ann Lee"]
+    assert [(s, e, label) for s, e, label, _ in found[1]] == [(0, 7, "PER")]
+    assert found[2] == []
@@ -1,6 +1,7 @@
 # tests/test_pipeline.py
 
-from core.pipeline import redact_text
+from core.pipeline import detect_spans, redact_detected, redact_text, redact_texts
+from core.registry import get_policy
 
 
 def test_redact_basic():
@@ -14,3 +15,28 @@ def test_redact_basic():
     assert "john.doe@example.com" not in redacted
     assert "(555) 123-4567" not in redacted
 
+
+def test_redact_texts_matches_single_calls(regex_policy_path):
+    texts = [
+        "Mail jane@example.org or call 555-123-4567.",
+        "",
+        "SSN 123-45-6789, card 4111 1111 1111 1111.",
+    ]
+    batch = redact_texts(texts, regex_policy_path, mode="placeholder")
+    single = [redact_text(t, regex_policy_path, mode="placeholder") for t in texts]
+
+    assert [r for r, _ in batch] == [r for r, _ in single]
+    assert batch[2][0] == "SSN [SSN_US], card [CREDIT_CARD]."
+
+
+def test_detect_once_transform_many(regex_policy_path):
+    text = "Mail jane@example.org or call 555-123-4567."
+    policy = get_policy(regex_policy_path)
+    detected = detect_spans(text, policy=policy)
+
+    for mode in ("placeholder", "mask", "blackout"):
+        for allowed in (None, ["EMAIL"]):
+            got = redact_detected(text, detected, policy, mode=mode, allowed_entities=allowed)
+            want = redact_text(text, policy=policy, mode=mode, allowed_entities=allowed)
+            assert got[0] == want[0]
+            assert [(s.start, s.end, s.ent) for s in got[1]] == [(s.start, s.end, s.ent) for s in want[1]]
@@ -0,0 +1,80 @@
+# tests/test_pseudonyms.py
+
+import sqlite3
+
+import pytest
+
+from core.pipeline import redact_text, redact_texts
+from core.pseudonyms import DurablePseudonymTable, PseudonymTable
+
+
+POLICY = """
+entities:
+  EMAIL:
+    action: pseudonymize
+    placeholder: "EMAIL_{{n}}"
+  PHONE:
+    action: replace
+    placeholder: "PHONE_{{n}}"
+pseudonymization:
+  scope: "{scope}"
+"""
+
+
+def _policy(tmp_path, scope):
+    path = tmp_path / f"{scope}.yaml"
+    path.write_text(POLICY.format(scope=scope), encoding="utf-8")
+    return str(path)
+
+
+def test_same_value_same_pseudonym_within_document(tmp_path):
+    text = "a@x.com, b@x.com, A@X.COM again; call 555-123-4567 or 555.123.4567"
+    redacted, _ = redact_text(text, policy_path=_policy(tmp_path, "per_document"))
+    assert redacted == "EMAIL_1, EMAIL_2, EMAIL_1 again; call PHONE_1 or PHONE_1"
+
+
+def test_per_batch_shares_numbers_across_documents(tmp_path):
+    docs = ["mail b@x.com", "mail a@x.com then b@x.com"]
+    per_doc = [r for r, _ in redact_texts(docs, policy_path=_policy(tmp_path, "per_document"))]
+    per_batch = [r for r, _ in redact_texts(docs, policy_path=_policy(tmp_path, "per_batch"))]
+    assert per_doc == ["mail EMAIL_1", "mail EMAIL_1 then EMAIL_2"]
+    assert per_batch == ["mail EMAIL_1", "mail EMAIL_2 then EMAIL_1"]
+
+
+def test_durable_table_is_shared_and_stores_no_plaintext(tmp_path, monkeypatch):
+    monkeypatch.setenv("REDACTIFY_PSEUDONYM_KEY", "test-key")
+    db = str(tmp_path / "pseudonyms.db")
+
+    first = DurablePseudonymTable(db, "global")
+    assert first.numbers([("EMAIL", "jane@example.com"), ("EMAIL", "bob@example.com")]) == [1, 2]
+
+    # another process / restart: same file + key, fresh in-memory index
+    second = DurablePseudonymTable(db, "global")
+    assert second.numbers([("EMAIL", "carol@example.com"), ("EMAIL", "Jane@Example.com")]) == [3, 1]
+
+    dump = "\n".join(sqlite3.connect(db).iterdump())
+    assert "jane" not in dump.lower() and "example.com" not in dump
+
+    second.drop()
+    assert DurablePseudonymTable(db, "global").numbers([("EMAIL", "bob@example.com")]) == [1]
+
+
+def test_key_file_is_kept_away_from_the_database(tmp_path, monkeypatch):
+    monkeypatch.delenv("REDACTIFY_PSEUDONYM_KEY", raising=False)
+    db = str(tmp_path / "cache" / "pseudonyms.db")
+    monkeypatch.setenv("REDACTIFY_PSEUDONYM_KEY_FILE", str(tmp_path / "cache" / "pseudonym.key"))
+    with pytest.raises(ValueError, match="next to the database"):
+        DurablePseudonymTable(db, "global")
+
+    monkeypatch.setenv("REDACTIFY_PSEUDONYM_KEY_FILE", str(tmp_path / "keys" / "pseudonym.key"))
+    DurablePseudonymTable(db, "global")
+    assert (tmp_path / "keys" / "pseudonym.key").exists()
+
+
+def test_blackout_does_not_touch_the_table(tmp_path):
+    table = PseudonymTable()
+    redact_text(
+        "mail a@x.com", policy_path=_policy(tmp_path, "per_document"),
+        mode="blackout", pseudonyms=table,
+    )
+    assert table.numbers([("EMAIL", "b@x.com")]) == [1]
@@ -0,0 +1,86 @@
+# tests/test_redact_pdf.py
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from core.ingest import apply_pdf_redactions, ingest_pdf
+from core.pdf_layout import PageLayout
+from core.pipeline import redact_text
+from core.redact_pdf import redact_pdf_bytes
+
+
+def _make_pdf() -> bytes:
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Contact: jane@example.org SSN 123-45-6789")
+    page.insert_text((72, 100), "Reference 123-45-6789x stays readable")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_layout_maps_offsets_to_glyph_boxes():
+    doc = fitz.open(stream=_make_pdf(), filetype="pdf")
+    layout = PageLayout.from_page(doc[0])
+
+    start = layout.text.index("jane@example.org")
+    rects = layout.rects_for(start, start + len("jane@example.org"))
+    assert len(rects) == 1
+    x0, y0, x1, y1 = rects[0]
+    assert 72 < x0 < x1 and y0 < 72 < y1
+    doc.close()
+
+
+def test_only_detected_occurrence_is_redacted(regex_policy_path):
+    out = redact_pdf_bytes(_make_pdf(), policy_path=regex_policy_path)
+    doc = fitz.open(stream=out, filetype="pdf")
+    text = doc[0].get_text("text")
+    doc.close()
+
+    assert "jane@example.org" not in text
+    assert "Contact:" in text
+    # Same digits on line two are not a detected SSN and must survive
+    assert "123-45-6789x" in text
+    assert text.count("123-45-6789") == 1
+
+
+def test_parallel_pages_match_serial(regex_policy_path):
+    doc = fitz.open()
+    for i in range(4):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i}: call 555-123-{4000 + i} or mail p{i}@example.org")
+    data = doc.tobytes()
+    doc.close()
+
+    def page_texts(pdf: bytes):
+        d = fitz.open(stream=pdf, filetype="pdf")
+        texts = [p.get_text("text") for p in d]
+        d.close()
+        return texts
+
+    serial = redact_pdf_bytes(data, policy_path=regex_policy_path, workers=1)
+    parallel = redact_pdf_bytes(data, policy_path=regex_policy_path, workers=2)
+    assert page_texts(parallel) == page_texts(serial)
+    assert "p2@example.org" not in "".join(page_texts(parallel))
+
+
+def test_ingest_once_and_map_spans_back_to_pages(regex_policy_path):
+    doc = fitz.open()
+    for i in range(2):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i}: mail p{i}@example.org")
+    data = doc.tobytes()
+    doc.close()
+
+    ingested = ingest_pdf(data)
+    assert ingest_pdf(data) is ingested  # cached by content hash
+
+    _, spans = redact_text(ingested.text, policy_path=regex_policy_path)
+    rects = ingested.rects_for_spans(spans)
+    assert sorted(rects) == [0, 1]
+
+    out = apply_pdf_redactions(data, rects)
+    redacted = fitz.open(stream=out, filetype="pdf")
+    assert "p1@example.org" not in redacted[1].get_text("text")
+    redacted.close()
@@ -11,3 +11,30 @@ def test_email_detection():
     emails = [s for s in spans if s.ent == "EMAIL"]
     assert len(emails) == 1
     assert text[emails[0].start:emails[0].end] == "user@example.com"
+
+
+def test_single_pass_dispatches_to_validators():
+    policy = load_policy("configs/policy.yaml")
+    text = (
+        "Card 4111 1111 1111 1111, bad card 4111 1111 1111 1112, "
+        "SSN 123-45-6789, bad SSN 000-12-3456, call 555-123-4567 on 05/21/1984."
+    )
+    found = {(text[s.start:s.end], s.ent) for s in find_regex_spans(text, policy)}
+    assert found == {
+        ("4111 1111 1111 1111", "CREDIT_CARD"),
+        ("123-45-6789", "SSN_US"),
+        ("555-123-4567", "PHONE"),
+        ("05/21/1984", "DOB"),
+    }
+
+
+def test_numeric_local_part_is_still_an_email():
+    policy = load_policy("configs/policy.yaml")
+    for text, email in [
+        ("text 2125551234@vtext.com now", "2125551234@vtext.com"),
+        ("born 01/02/2020@corp.com", "01/02/2020@corp.com"),
+        ("id 123-45-6789@x.org.", "123-45-6789@x.org"),
+        ("call 555 123 4567@x.com", "4567@x.com"),
+    ]:
+        found = {(text[s.start:s.end], s.ent) for s in find_regex_spans(text, policy)}
+        assert (email, "EMAIL") in found
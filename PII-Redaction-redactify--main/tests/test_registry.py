@@ -0,0 +1,53 @@
+# tests/test_registry.py
+
+import os
+
+from core.pipeline import redact_text
+from core.registry import PolicyRegistry, get_policy
+
+
+POLICY_YAML = """
+entities:
+  EMAIL:
+    action: redact
+  PHONE:
+    action: mask
+    mask_rules:
+      mask_last: 4
+"""
+
+
+def test_registry_reuses_compiled_policy(tmp_path):
+    path = tmp_path / "policy.yaml"
+    path.write_text(POLICY_YAML, encoding="utf-8")
+
+    registry = PolicyRegistry(max_entries=2)
+    first = registry.get(str(path))
+    assert registry.get(str(path)) is first
+    assert first.placeholders["EMAIL"] == "[EMAIL]"
+    assert first.regex_entities == ("EMAIL", "PHONE")
+    assert not first.ner_entities
+
+    # Touching the file without changing it keeps the compiled object
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert registry.get(str(path)) is first
+
+    # Changing the content recompiles
+    path.write_text(POLICY_YAML.replace("redact", "replace"), encoding="utf-8")
+    second = registry.get(str(path))
+    assert second is not first
+    assert second.placeholders["EMAIL"] == "EMAIL_VALUE"
+
+    registry.invalidate(str(path))
+    assert len(registry) == 0
+
+
+def test_redact_text_accepts_compiled_policy(tmp_path):
+    path = tmp_path / "policy.yaml"
+    path.write_text(POLICY_YAML, encoding="utf-8")
+    policy = get_policy(str(path))
+
+    redacted, spans = redact_text("mail a@b.com now", policy=policy)
+    assert redacted == "mail [EMAIL] now"
+    assert [s.ent for s in spans] == ["EMAIL"]
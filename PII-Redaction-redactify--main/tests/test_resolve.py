@@ -0,0 +1,75 @@
+# tests/test_resolve.py
+
+import random
+
+import pytest
+
+from core.resolve import Resolver
+from core.span_batch import SpanBatch
+
+
+def _batch(*rows):
+    batch = SpanBatch()
+    for start, end, ent, conf, source in rows:
+        batch.append(start, end, ent, conf, source, ent)
+    return batch
+
+
+def _out(batch):
+    return [(s.start, s.end, s.ent) for s in batch.to_spans()]
+
+
+def test_long_span_over_a_chain_of_hits():
+    regex = _batch((0, 10, "PHONE", 0.98, "regex"), (12, 20, "EMAIL", 0.99, "regex"))
+    ner = _batch((5, 15, "ADDRESS", 0.85, "ner"), (18, 30, "ADDRESS", 0.85, "ner"))
+    # both regex hits beat the ADDRESS spans that straddle them
+    assert _out(Resolver().resolve([regex, ner])) == [(0, 10, "PHONE"), (12, 20, "EMAIL")]
+
+    # ranked by length, the wide ADDRESS covering both hits wins
+    wide = _batch((2, 22, "ADDRESS", 0.99, "ner"))
+    assert _out(Resolver(("length",)).resolve([regex, wide])) == [(2, 22, "ADDRESS")]
+
+
+def test_source_and_entity_precedence():
+    regex = _batch((0, 10, "DOB", 0.9, "regex"))
+    ner = _batch((0, 12, "ADDRESS", 0.9, "ner"))
+    assert _out(Resolver().resolve([regex, ner])) == [(0, 12, "ADDRESS")]
+    assert _out(Resolver(("source",)).resolve([regex, ner])) == [(0, 10, "DOB")]
+    by_entity = Resolver(("entity", "conf"), entity_order=("DOB", "ADDRESS"))
+    assert _out(by_entity.resolve([ner, regex])) == [(0, 10, "DOB")]
+
+    with pytest.raises(ValueError):
+        Resolver(("size",))
+
+
+def test_matches_global_greedy_and_ignores_stream_split():
+    rng = random.Random(7)
+    resolver = Resolver()
+    for _ in range(30):
+        rows = []
+        for _ in range(80):
+            start = rng.randrange(0, 400)
+            rows.append((start, start + rng.randrange(1, 30), "EMAIL",
+                         rng.choice([0.7, 0.85, 0.99]), "regex"))
+
+        # reference: best-first over everything, keep what doesn't overlap
+        kept = []
+        for s, e, _ent, conf, _src in sorted(rows, key=lambda r: (-r[3], r[0] - r[1], r[0], -r[1])):
+            if all(e <= ks or ke <= s for ks, ke in kept):
+                kept.append((s, e))
+        want = sorted(kept)
+
+        streams = [[], [], []]
+        for row in sorted(rows):
+            streams[rng.randrange(3)].append(row)
+        got = resolver.resolve([_batch(*rows_) for rows_ in streams])
+        assert [(s, e) for s, e, *_ in _out(got)] == want
+
+
+def test_one_huge_cluster():
+    # a staircase of 20k overlapping spans is a single cluster; the odd
+    # starts score higher, so exactly those survive
+    n = 20000
+    rows = [(i, i + 2, "EMAIL", 0.5 + (i % 2) * 0.1 + i / (10 * n), "regex") for i in range(n)]
+    got = _out(Resolver().resolve([_batch(*rows)]))
+    assert [s for s, _e, _ent in got] == list(range(1, n, 2))
@@ -0,0 +1,34 @@
+# tests/test_scorer.py
+
+from core.registry import get_policy
+from eval.corpus import Doc, synthetic_corpus
+from eval.scorer import benchmark, load_corpus, score, write_corpus
+
+
+def test_score_counts_misses_and_false_positives(regex_policy_path):
+    policy = get_policy(regex_policy_path)
+    doc = Doc(
+        text="mail a@b.com now",
+        gold=[(5, 12, "EMAIL"), (0, 4, "SSN_US"), (0, 4, "PERSON_NAME")],
+    )
+
+    res = score([doc], policy, predict=lambda t: [(5, 12, "EMAIL"), (13, 16, "PHONE")])
+
+    ents = res["exact"]["per_entity"]
+    assert ents["EMAIL"]["f1"] == 1.0
+    assert ents["SSN_US"]["fn"] == 1
+    assert ents["PHONE"]["fp"] == 1
+    assert "PERSON_NAME" not in ents  # not in the policy, not scored
+
+
+def test_synthetic_roundtrip_and_benchmark(regex_policy_path, tmp_path):
+    policy = get_policy(regex_policy_path)
+    docs = list(synthetic_corpus(5, n_words=50, seed=1))
+    path = tmp_path / "corpus.jsonl"
+    write_corpus(docs, str(path))
+    assert load_corpus(str(path)) == docs
+
+    assert score(docs, policy)["overlap"]["micro"]["recall"] == 1.0
+    bench = benchmark(docs, policy, trace_memory=False)
+    assert bench["total"]["docs"] == 5
+    assert set(bench["stages"]) == {"regex", "dict", "ner", "threshold", "merge", "transform"}
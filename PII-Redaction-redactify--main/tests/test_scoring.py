@@ -0,0 +1,68 @@
+# tests/test_scoring.py
+
+import yaml
+
+from core.detect_regex import regex_batch
+from core.pipeline import redact_text
+from core.policy import parse_policy
+from core.registry import compile_policy
+from core.span_batch import SpanBatch
+
+
+def _compile(text):
+    return compile_policy(parse_policy(yaml.safe_load(text)))
+
+
+def test_sub_threshold_spans_are_dropped():
+    policy = _compile("""
+entities:
+  EMAIL:
+    action: redact
+    threshold: 1.0
+  SSN_US:
+    action: redact
+    threshold: 0.95
+""")
+    out, spans = redact_text("a@b.com and 123-45-6789", policy=policy)
+    assert [s.ent for s in spans] == ["SSN_US"]
+    assert out == "a@b.com and [SSN_US]"
+
+
+def test_regex_dob_needs_calibration_to_pass():
+    text = "born 03/14/1985"
+    plain = _compile("entities:\n  DOB:\n    threshold: 0.85\n")
+    assert len(regex_batch(text, plain)) == 1
+    assert len(plain.scorer.apply(regex_batch(text, plain))) == 0
+
+    trusted = _compile("""
+entities:
+  DOB:
+    threshold: 0.85
+scoring:
+  label_confidence:
+    regex:
+      DOB: 0.9
+""")
+    kept = trusted.scorer.apply(regex_batch(text, trusted)).to_spans()
+    assert [(s.ent, s.conf) for s in kept] == [("DOB", 0.9)]
+
+
+def test_calibration_by_source_and_label():
+    policy = _compile("""
+entities:
+  PERSON_NAME:
+    threshold: 0.8
+  ADDRESS:
+    threshold: 0.8
+scoring:
+  source_weights:
+    ner: 0.5
+  label_confidence:
+    ner:
+      PERSON: 1.8
+""")
+    batch = SpanBatch()
+    batch.append(0, 4, "PERSON_NAME", 0.85, "ner", "PERSON")
+    batch.append(5, 9, "ADDRESS", 0.85, "ner", "GPE")
+    kept = policy.scorer.apply(batch).to_spans()
+    assert [(s.ent, s.conf) for s in kept] == [("PERSON_NAME", 0.9)]
@@ -0,0 +1,44 @@
+# tests/test_span_batch.py
+
+import pickle
+import random
+
+from core.models import Span
+from core.resolve import merge_batch, merge_spans
+from core.span_batch import SpanBatch
+
+
+def _random_spans(n, seed=0):
+    rng = random.Random(seed)
+    spans = []
+    for _ in range(n):
+        start = rng.randrange(0, 200)
+        spans.append(
+            Span(start, start + rng.randrange(1, 20), rng.choice(["EMAIL", "PHONE"]),
+                 rng.choice([0.7, 0.85, 0.99]), rng.choice(["regex", "ner"]))
+        )
+    return spans
+
+
+def test_merge_batch_matches_merge_spans():
+    for seed in range(20):
+        spans = _random_spans(60, seed)
+        want = [(s.start, s.end, s.ent, s.conf) for s in merge_spans(spans)]
+        got = merge_batch(SpanBatch.from_spans(spans)).to_spans()
+        assert [(s.start, s.end, s.ent, s.conf) for s in got] == want
+
+
+def test_batch_round_trips():
+    batch = SpanBatch.from_spans(_random_spans(10))
+    batch.append(5, 9, "PERSON_NAME", 0.85, "ner", "PERSON")
+
+    copy = pickle.loads(pickle.dumps(batch))
+    assert copy.rows() == batch.rows()
+    assert list(copy.labels) == list(batch.labels)
+
+    shifted = SpanBatch()
+    shifted.extend(batch, offset=100)
+    assert [s.start - 100 for s in shifted.to_spans()] == list(batch.starts)
+    assert SpanBatch.from_rows(batch.rows()).rows() == batch.rows()
+    assert set(batch.only(["PERSON_NAME"]).ent_names()) == {"PERSON_NAME"}
+    assert batch.counts()[("PERSON_NAME", "ner")] == 1
@@ -0,0 +1,43 @@
+# tests/test_stream.py
+
+from core.pipeline import redact_text
+from core.stream import redact_stream
+
+
+POLICY = """
+entities:
+  EMAIL:
+    action: pseudonymize
+    placeholder: "EMAIL_{n}"
+  PHONE:
+    action: mask
+    mask_rules:
+      mask_last: 4
+"""
+
+
+def test_stream_matches_whole_text(tmp_path):
+    path = tmp_path / "policy.yaml"
+    path.write_text(POLICY, encoding="utf-8")
+    text = "".join(
+        f"line {i}: reach user{i}@example.com or 555-123-{1000 + i}\n" for i in range(200)
+    )
+
+    # Feed awkward 7-char pieces so entities get split between pieces
+    pieces = (text[i:i + 7] for i in range(0, len(text), 7))
+    streamed = "".join(
+        redact_stream(pieces, policy_path=str(path), window=300, lookahead=60)
+    )
+
+    expected, _ = redact_text(text, str(path))
+    assert streamed == expected
+    assert "EMAIL_200" in streamed
+
+
+def test_stream_never_splits_an_entity_across_a_forced_cut(tmp_path):
+    path = tmp_path / "policy.yaml"
+    path.write_text("entities:\n  EMAIL: {action: redact}\n", encoding="utf-8")
+    # no whitespace to cut on, and the email runs into the lookahead
+    text = "a@" + "b" * 20 + ".com;;"
+    streamed = "".join(redact_stream([text], policy_path=str(path), window=10, lookahead=5))
+    assert streamed == redact_text(text, str(path))[0] == "[EMAIL];;"
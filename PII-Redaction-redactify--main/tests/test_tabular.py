@@ -0,0 +1,107 @@
+# tests/test_tabular.py
+
+import csv
+import json
+
+import pytest
+import yaml
+
+from core.policy import parse_policy
+from core.tabular import TabularRedactor, redact_table
+
+POLICY = """
+entities:
+  EMAIL: {action: redact}
+  PHONE:
+    action: mask
+    mask_rules: {mask_last: 4}
+  SSN_US: {action: redact}
+tabular:
+  profile_rows: 2
+  columns:
+    contact: {entity: EMAIL, action: mask}
+    code: {detect: none}
+"""
+
+
+@pytest.fixture
+def policy():
+    return parse_policy(yaml.safe_load(POLICY))
+
+
+def test_routes_and_column_rules(policy):
+    redactor = TabularRedactor(policy)
+    out = redactor.redact_columns({
+        "id": ["1", "2", "3"],
+        "contact": ["jane@example.com", "", "bob@example.org"],
+        "code": ["123-45-6789", "x", "y"],
+        "notes": ["call 555-123-4567", None, "ssn 123-45-6789"],
+    })
+    assert out["id"] == ["1", "2", "3"]
+    assert out["contact"] == ["j**e@example.com", "", "b*b@example.org"]
+    assert out["code"] == ["123-45-6789", "x", "y"]
+    assert out["notes"] == ["call ***-***-4567", None, "ssn [SSN_US]"]
+    assert redactor.routes == {"id": "none", "contact": "entity", "code": "none", "notes": "regex"}
+
+
+def test_no_match_across_cells(policy):
+    # joined, these would read as one phone number
+    out = TabularRedactor(policy).redact_columns({"notes": ["555", "123-4567", "a@b"]})
+    assert out["notes"] == ["555", "123-4567", "a@b"]
+
+
+def test_csv_and_jsonl_files(policy, tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text(
+        "id,notes\n1,mail jane@example.com\n2,\"a, b\",extra,ssn 123-45-6789\n3\n",
+        encoding="utf-8",
+    )
+    report = redact_table(str(src), str(tmp_path / "out.csv"), policy=policy, chunk_rows=2)
+    with open(tmp_path / "out.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows == [
+        ["id", "notes"], ["1", "mail [EMAIL]"], ["2", "a, b", "extra", "ssn [SSN_US]"], ["3", ""],
+    ]
+    assert report["notes"] == {"route": "regex", "spans": {"EMAIL": 1}}
+    assert report["(extra)"] == {"route": "regex", "spans": {"SSN_US": 1}}
+
+    # strings nested in objects / lists are columns by path
+    src = tmp_path / "in.jsonl"
+    src.write_text(
+        '{"id": 1, "notes": "a@b.com", "n": {"x": 1}}\n[1]\n{"id": 2}\n'
+        '{"user": {"email": "john.doe@example.com"}, "tags": ["ok", "555-123-4567"]}\n',
+        encoding="utf-8",
+    )
+    report = redact_table(str(src), str(tmp_path / "out.jsonl"), policy=policy)
+    lines = (tmp_path / "out.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"id": 1, "notes": "[EMAIL]", "n": {"x": 1}}, [1], {"id": 2},
+        {"user": {"email": "[EMAIL]"}, "tags": ["ok", "***-***-4567"]},
+    ]
+    assert report["user.email"]["spans"] == {"EMAIL": 1}
+    assert report["tags[]"]["spans"] == {"PHONE": 1}
+
+
+def test_empty_profile_does_not_switch_detection_off(policy, tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text(
+        "id,other\n" + "1,\n" * 5 + "2,mail john.doe@example.com or 555-123-4567\n",
+        encoding="utf-8",
+    )
+    report = redact_table(str(src), str(tmp_path / "out.csv"), policy=policy, chunk_rows=3)
+    with open(tmp_path / "out.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[-1] == ["2", "mail [EMAIL] or ***-***-4567"]
+    assert report["other"]["route"] == "regex"
+
+
+def test_parquet(policy, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    table = pa.table({"id": [1, 2], "notes": ["a@b.com", None]})
+    pq.write_table(table, tmp_path / "in.parquet")
+    redact_table(str(tmp_path / "in.parquet"), str(tmp_path / "out.parquet"), policy=policy)
+    out = pq.read_table(tmp_path / "out.parquet")
+    assert out.schema == table.schema
+    assert out.column("notes").to_pylist() == ["[EMAIL]", None]
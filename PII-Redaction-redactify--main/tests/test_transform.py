@@ -0,0 +1,83 @@
+# tests/test_transform.py
+
+import copy
+
+import pytest
+import yaml
+
+from core.models import Span
+from core.policy import parse_policy
+from core.registry import compile_policy
+from core.transform import MODES, apply_actions
+from eval.bench_transform import apply_actions_reference
+
+POLICY_YAML = """
+entities:
+  EMAIL:
+    action: mask
+    mask_rules:
+      keep_domain: false
+      keep_edge_chars: 2
+  PHONE:
+    action: mask
+    mask_rules:
+      mask_last: 3
+  PERSON_NAME:
+    action: pseudonymize
+  ADDRESS:
+    action: redact
+    placeholder: "<{n}:ADDR:{n}>"
+  DOB:
+    action: replace
+  SSN_US:
+    action: redact
+  CREDIT_CARD:
+    action: mask
+  ZIP:
+    action: none
+"""
+
+TEXT = (
+    "Jöhn Doe, j.doe@exämple.com, +1 (555) 123-4567 / ٥٥٥-١٢٣٤, "
+    "12 Rue Über, 03/14/1985, 123-45-6789, 4111 1111 1111 1111, "
+    "Jöhn Doe again, 12 Rue Über, 90210, UNKNOWN"
+)
+
+
+def _spans():
+    found = []
+    for ent, value in [
+        ("PERSON_NAME", "Jöhn Doe"), ("EMAIL", "j.doe@exämple.com"),
+        ("PHONE", "+1 (555) 123-4567"), ("PHONE", "٥٥٥-١٢٣٤"),
+        ("ADDRESS", "12 Rue Über"), ("DOB", "03/14/1985"),
+        ("SSN_US", "123-45-6789"), ("CREDIT_CARD", "4111 1111 1111 1111"),
+        ("ZIP", "90210"), ("OTHER", "UNKNOWN"),
+    ]:
+        start = 0
+        while (start := TEXT.find(value, start)) >= 0:
+            found.append(Span(start, start + len(value), ent, 0.9, "regex"))
+            start += len(value)
+    return sorted(found, key=lambda s: -s.start)  # out of order on purpose
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+@pytest.mark.parametrize("mode", MODES)
+def test_compiled_plan_matches_reference(mode, compiled):
+    policy = parse_policy(yaml.safe_load(POLICY_YAML))
+    if compiled:
+        policy = compile_policy(policy)
+
+    spans = _spans()
+    ref_spans = copy.deepcopy(spans)
+    got = apply_actions(TEXT, spans, policy, mode)
+    want = apply_actions_reference(TEXT, ref_spans, policy, mode)
+    assert got == want
+    assert [s.replacement for s in spans] == [s.replacement for s in ref_spans]
+
+
+def test_phone_and_generic_masks():
+    policy = compile_policy(parse_policy(yaml.safe_load(POLICY_YAML)))
+    out = apply_actions("call 555-123-4567", [Span(5, 17, "PHONE", 0.9, "regex")], policy, "mask")
+    assert out == "call ***-***-*567"
+    out = apply_actions("x 4111 1111", [Span(2, 11, "CREDIT_CARD", 0.9, "regex")], policy, "mask")
+    assert out == "x **** ****"
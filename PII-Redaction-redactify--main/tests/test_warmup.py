@@ -0,0 +1,58 @@
+# tests/test_warmup.py
+
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from core.warmup import warmup
+
+
+def test_importing_pipeline_defers_spacy_and_fitz():
+    code = "import sys, core.pipeline; print('spacy' in sys.modules, 'fitz' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.split() == ["False", "False"]
+
+
+def test_warmup_regex_only_policy_skips_model(regex_policy_path):
+    timings = warmup([regex_policy_path])
+    assert "model" not in timings
+    assert set(timings) == {"policies", "inference"}
+
+
+def test_ready_after_blocking_warmup(monkeypatch, regex_policy_path):
+    monkeypatch.setenv("REDACTIFY_WORKERS", "0")
+    monkeypatch.setenv("REDACTIFY_POLICIES", regex_policy_path)
+    monkeypatch.setenv("REDACTIFY_WARMUP", "blocking")
+    with TestClient(app) as client:
+        resp = client.get("/ready")
+    assert resp.status_code == 200
+    assert resp.json()["ready"] is True
+
+
+def test_not_ready_when_warmup_fails(monkeypatch, tmp_path):
+    monkeypatch.setenv("REDACTIFY_WORKERS", "0")
+    monkeypatch.setenv("REDACTIFY_POLICIES", str(tmp_path / "missing.yaml"))
+    monkeypatch.setenv("REDACTIFY_WARMUP", "blocking")
+    with TestClient(app) as client:
+        resp = client.get("/ready")
+    assert resp.status_code == 503
+    assert "missing.yaml" in resp.json()["detail"]
+
+
+
+def test_warmup_records_no_documents(regex_policy_path):
+    from core.metrics import METRICS
+
+    def docs():
+        return sum(
+            v for (n, _labels), v in METRICS.snapshot()["counters"].items()
+            if n == "redactify_documents_total"
+        )
+
+    before = docs()
+    warmup([regex_policy_path])
+    assert docs() == before
@@ -1,9 +1,11 @@
+import hashlib
+import os
 import sys
+import time
 from pathlib import Path
 import io
 import zipfile
 
-import fitz  # PyMuPDF
 import streamlit as st
 
 # Make project root importable (so core/ and api/ work)
@@ -11,20 +13,16 @@ ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from core.pipeline import redact_text
-from core.policy import load_policy
+from core.pipeline import detect_spans, redact_detected
+from core.registry import get_policy
+from core.ingest import apply_pdf_redactions, ingest_pdf, redact_files
 from core.redact_pdf import redact_pdf_bytes
+from core.warmup import warmup
 
-
-
-def extract_text_from_pdf_bytes(data: bytes) -> str:
-    """Extract plain text from a PDF (one big string)."""
-    doc = fitz.open(stream=data, filetype="pdf")
-    texts = []
-    for page in doc:
-        texts.append(page.get_text("text"))
-    doc.close()
-    return "\n\n".join(texts)
+# Batch mode fans files out to worker processes once there are enough of
+# them to pay for process start-up
+BATCH_WORKERS = min(os.cpu_count() or 1, 4)
+BATCH_PARALLEL_MIN_FILES = 4
 
 
 st.set_page_config(
@@ -46,16 +44,67 @@ policy_path = st.sidebar.text_input(
     help="Path to the YAML policy file.",
 )
 
+@st.cache_resource(show_spinner=False)
+def _load_policy(path: str, mtime_ns: int):
+    # One compiled policy per file version, shared by every session;
+    # editing the file changes mtime_ns and so loads it again
+    return get_policy(path)
+
+
 policy_ok = True
 policy = None
 entity_choices = []
 try:
-    policy = load_policy(policy_path)
+    policy = _load_policy(policy_path, os.stat(policy_path).st_mtime_ns)
     entity_choices = sorted(policy.entities.keys())
 except Exception as e:
     policy_ok = False
     st.sidebar.error(f"Failed to load policy: {e}")
 
+
+@st.cache_resource(show_spinner="Loading model…")
+def _warmup(path: str) -> dict:
+    # Once per server process and policy, not on the first click
+    return warmup([path])
+
+
+# Widget changes rerun this whole script. Detection is the expensive
+# part and only depends on the text and the policy, so its result is
+# cached on exactly those; mode and entity changes only re-run the
+# transform. (Arguments starting with _ are not hashed by Streamlit.)
+@st.cache_data(max_entries=32, show_spinner="Detecting PII…")
+def _detect(doc_hash: str, fingerprint: str, _text: str, _policy):
+    return detect_spans(_text, policy=_policy)
+
+
+@st.cache_data(max_entries=8, show_spinner="Redacting PDF…")
+def _redact_pdf(
+    pdf_hash: str, doc_hash: str, fingerprint: str, mode: str, allowed: tuple, _data: bytes, _spans
+):
+    # Same cached parse as the preview; the spans (found in that parse's
+    # text, doc_hash) map straight onto page rectangles, so the PDF is
+    # neither re-extracted nor re-detected
+    return apply_pdf_redactions(_data, ingest_pdf(_data).rects_for_spans(_spans), mode=mode)
+
+
+@st.cache_data(max_entries=8, show_spinner="Redacting PDF…")
+def _redact_pdf_full(pdf_hash: str, fingerprint: str, mode: str, _data: bytes, _policy):
+    # The spans on screen didn't come from this PDF's text: detect on the PDF itself
+    return redact_pdf_bytes(_data, mode=mode, policy=_policy)
+
+
+def _sha256(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+if policy_ok:
+    try:
+        _warmup(policy_path)
+    except Exception as e:
+        st.sidebar.warning(f"Model warm-up failed: {e}")
+
 mode = st.sidebar.selectbox(
     "Redaction mode",
     options=["placeholder", "mask", "blackout", "whiteout"],
@@ -139,7 +188,8 @@ if operation_mode == "Single document":
                 data = uploaded.read()
                 st.session_state["uploaded_pdf_bytes"] = data
                 try:
-                    text = extract_text_from_pdf_bytes(data)
+                    # Parsed once (text + layout); reused below for visual redaction
+                    text = ingest_pdf(data).text
                 except Exception as e:
                     st.error(f"Failed to extract text from PDF: {e}")
                     text = ""
@@ -174,7 +224,8 @@ if operation_mode == "Single document":
 
     redacted_text = ""
     spans = []
-    redacted_pdf_bytes = None  # NEW
+    redacted_pdf_bytes = None
+    doc_hash = _sha256(user_text)
 
     if run_btn:
         if not policy_ok:
@@ -182,80 +233,97 @@ if operation_mode == "Single document":
         elif not user_text.strip():
             st.warning("Please enter or upload some text first.")
         else:
-            with st.spinner("Redacting..."):
-                allowed = selected_entities if selected_entities else []
-                redacted_text, spans = redact_text(
-                    text=user_text,
-                    policy_path=policy_path,
-                    mode=mode,
-                    allowed_entities=allowed,
-                )
+            # stays on for this text: later reruns (mode / entity changes)
+            # show the result again without another click
+            st.session_state["redacted_doc"] = doc_hash
 
-                # If original was a PDF and we're in a visual mode, build a redacted PDF
-                if (
-                    st.session_state.get("uploaded_suffix") == ".pdf"
-                    and st.session_state.get("uploaded_pdf_bytes") is not None
-                    and mode in ("blackout", "whiteout")
-                ):
-                    try:
-                        redacted_pdf_bytes = redact_pdf_bytes(
-                            st.session_state["uploaded_pdf_bytes"],
-                            policy_path=policy_path,
-                            mode=mode,
-                        )
-                    except Exception as e:
-                        st.error(f"Failed to visually redact PDF: {e}")
-                        redacted_pdf_bytes = None
-
-            st.success(f"Redaction complete. Detected {len(spans)} PII spans (after filtering).")
-
-            col_orig, col_red = st.columns(2)
-
-            with col_orig:
-                st.subheader("Original")
-                st.code(user_text, language="text")
-
-            with col_red:
-                st.subheader("Redacted")
-                st.code(
-                    redacted_text or "No changes (check PII selection & mode).",
-                    language="text",
-                )
+    if policy_ok and user_text.strip() and st.session_state.get("redacted_doc") == doc_hash:
+        detected = _detect(doc_hash, policy.fingerprint, user_text, policy)
 
-            # Text download (for inspection)
-            if redacted_text:
-                st.download_button(
-                    label="⬇️ Download redacted text",
-                    data=redacted_text,
-                    file_name="redacted.txt",
-                    mime="text/plain",
-                )
+        t0 = time.perf_counter()
+        allowed = selected_entities if selected_entities else []
+        redacted_text, spans = redact_detected(
+            user_text, detected, policy, mode=mode, allowed_entities=allowed
+        )
+        transform_ms = (time.perf_counter() - t0) * 1000
+
+        # If original was a PDF and we're in a visual mode, build a redacted PDF
+        pdf_bytes = st.session_state.get("uploaded_pdf_bytes")
+        if (
+            st.session_state.get("uploaded_suffix") == ".pdf"
+            and pdf_bytes is not None
+            and mode in ("blackout", "whiteout")
+        ):
+            try:
+                pdf_hash = _sha256(pdf_bytes)
+                # The session keeps the last upload after a switch to the
+                # text box; spans only map onto the PDF if they were found
+                # in its own text
+                if input_mode == "Text file" and user_text == ingest_pdf(pdf_bytes).text:
+                    redacted_pdf_bytes = _redact_pdf(
+                        pdf_hash, doc_hash, policy.fingerprint, mode,
+                        tuple(sorted(allowed)), pdf_bytes, spans,
+                    )
+                else:
+                    redacted_pdf_bytes = _redact_pdf_full(
+                        pdf_hash, policy.fingerprint, mode, pdf_bytes, policy
+                    )
+            except Exception as e:
+                st.error(f"Failed to visually redact PDF: {e}")
+                redacted_pdf_bytes = None
 
-            # PDF download (layout-preserving blackout/whiteout)
-            if redacted_pdf_bytes:
-                st.download_button(
-                    label="⬇️ Download redacted PDF",
-                    data=redacted_pdf_bytes,
-                    file_name="redacted.pdf",
-                    mime="application/pdf",
-                )
+        st.success(
+            f"Redaction complete. Detected {len(spans)} PII spans (after filtering), "
+            f"transform {transform_ms:.0f} ms."
+        )
 
-            if show_span_table and spans:
-                st.markdown("### Detected PII spans")
-                rows = []
-                for s in spans:
-                    rows.append(
-                        {
-                            "start": s.start,
-                            "end": s.end,
-                            "entity": s.ent,
-                            "source": s.source,
-                            "confidence": round(s.conf, 3),
-                            "original": user_text[s.start:s.end],
-                            "replacement": s.replacement,
-                        }
-                    )
-                st.dataframe(rows, use_container_width=True)
+        col_orig, col_red = st.columns(2)
+
+        with col_orig:
+            st.subheader("Original")
+            st.code(user_text, language="text")
+
+        with col_red:
+            st.subheader("Redacted")
+            st.code(
+                redacted_text or "No changes (check PII selection & mode).",
+                language="text",
+            )
+
+        # Text download (for inspection)
+        if redacted_text:
+            st.download_button(
+                label="⬇️ Download redacted text",
+                data=redacted_text,
+                file_name="redacted.txt",
+                mime="text/plain",
+            )
+
+        # PDF download (layout-preserving blackout/whiteout)
+        if redacted_pdf_bytes:
+            st.download_button(
+                label="⬇️ Download redacted PDF",
+                data=redacted_pdf_bytes,
+                file_name="redacted.pdf",
+                mime="application/pdf",
+            )
+
+        if show_span_table and spans:
+            st.markdown("### Detected PII spans")
+            rows = []
+            for s in spans:
+                rows.append(
+                    {
+                        "start": s.start,
+                        "end": s.end,
+                        "entity": s.ent,
+                        "source": s.source,
+                        "confidence": round(s.conf, 3),
+                        "original": user_text[s.start:s.end],
+                        "replacement": s.replacement,
+                    }
+                )
+            st.dataframe(rows, use_container_width=True)
 
 
 # --------------------------------------------------------------------
@@ -282,42 +350,36 @@ else:
             allowed = selected_entities if selected_entities else []
             results = []
 
-            with st.spinner("Redacting batch..."):
-                for file in uploaded_files:
-                    suffix = Path(file.name).suffix.lower()
-
-                    if suffix == ".pdf":
-                        data = file.read()
-                        try:
-                            raw = extract_text_from_pdf_bytes(data)
-                        except Exception as e:
-                            st.error(f"Failed to extract text from PDF {file.name}: {e}")
-                            raw = ""
-                    else:
-                        raw = file.read().decode("utf-8", errors="ignore")
-
-                    redacted_text, spans = redact_text(
-                        text=raw,
-                        policy_path=policy_path,
-                        mode=mode,
-                        allowed_entities=allowed,
-                    )
-
-                    total_spans = len(spans)
-                    by_ent = {}
-                    for s in spans:
-                        by_ent[s.ent] = by_ent.get(s.ent, 0) + 1
-
-                    results.append(
-                        {
-                            "filename": file.name,
-                            "original_text": raw,
-                            "redacted_text": redacted_text,
-                            "spans": spans,
-                            "total_spans": total_spans,
-                            "by_ent": by_ent,
-                        }
-                    )
+            files = [(f.name, f.read()) for f in uploaded_files]
+            workers = BATCH_WORKERS if len(files) >= BATCH_PARALLEL_MIN_FILES else 1
+            done = [None] * len(files)
+
+            progress = st.progress(0.0, text=f"Redacting 0/{len(files)} files...")
+            for n, (i, r) in enumerate(
+                redact_files(files, policy, mode, allowed, workers=workers), start=1
+            ):
+                done[i] = r
+                progress.progress(n / len(files), text=f"Redacting {n}/{len(files)} files...")
+            progress.empty()
+
+            for r in done:
+                if r.error:
+                    st.error(f"{r.name}: {r.error}")
+
+                by_ent = {}
+                for s in r.spans:
+                    by_ent[s.ent] = by_ent.get(s.ent, 0) + 1
+
+                results.append(
+                    {
+                        "filename": r.name,
+                        "original_text": r.text,
+                        "redacted_text": r.redacted_text,
+                        "spans": r.spans,
+                        "total_spans": len(r.spans),
+                        "by_ent": by_ent,
+                    }
+                )
 
             if not results:
                 st.info("No results produced (files may have been empty).")